@@ -13,10 +13,11 @@ if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 # ------------------------------------
 
-from core.loader import load_forecast_json
+from core.loader import load_cube_cached
+from core.index import build_index
 from core.transform import compute_percentiles, exceed_probability, to_wide, fan_chart_data
 from core.risk import breach_probability, var_like
-from core.charts import hist_kde, box_by_year, violin_by_year, fan_chart, heatmap_prob
+from core.charts import hist_kde_agg, box_by_year_agg, violin_by_year_agg, fan_chart, heatmap_prob
 from core.config import KPI_LABELS, FAN_CHART_BANDS, HIST_BINS
 
 st.set_page_config(page_title="Monte Carlo Financial Dashboard", layout="wide")
@@ -26,26 +27,38 @@ st.caption("Visualizzazione probabilistica per 10.000+ simulazioni – SP, CE, R
 
 # Sidebar: data source
 st.sidebar.header("Dati in input")
-uploaded = st.sidebar.file_uploader("Carica JSON (version 1.0)", type=["json"])
+uploaded = st.sidebar.file_uploader("Carica JSON / NDJSON / Parquet (version 1.0) o CSV", type=["json", "ndjson", "jsonl", "parquet", "csv", "txt"])
 default_path = Path(__file__).resolve().parents[1] / "data" / "example.json"
 
-@st.cache_data(show_spinner=False)
-def _load(path_str: str):
-    df, meta, raw = load_forecast_json(Path(path_str))
-    return df, meta, raw
+# Cache keys include the file stamp (mtime, size): a re-uploaded file is reloaded.
+# The cube is a read-only memory-mapped file (core.loader.load_cube_cached):
+# sessions share one object, processes share the OS page cache.
+@st.cache_resource(show_spinner=False)
+def _load(path_str: str, stamp: tuple):
+    cube, meta = load_cube_cached(Path(path_str))
+    return cube, meta
+
+@st.cache_resource(show_spinner=False)
+def _index(path_str: str, stamp: tuple):
+    # Sorted per-(kpi, date) values, shared across reruns and sessions (read-only).
+    # Derived tables computed from it are memoized in core.cache by its fingerprint.
+    return build_index(_load(path_str, stamp)[0])
 
 if uploaded:
-    df, meta, raw = load_forecast_json(Path(uploaded.name))
-    # Workaround: Streamlit gives a BytesIO, write temp
-    tmp = Path(st.session_state.get("_tmp_path", "uploaded.json"))
+    # Workaround: Streamlit gives a BytesIO, write temp (keep suffix for the loader)
+    tmp = Path("uploaded" + Path(uploaded.name).suffix.lower())
     tmp.write_bytes(uploaded.getvalue())
     st.session_state["_tmp_path"] = str(tmp)
-    df, meta, raw = _load(str(tmp))
+    data_path = str(tmp)
 else:
-    df, meta, raw = _load(str(default_path))
+    data_path = str(default_path)
+_st = Path(data_path).stat()
+data_stamp = (_st.st_mtime_ns, _st.st_size)
+cube, meta = _load(data_path, data_stamp)
+index = _index(data_path, data_stamp)
 
-kpis = sorted(df["kpi"].unique())
-years = sorted(df["date"].dt.year.unique())
+kpis = list(cube.kpis)
+years = sorted(cube.dates.year.unique())
 
 st.sidebar.subheader("Filtri")
 kpi_sel = st.sidebar.selectbox("KPI", kpis, index=0)
@@ -58,11 +71,11 @@ bands_default = FAN_CHART_BANDS
 st.sidebar.caption("Bande di confidenza predefinite 50% e 90%")
 st.sidebar.divider()
 st.sidebar.subheader("Soglie & Rischio")
-threshold = st.sidebar.number_input("Soglia KPI (per probabilità di superamento)", value=float(df[df["kpi"]==kpi_sel]["value"].median()))
+threshold = st.sidebar.number_input("Soglia KPI (per probabilità di superamento)", value=float(np.nanmedian(cube.kpi_slice(kpi_sel))))
 direction = st.sidebar.selectbox("Direzione", options=["above","below"], index=0 if kpi_sel.lower()=="dscr" else 0)
 
 # Top KPI cards (percentili rapidi)
-perc = compute_percentiles(df)
+perc = compute_percentiles(index)
 perc_year = perc[perc["date"].dt.year == year_sel]
 row = perc_year[perc_year["kpi"] == kpi_sel].squeeze()
 c1, c2, c3, c4, c5 = st.columns(5)
@@ -73,19 +86,19 @@ for c, label in zip([c1,c2,c3,c4,c5], ["q_05","q_25","q_50","q_75","q_95"]):
 st.markdown("### Distribuzione scenario singolo anno")
 col1, col2 = st.columns([2,2])
 with col1:
-    st.plotly_chart(hist_kde(df, kpi_sel, pd.Timestamp(year_sel,12,31), bins=bins), use_container_width=True)
+    st.plotly_chart(hist_kde_agg(index, kpi_sel, pd.Timestamp(year_sel,12,31), bins=bins), use_container_width=True)
 with col2:
     if show_violin:
-        st.plotly_chart(violin_by_year(df, kpi_sel), use_container_width=True)
+        st.plotly_chart(violin_by_year_agg(index, kpi_sel), use_container_width=True)
     else:
-        st.plotly_chart(box_by_year(df, kpi_sel), use_container_width=True)
+        st.plotly_chart(box_by_year_agg(index, kpi_sel), use_container_width=True)
 
 st.markdown("### Fan chart")
-bands_df = fan_chart_data(df, kpi_sel, bands_default)
+bands_df = fan_chart_data(index, kpi_sel, bands_default)
 st.plotly_chart(fan_chart(bands_df, kpi_sel), use_container_width=True)
 
 st.markdown("### Probabilità di superamento soglia")
-prob_df = exceed_probability(df, {kpi_sel: threshold}, {kpi_sel: "above" if direction=="above" else "below"})
+prob_df = exceed_probability(index, {kpi_sel: threshold}, {kpi_sel: "above" if direction=="above" else "below"})
 st.plotly_chart(heatmap_prob(prob_df), use_container_width=True)
 
 st.sidebar.divider()
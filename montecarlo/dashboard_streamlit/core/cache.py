@@ -0,0 +1,135 @@
+from __future__ import annotations
+import functools
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List
+import numpy as np
+import pandas as pd
+from .loader import ForecastCube
+from .index import SortedValueIndex
+
+# Fingerprints are computed once per live object (keyed by id, dropped when the
+# object is garbage collected). Inputs are treated as read-only: mutating a frame
+# in place after it has been fingerprinted returns stale cached results.
+_FINGERPRINTS: Dict[int, str] = {}
+_FP_LOCK = threading.Lock()
+
+def _hash_labels(h, labels) -> None:
+    h.update(repr(list(map(str, labels))).encode("utf-8"))
+
+def _compute_fingerprint(data: Any) -> str:
+    h = hashlib.sha1()
+    if isinstance(data, pd.DataFrame):
+        h.update(b"frame")
+        _hash_labels(h, data.columns)
+        _hash_labels(h, data.dtypes)
+        h.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+    elif isinstance(data, ForecastCube):
+        h.update(b"cube")
+        for labels in (data.scenarios, data.kpis, data.dates):
+            _hash_labels(h, labels)
+        # memoryview: no copy of (possibly memory-mapped) values
+        h.update(memoryview(np.ascontiguousarray(data.values)).cast("B"))
+    elif isinstance(data, SortedValueIndex):
+        h.update(b"index")
+        _hash_labels(h, data.kpis)
+        _hash_labels(h, data.dates)
+        h.update(data.offsets.tobytes())
+        h.update(data.values.tobytes())
+    else:
+        raise TypeError(f"Cannot fingerprint {type(data).__name__}")
+    return h.hexdigest()
+
+def fingerprint(data: Any) -> str:
+    """Content hash of a long frame, ForecastCube or SortedValueIndex (computed once per object)."""
+    key = id(data)
+    with _FP_LOCK:
+        fp = _FINGERPRINTS.get(key)
+    if fp is None:
+        fp = _compute_fingerprint(data)
+        with _FP_LOCK:
+            _FINGERPRINTS[key] = fp
+        weakref.finalize(data, _FINGERPRINTS.pop, key, None)
+    return fp
+
+def _freeze(x: Any) -> Any:
+    """Hashable form of call parameters (dicts, lists, arrays, timestamps)."""
+    if isinstance(x, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in x.items()))
+    if isinstance(x, (list, tuple, set, frozenset)):
+        items = tuple(_freeze(v) for v in x)
+        return tuple(sorted(items, key=repr)) if isinstance(x, (set, frozenset)) else items
+    if isinstance(x, np.ndarray):
+        return (x.dtype.str, x.shape, x.tobytes())
+    if isinstance(x, (np.generic, pd.Timestamp)):
+        return x.item() if isinstance(x, np.generic) else x.value
+    return x
+
+class _LRU:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.data: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key in self.data:
+                self.data.move_to_end(key)
+                self.hits += 1
+                return True, self.data[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value) -> None:
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+def _copy(value: Any) -> Any:
+    if isinstance(value, (pd.DataFrame, pd.Series, np.ndarray)):
+        return value.copy()
+    if isinstance(value, tuple):
+        return tuple(_copy(v) for v in value)
+    return value
+
+_REGISTRY: List[Callable] = []
+
+def memoize(maxsize: int = 64):
+    """
+    Memoize a derived-table function whose first argument is the dataset
+    (long frame, ForecastCube or SortedValueIndex). The key is the dataset
+    fingerprint plus the frozen remaining arguments; at most `maxsize` results
+    are kept (least recently used evicted). Frames, series and arrays (also
+    inside tuples) are returned as copies so callers cannot alter the cache.
+    """
+    def deco(func: Callable) -> Callable:
+        lru = _LRU(maxsize)
+
+        @functools.wraps(func)
+        def wrapper(data, *args, **kwargs):
+            key = (fingerprint(data), _freeze(args), _freeze(kwargs))
+            found, value = lru.get(key)
+            if not found:
+                value = func(data, *args, **kwargs)
+                lru.put(key, value)
+            return _copy(value)
+
+        wrapper.cache_info = lambda: {"hits": lru.hits, "misses": lru.misses, "size": len(lru.data), "maxsize": lru.maxsize}
+        wrapper.cache_clear = lambda: lru.data.clear()
+        _REGISTRY.append(wrapper)
+        return wrapper
+    return deco
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    """cache_info() of every memoized function, by qualified name."""
+    return {f"{f.__module__}.{f.__name__}": f.cache_info() for f in _REGISTRY}
+
+def clear_caches() -> None:
+    for f in _REGISTRY:
+        f.cache_clear()
@@ -1,7 +1,13 @@
 from __future__ import annotations
+from typing import Dict
+import numpy as np
 import pandas as pd
 import plotly.express as px
-from .config import KPI_LABELS
+import plotly.graph_objects as go
+from .config import KPI_LABELS, KDE_GRID_POINTS
+from .loader import ForecastCube
+from .index import SortedValueIndex
+from .cache import memoize
 
 def hist_kde(df_long: pd.DataFrame, kpi: str, date: pd.Timestamp, bins: int = 40):
     sub = df_long[(df_long["kpi"] == kpi) & (df_long["date"] == date)]
@@ -53,3 +59,146 @@ def heatmap_prob(prob_df: pd.DataFrame):
                     origin="lower", labels=dict(color="Probabilità"))
     fig.update_layout(title="Probabilità di superamento soglia")
     return fig
+
+# ---------------------------------------------------------------------------
+# Aggregated charts: statistics are computed in NumPy and only the summaries
+# (bins, KDE grid, box stats, violin outlines) are sent to Plotly, so the
+# payload does not grow with the number of scenarios.
+# ---------------------------------------------------------------------------
+
+def _values_at(data: pd.DataFrame | ForecastCube | SortedValueIndex, kpi: str, date: pd.Timestamp) -> np.ndarray:
+    if isinstance(data, SortedValueIndex):
+        return data.values_at(kpi, date)
+    if isinstance(data, ForecastCube):
+        if kpi not in data.kpis or date not in data.dates:
+            return np.empty(0)
+        v = data.values[:, data.kpis.get_loc(kpi), data.dates.get_loc(date)]
+        return v[~np.isnan(v)]
+    sub = data[(data["kpi"] == kpi) & (data["date"] == date)]
+    return sub["value"].to_numpy(dtype=np.float64)
+
+def _values_by_year(data: pd.DataFrame | ForecastCube | SortedValueIndex, kpi: str) -> Dict[int, np.ndarray]:
+    """Sorted values per year (dates of the same year pooled, as in box_by_year)."""
+    if isinstance(data, pd.DataFrame):
+        sub = data[data["kpi"] == kpi]
+        groups = sub.groupby(sub["date"].dt.year)["value"]
+        return {int(y): np.sort(g.to_numpy(dtype=np.float64)) for y, g in groups}
+    out: Dict[int, list] = {}
+    for date in data.dates:
+        v = _values_at(data, kpi, date)
+        if len(v):
+            out.setdefault(int(date.year), []).append(v)
+    return {y: np.sort(np.concatenate(parts)) for y, parts in out.items()}
+
+def kde_grid(values: np.ndarray, grid: np.ndarray) -> np.ndarray:
+    """
+    Gaussian KDE (Silverman bandwidth) evaluated on an evenly spaced grid.
+    Values are binned onto the grid and convolved with the kernel: O(n + grid²).
+    """
+    n = len(values)
+    if n < 2 or len(grid) < 2:
+        return np.zeros(len(grid))
+    std = values.std(ddof=1)
+    iqr = np.subtract(*np.percentile(values, [75, 25]))
+    sigma = min(std, iqr / 1.34) if iqr > 0 else std
+    if sigma <= 0:
+        return np.zeros(len(grid))
+    h = 0.9 * sigma * n ** (-0.2)
+    step = grid[1] - grid[0]
+    edges = np.concatenate(([grid[0] - step / 2], grid + step / 2))
+    counts, _ = np.histogram(values, bins=edges)
+    offs = np.arange(-(len(grid) - 1), len(grid)) * step
+    kernel = np.exp(-0.5 * (offs / h) ** 2) / (h * np.sqrt(2 * np.pi))
+    return np.convolve(counts, kernel, mode="valid") / n
+
+@memoize()
+def histogram_bins(data, kpi: str, date: pd.Timestamp, bins: int = 40) -> pd.DataFrame:
+    """columns: left, right, center, count."""
+    v = _values_at(data, kpi, date)
+    if not len(v):
+        return pd.DataFrame(columns=["left", "right", "center", "count"])
+    counts, edges = np.histogram(v, bins=bins)
+    return pd.DataFrame({"left": edges[:-1], "right": edges[1:], "center": (edges[:-1] + edges[1:]) / 2, "count": counts})
+
+@memoize()
+def kde_curve(data, kpi: str, date: pd.Timestamp, points: int = KDE_GRID_POINTS) -> pd.DataFrame:
+    """columns: x, density (KDE over the value range padded by 10%)."""
+    v = _values_at(data, kpi, date)
+    if len(v) < 2:
+        return pd.DataFrame(columns=["x", "density"])
+    lo, hi = float(np.min(v)), float(np.max(v))
+    pad = 0.1 * (hi - lo) if hi > lo else 1.0
+    grid = np.linspace(lo - pad, hi + pad, points)
+    return pd.DataFrame({"x": grid, "density": kde_grid(v, grid)})
+
+@memoize()
+def year_stats(data, kpi: str) -> pd.DataFrame:
+    """Box statistics per year: n, min, q1, median, q3, max, mean, lowerfence, upperfence (Tukey 1.5 IQR)."""
+    rows = []
+    for year, v in sorted(_values_by_year(data, kpi).items()):
+        q1, med, q3 = np.quantile(v, [0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        # v is sorted: fences are the most extreme values inside 1.5 IQR
+        lf = v[np.searchsorted(v, q1 - 1.5 * iqr, side="left")]
+        uf = v[np.searchsorted(v, q3 + 1.5 * iqr, side="right") - 1]
+        rows.append({"year": year, "n": len(v), "min": v[0], "q1": q1, "median": med, "q3": q3,
+                     "max": v[-1], "mean": v.mean(), "lowerfence": lf, "upperfence": uf})
+    return pd.DataFrame(rows, columns=["year", "n", "min", "q1", "median", "q3", "max", "mean", "lowerfence", "upperfence"])
+
+@memoize()
+def violin_outline(data, kpi: str, points: int = KDE_GRID_POINTS) -> pd.DataFrame:
+    """columns: year, y, width. KDE per year on [min, max], width scaled to 0.4 at the mode."""
+    parts = []
+    for year, v in sorted(_values_by_year(data, kpi).items()):
+        if len(v) < 2 or v[-1] <= v[0]:
+            continue
+        grid = np.linspace(v[0], v[-1], points)
+        dens = kde_grid(v, grid)
+        width = 0.4 * dens / dens.max() if dens.max() > 0 else dens
+        parts.append(pd.DataFrame({"year": year, "y": grid, "width": width}))
+    if not parts:
+        return pd.DataFrame(columns=["year", "y", "width"])
+    return pd.concat(parts, ignore_index=True)
+
+def hist_kde_agg(data, kpi: str, date: pd.Timestamp, bins: int = 40, points: int = KDE_GRID_POINTS):
+    h = histogram_bins(data, kpi, date, bins)
+    k = kde_curve(data, kpi, date, points)
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=h["center"], y=h["count"], width=h["right"] - h["left"], opacity=0.85, name="Frequenza"))
+    if len(k) and len(h):
+        # KDE scaled to counts: density × n × bin width
+        scale = h["count"].sum() * float(h["right"].iloc[0] - h["left"].iloc[0])
+        fig.add_trace(go.Scatter(x=k["x"], y=k["density"] * scale, mode="lines", name="KDE"))
+    fig.update_layout(title=f"Distribuzione – {KPI_LABELS.get(kpi,kpi)} – {date.date()}",
+                      xaxis_title="Valore", yaxis_title="Frequenza", bargap=0, showlegend=False)
+    return fig
+
+def box_by_year_agg(data, kpi: str):
+    s = year_stats(data, kpi)
+    fig = go.Figure(go.Box(
+        x=s["year"], q1=s["q1"], median=s["median"], q3=s["q3"], mean=s["mean"],
+        lowerfence=s["lowerfence"], upperfence=s["upperfence"], boxpoints=False,
+    ))
+    fig.update_layout(title=f"Boxplot per anno – {KPI_LABELS.get(kpi,kpi)}",
+                      xaxis_title="Anno", yaxis_title="Valore", showlegend=False)
+    return fig
+
+def violin_by_year_agg(data, kpi: str, points: int = KDE_GRID_POINTS):
+    outline = violin_outline(data, kpi, points)
+    stats = year_stats(data, kpi).set_index("year")
+    fig = go.Figure()
+    for year, o in outline.groupby("year"):
+        # Closed outline: right side upwards, left side downwards
+        x = np.concatenate((year + o["width"].to_numpy(), (year - o["width"].to_numpy())[::-1]))
+        y = np.concatenate((o["y"].to_numpy(), o["y"].to_numpy()[::-1]))
+        fig.add_trace(go.Scatter(x=x, y=y, fill="toself", mode="lines", line=dict(width=1, color="#636efa"),
+                                 name=str(year), hoverinfo="skip"))
+        st_ = stats.loc[year]
+        fig.add_trace(go.Scatter(x=[year, year], y=[st_["q1"], st_["q3"]], mode="lines",
+                                 line=dict(width=6, color="#444"), hoverinfo="skip"))
+        fig.add_trace(go.Scatter(x=[year], y=[st_["median"]], mode="markers", marker=dict(color="white", size=6),
+                                 hovertemplate=f"{year}<br>mediana %{{y:,.2f}}<extra></extra>"))
+    fig.update_layout(title=f"Violin plot per anno – {KPI_LABELS.get(kpi,kpi)}",
+                      xaxis_title="Anno", yaxis_title="Valore", showlegend=False)
+    fig.update_xaxes(tickmode="array", tickvals=list(stats.index))
+    return fig
@@ -2,18 +2,52 @@ from __future__ import annotations
 import pandas as pd
 import numpy as np
 from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from scipy.optimize import nnls
+from .loader import ForecastCube
+from .cache import memoize
 
-def build_feature_matrix(df_long: pd.DataFrame, include_kpis: list[str], years: list[int]) -> pd.DataFrame:
+def build_feature_matrix(df_long: pd.DataFrame | ForecastCube, include_kpis: list[str], years: list[int]) -> pd.DataFrame:
+    if isinstance(df_long, ForecastCube):
+        return _cube_feature_matrix(df_long, include_kpis, years)
     sub = df_long[df_long["kpi"].isin(include_kpis)].copy()
     sub["year"] = sub["date"].dt.year
     sub = sub[sub["year"].isin(years)]
     # features: KPI-year columns
-    sub["col"] = sub["kpi"] + "_" + sub["year"].astype(str)
-    wide = sub.pivot_table(index="scenario", columns="col", values="value", aggfunc="first")
+    sub["col"] = sub["kpi"].astype(str) + "_" + sub["year"].astype(str)
+    wide = sub.pivot_table(index="scenario", columns="col", values="value", aggfunc="first", observed=True)
     wide = wide.dropna(axis=0, how="any")  # use complete cases
     return wide
 
+def _cube_feature_matrix(cube: ForecastCube, include_kpis: list[str], years: list[int]) -> pd.DataFrame:
+    """Same KPI_year features as build_feature_matrix, sliced from the cube (no pivot)."""
+    cols, blocks = [], []
+    date_years = cube.dates.year
+    for kpi in include_kpis:
+        if kpi not in cube.kpis:
+            continue
+        k = cube.kpis.get_loc(kpi)
+        for year in sorted(set(years)):
+            d_idx = np.flatnonzero(date_years == year)
+            if not len(d_idx):
+                continue
+            v = cube.values[:, k, d_idx]
+            # first available date of the year per scenario
+            first = np.argmax(~np.isnan(v), axis=1)
+            blocks.append(v[np.arange(v.shape[0]), first])
+            cols.append(f"{kpi}_{year}")
+    if not cols:
+        return pd.DataFrame(index=pd.Index([], name="scenario"))
+    X = np.column_stack(blocks)
+    order = np.argsort(cols)
+    X = X[:, order]
+    keep = ~np.isnan(X).any(axis=1)  # use complete cases
+    return pd.DataFrame(
+        X[keep],
+        index=pd.Index(cube.scenarios[keep], name="scenario"),
+        columns=pd.Index(np.array(cols)[order], name="col"),
+    )
+
 def kmeans_cluster(features: pd.DataFrame, n_clusters: int = 3, random_state: int = 42):
     scaler = StandardScaler()
     X = scaler.fit_transform(features.values)
@@ -23,3 +57,213 @@ def kmeans_cluster(features: pd.DataFrame, n_clusters: int = 3, random_state: in
     centers_df = pd.DataFrame(centers, columns=features.columns)
     out_labels = pd.Series(labels, index=features.index, name="cluster")
     return out_labels, centers_df
+
+def minibatch_cluster(
+    features: pd.DataFrame,
+    n_clusters: int = 3,
+    random_state: int = 42,
+    batch_size: int = 4096,
+):
+    """MiniBatchKMeans on standardized features. Returns (labels, centers_df)."""
+    X = features.to_numpy(dtype=np.float64)
+    mean = X.mean(axis=0)
+    std = X.std(axis=0)
+    std[std == 0] = 1.0
+    Z = (X - mean) / std
+    model = MiniBatchKMeans(n_clusters=n_clusters, n_init=3, batch_size=batch_size,
+                            random_state=random_state)
+    labels = model.fit_predict(Z)
+    centers_df = pd.DataFrame(model.cluster_centers_ * std + mean, columns=features.columns)
+    out_labels = pd.Series(labels, index=features.index, name="cluster")
+    return out_labels, centers_df
+
+@memoize(maxsize=16)
+def cluster_scenarios(
+    data: pd.DataFrame | ForecastCube,
+    include_kpis: list[str],
+    years: list[int],
+    n_clusters: int = 3,
+    random_state: int = 42,
+):
+    """
+    Mini-batch clustering of scenarios on KPI_year features, cached per
+    (dataset, KPI set, years, k). Returns (labels, centers_df).
+    """
+    features = build_feature_matrix(data, include_kpis, years)
+    return minibatch_cluster(features, n_clusters=n_clusters, random_state=random_state)
+
+# ---------------------------------------------------------------------------
+# Representative-scenario reduction
+# ---------------------------------------------------------------------------
+
+REDUCTION_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+# Weight fit: every representative keeps at least WEIGHT_FLOOR / n, the pick shares
+# only break ties (WEIGHT_PRIOR), the sum-to-one row dominates (WEIGHT_SUM).
+WEIGHT_FLOOR = 0.1
+WEIGHT_PRIOR = 1e-4
+WEIGHT_SUM = 10.0
+
+def weighted_quantile(values: np.ndarray, weights: np.ndarray, q) -> np.ndarray:
+    """
+    Quantiles of a weighted sample, linear interpolation: with equal weights this
+    is the same as np.quantile / pandas (plotting positions (S_i - w_i) / (S_n - w_n)).
+    """
+    order = np.argsort(values)
+    v = np.asarray(values, dtype=np.float64)[order]
+    w = np.asarray(weights, dtype=np.float64)[order]
+    if len(v) == 1:
+        return np.full(np.shape(q), v[0])
+    cw = np.cumsum(w)
+    pos = (cw - w) / (cw[-1] - w[-1])
+    return np.interp(q, pos, v)
+
+def _pick_medoids(Z: np.ndarray, n: int, random_state: int) -> tuple[np.ndarray, np.ndarray]:
+    """Cluster, then keep the actual scenario nearest to each center; weight = cluster share."""
+    model = MiniBatchKMeans(n_clusters=n, n_init=3, batch_size=4096, random_state=random_state)
+    labels = model.fit_predict(Z)
+    picks, weights = [], []
+    for j in range(n):
+        members = np.flatnonzero(labels == j)
+        if not len(members):
+            continue
+        d = ((Z[members] - model.cluster_centers_[j]) ** 2).sum(axis=1)
+        picks.append(members[np.argmin(d)])
+        weights.append(len(members))
+    return np.array(picks), np.array(weights, dtype=np.float64)
+
+def _pick_quantile_strata(Z: np.ndarray, n: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Order scenarios by their first principal component score, cut into n
+    equal-count strata and keep the scenario at the median of each stratum.
+    """
+    _, _, vt = np.linalg.svd(Z - Z.mean(axis=0), full_matrices=False)
+    order = np.argsort(Z @ vt[0])
+    strata = np.array_split(order, n)
+    picks = np.array([s[len(s) // 2] for s in strata if len(s)])
+    weights = np.array([len(s) for s in strata if len(s)], dtype=np.float64)
+    return picks, weights
+
+def _fit_weights(X: np.ndarray, prior: np.ndarray, targets: np.ndarray, slopes: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """
+    Weights of the representatives X (n, features) so that their weighted quantiles
+    hit the full-set targets (features, quantiles).
+
+    For each target, the representative a nearest to it should sit at plotting
+    position q in weighted_quantile: sum(w[x < x_a]) = q * (1 - w_max), linear in w.
+    Rows are scaled by the local slope of the full quantile function (in std
+    units), so residuals are comparable to value errors, and solved by NNLS
+    above a floor weight.
+    """
+    n, J = X.shape
+    rows = []
+    last = np.argmax(X, axis=0)
+    for j in range(J):
+        for k, qk in enumerate(q):
+            a = np.argmin(np.abs(X[:, j] - targets[j, k]))
+            r = (X[:, j] < X[a, j]).astype(np.float64) - qk
+            r[last[j]] += qk
+            rows.append(r * slopes[j, k])
+    A = np.vstack([np.array(rows), np.full((1, n), WEIGHT_SUM), np.sqrt(WEIGHT_PRIOR) * np.eye(n)])
+    b = np.concatenate([np.zeros(len(rows)), [WEIGHT_SUM], np.sqrt(WEIGHT_PRIOR) * prior])
+    floor = WEIGHT_FLOOR / n
+    w, _ = nnls(A, b - A.sum(axis=1) * floor)
+    w += floor
+    return w / w.sum()
+
+def _weighted_quantiles(X: np.ndarray, weights: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """Weighted quantiles of every column of X: (features, quantiles)."""
+    return np.array([weighted_quantile(X[:, j], weights, q) for j in range(X.shape[1])])
+
+@memoize(maxsize=16)
+def reduce_scenarios(
+    data: pd.DataFrame | ForecastCube,
+    include_kpis: list[str],
+    years: list[int],
+    n_representatives: int = 100,
+    method: str = "medoids",
+    random_state: int = 42,
+    quantiles: tuple = REDUCTION_QUANTILES,
+    tol: float = 0.1,
+    max_representatives: int | None = None,
+):
+    """
+    Pick about n_representatives actual scenarios with probability weights whose
+    weighted quantiles match the full set within tol (in std of each feature).
+
+    method: "medoids" (nearest scenario to each mini-batch k-means center) or
+    "quantile" (median scenario of equal-count strata along the first principal
+    component). The weights are then fitted to the full-set quantiles of every
+    feature (_fit_weights, the cluster/stratum shares as prior). While a
+    (feature, quantile) is off by more than tol, the scenario nearest to that
+    target is added and the weights refitted, so the set grows past
+    n_representatives when the features need it (ValueError beyond
+    max_representatives, default: no limit).
+    Returns (reps, report):
+      reps:   scenario, weight (sums to 1)
+      report: feature, quantile, full, reduced, abs_error, scaled_error, within_tol
+              (scaled_error = abs_error / std of the full feature; all within_tol)
+    """
+    features = build_feature_matrix(data, include_kpis, years)
+    if features.empty:
+        raise ValueError("No complete scenarios for the selected KPIs/years.")
+    X = features.to_numpy(dtype=np.float64)
+    n = min(n_representatives, len(X))
+    std = X.std(axis=0)
+    std[std == 0] = 1.0
+    Z = (X - X.mean(axis=0)) / std
+
+    if method not in ("medoids", "quantile"):
+        raise ValueError(f"Unknown reduction method: {method!r}. Use 'medoids' or 'quantile'.")
+    if n == len(X):
+        picks, prior = np.arange(n), np.ones(n)
+    elif method == "medoids":
+        picks, prior = _pick_medoids(Z, n, random_state)
+    else:
+        picks, prior = _pick_quantile_strata(Z, n)
+
+    q = np.array(quantiles)
+    full = np.quantile(X, q, axis=0).T  # (features, quantiles)
+    dq = 0.01
+    slopes = (np.quantile(X, np.minimum(q + dq, 1), axis=0) - np.quantile(X, np.maximum(q - dq, 0), axis=0)).T
+    slopes = np.maximum(slopes / (2 * dq) / std[:, None], 1.0)
+    limit = len(X) if max_representatives is None else min(max_representatives, len(X))
+    while True:
+        if len(picks) == len(X):
+            # every scenario: equal weights reproduce np.quantile exactly
+            weights = np.full(len(X), 1.0 / len(X))
+        else:
+            weights = _fit_weights(X[picks], prior / prior.sum(), full, slopes, q)
+        reduced = _weighted_quantiles(X[picks], weights, q)
+        scaled = np.abs(reduced - full) / std[:, None]
+        if (scaled <= tol).all():
+            break
+        # add the scenario nearest to each missed target, then refit
+        new = []
+        for j, k in np.argwhere(scaled > tol):
+            dist = np.abs(X[:, j] - full[j, k])
+            dist[picks] = np.inf
+            dist[new] = np.inf
+            if np.isfinite(dist).any():
+                new.append(int(np.argmin(dist)))
+        if len(picks) + len(new) > limit:
+            raise ValueError(
+                f"Weighted quantiles not within tol={tol} with {limit} representatives "
+                f"(max scaled error {scaled.max():.3f}); raise max_representatives or tol."
+            )
+        picks = np.concatenate([picks, new])
+        prior = np.concatenate([prior, np.full(len(new), np.median(prior))])
+
+    reps = pd.DataFrame({"scenario": features.index[picks], "weight": weights})
+    rows = []
+    for j, col in enumerate(features.columns):
+        for qi, f, r, e in zip(q, full[j], reduced[j], scaled[j]):
+            rows.append({"feature": col, "quantile": qi, "full": f, "reduced": r,
+                         "abs_error": abs(r - f), "scaled_error": e, "within_tol": e <= tol})
+    return reps, pd.DataFrame(rows)
+
+def reduced_long(df_long: pd.DataFrame, reps: pd.DataFrame) -> pd.DataFrame:
+    """Long frame restricted to the representative scenarios, with their weight."""
+    w = reps.set_index(reps["scenario"].astype(str))["weight"]
+    sub = df_long[df_long["scenario"].astype(str).isin(w.index)].copy()
+    sub["weight"] = sub["scenario"].astype(str).map(w).astype(np.float64)
+    return sub
@@ -15,5 +15,8 @@ FAN_CHART_BANDS = [(0.05, 0.95), (0.25, 0.75)]  # 90% and 50% bands
 # Default histogram bin count
 HIST_BINS = 40
 
+# Grid points for KDE curves and violin outlines in the aggregated charts
+KDE_GRID_POINTS = 256
+
 # Number of clusters for optional scenario clustering
 DEFAULT_N_CLUSTERS = 3
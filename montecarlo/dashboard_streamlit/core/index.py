@@ -0,0 +1,166 @@
+from __future__ import annotations
+from typing import Dict, Iterable
+import numpy as np
+import pandas as pd
+from .loader import ForecastCube
+
+class SortedValueIndex:
+    """
+    Values sorted once per (kpi, date) cell and packed into one contiguous array.
+
+    Cell c = kpi_idx * n_dates + date_idx holds values[offsets[c]:offsets[c+1]] in
+    ascending order; a running sum over the packed values gives tail means.
+    Quantiles are answered by indexing, thresholds by searchsorted: nothing is
+    rescanned after the index is built.
+    """
+
+    def __init__(self, kpis: pd.Index, dates: pd.DatetimeIndex, values: np.ndarray, offsets: np.ndarray):
+        self.kpis = pd.Index(kpis)
+        self.dates = pd.DatetimeIndex(dates)
+        self.values = values
+        self.offsets = offsets
+        self.counts = np.diff(offsets).reshape(len(self.kpis), len(self.dates))
+        # sum(values[a:b]) == _csum[b] - _csum[a]
+        self._csum = np.concatenate(([0.0], np.cumsum(values)))
+
+    @classmethod
+    def from_cube(cls, cube: ForecastCube) -> "SortedValueIndex":
+        srt, counts = cube.sorted_view()  # (kpi, date, scenario), NaN last
+        keep = np.arange(srt.shape[2]) < counts[..., None]
+        offsets = np.concatenate(([0], np.cumsum(counts.ravel())))
+        return cls(cube.kpis, cube.dates, srt[keep].astype(np.float64), offsets)
+
+    @classmethod
+    def from_long(cls, df_long: pd.DataFrame) -> "SortedValueIndex":
+        kpi = df_long["kpi"].astype("category")
+        d_codes, dates = pd.factorize(df_long["date"], sort=True)
+        cell = kpi.cat.codes.to_numpy().astype(np.int64) * len(dates) + d_codes
+        v = df_long["value"].to_numpy(dtype=np.float64)
+        order = np.lexsort((v, cell))
+        n_cells = len(kpi.cat.categories) * len(dates)
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(cell, minlength=n_cells))))
+        return cls(pd.Index(kpi.cat.categories), pd.DatetimeIndex(dates), v[order], offsets)
+
+    # ---- cell helpers ----
+
+    def _cells(self, kpi: str) -> np.ndarray:
+        """Cell ids of a KPI for all dates (empty if the KPI is unknown)."""
+        if kpi not in self.kpis:
+            return np.empty(0, dtype=np.int64)
+        return self.kpis.get_loc(kpi) * len(self.dates) + np.arange(len(self.dates))
+
+    def _quantiles(self, cells: np.ndarray, q: np.ndarray) -> np.ndarray:
+        """(len(q), len(cells)) linear-interpolated quantiles; NaN for empty cells."""
+        start = self.offsets[cells]
+        n = self.offsets[cells + 1] - start
+        pos = np.asarray(q, dtype=np.float64)[:, None] * np.maximum(n - 1, 0)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.minimum(lo + 1, np.maximum(n - 1, 0))
+        if len(self.values) == 0:
+            return np.full(pos.shape, np.nan)
+        a = self.values[np.minimum(start + lo, len(self.values) - 1)]
+        b = self.values[np.minimum(start + hi, len(self.values) - 1)]
+        return np.where(n > 0, a + (b - a) * (pos - lo), np.nan)
+
+    def _count_le(self, cells: np.ndarray, threshold: float, strict: bool) -> np.ndarray:
+        side = "left" if strict else "right"
+        return np.array(
+            [np.searchsorted(self.values[self.offsets[c]:self.offsets[c + 1]], threshold, side=side) for c in cells],
+            dtype=np.int64,
+        )
+
+    def _present(self, cells: np.ndarray) -> np.ndarray:
+        return cells[self.offsets[cells + 1] > self.offsets[cells]]
+
+    def _dates_of(self, cells: np.ndarray) -> pd.DatetimeIndex:
+        return self.dates[cells % len(self.dates)]
+
+    # ---- queries ----
+
+    def values_at(self, kpi: str, date: pd.Timestamp) -> np.ndarray:
+        """Sorted values of one (kpi, date) cell (a view; empty if absent)."""
+        if kpi not in self.kpis or date not in self.dates:
+            return self.values[:0]
+        c = self.kpis.get_loc(kpi) * len(self.dates) + self.dates.get_loc(date)
+        return self.values[self.offsets[c]:self.offsets[c + 1]]
+
+    def quantile(self, kpi: str, q: float) -> pd.Series:
+        cells = self._present(self._cells(kpi))
+        return pd.Series(self._quantiles(cells, np.array([q]))[0], index=self._dates_of(cells))
+
+    def percentiles(self, quantiles: Iterable[float] = (0.05, 0.25, 0.5, 0.75, 0.95)) -> pd.DataFrame:
+        """Same table as transform.compute_percentiles: kpi, date, q_XX columns."""
+        q = np.array(list(quantiles))
+        cells = self._present(np.arange(len(self.kpis) * len(self.dates)))
+        qv = self._quantiles(cells, q)
+        out = pd.DataFrame({"kpi": self.kpis[cells // len(self.dates)], "date": self._dates_of(cells)})
+        for i, x in enumerate(q):
+            out[f"q_{int(x*100):02d}"] = qv[i]
+        return out
+
+    def fan_chart(self, kpi: str, quantile_bands: list[tuple[float, float]]) -> pd.DataFrame:
+        """Same table as transform.fan_chart_data."""
+        qs = sorted({0.5, *[a for band in quantile_bands for a in band]})
+        cells = self._present(self._cells(kpi))
+        qv = dict(zip(qs, self._quantiles(cells, np.array(qs))))
+        out = pd.DataFrame({"date": self._dates_of(cells), "median": qv[0.5]})
+        for low, high in quantile_bands:
+            out[f"low_{int(low*100)}"] = qv[low]
+            out[f"high_{int(high*100)}"] = qv[high]
+        return out
+
+    def var(self, kpi: str, alpha: float = 0.05) -> pd.DataFrame:
+        """Same table as risk.var_like: date, var_alpha."""
+        cells = self._present(self._cells(kpi))
+        return pd.DataFrame({"date": self._dates_of(cells), "var_alpha": self._quantiles(cells, np.array([alpha]))[0]})
+
+    def cvar(self, kpi: str, alpha: float = 0.05) -> pd.DataFrame:
+        """
+        Left-tail mean per date: average of the lowest ceil(alpha * n) values
+        (at least one). O(1) per date from the running sums.
+        """
+        cells = self._present(self._cells(kpi))
+        start = self.offsets[cells]
+        n = self.offsets[cells + 1] - start
+        m = np.maximum(np.ceil(alpha * n).astype(np.int64), 1)
+        tail = (self._csum[start + m] - self._csum[start]) / m
+        return pd.DataFrame({"date": self._dates_of(cells), "cvar_alpha": tail})
+
+    def breach(self, kpi: str, threshold: float, direction: str = "below") -> pd.DataFrame:
+        """Same table as risk.breach_probability: date, breach_prob (strict inequality)."""
+        cells = self._present(self._cells(kpi))
+        n = self.offsets[cells + 1] - self.offsets[cells]
+        if direction == "below":
+            hits = self._count_le(cells, threshold, strict=True)
+        else:
+            hits = n - self._count_le(cells, threshold, strict=False)
+        return pd.DataFrame({"date": self._dates_of(cells), "breach_prob": hits / n})
+
+    def exceed(
+        self,
+        threshold_by_kpi: Dict[str, float],
+        direction_by_kpi: Dict[str, str] | None = None,
+    ) -> pd.DataFrame:
+        """Same table as transform.exceed_probability: kpi, date, probability (inclusive)."""
+        if direction_by_kpi is None:
+            direction_by_kpi = {}
+        cells = self._present(np.arange(len(self.kpis) * len(self.dates)))
+        n = self.offsets[cells + 1] - self.offsets[cells]
+        hits = np.zeros(len(cells), dtype=np.int64)
+        kidx = cells // len(self.dates)
+        for j, k in enumerate(self.kpis):
+            thr = threshold_by_kpi.get(k, np.nan)
+            if np.isnan(thr):
+                continue
+            sel = kidx == j
+            if direction_by_kpi.get(k, "above") == "below":
+                hits[sel] = self._count_le(cells[sel], thr, strict=False)
+            else:
+                hits[sel] = n[sel] - self._count_le(cells[sel], thr, strict=True)
+        return pd.DataFrame({"kpi": self.kpis[kidx], "date": self._dates_of(cells), "probability": hits / n})
+
+def build_index(data: pd.DataFrame | ForecastCube) -> SortedValueIndex:
+    """SortedValueIndex from the long frame or the dense cube."""
+    if isinstance(data, ForecastCube):
+        return SortedValueIndex.from_cube(data)
+    return SortedValueIndex.from_long(data)
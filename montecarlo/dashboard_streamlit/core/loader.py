@@ -1,8 +1,11 @@
 from __future__ import annotations
+import hashlib
 import json
-from dataclasses import dataclass
+import os
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Dict, Any, Tuple
+import numpy as np
 import pandas as pd
 from dateutil import parser as dateparser
 
@@ -12,35 +15,406 @@ class Meta:
     currency: str
     periodicity: str
 
+@dataclass
+class ForecastCube:
+    """
+    Dense view of the long data: values[scenario, kpi, date], NaN where missing.
+    scenarios/kpis/dates are sorted and match the categories of the long frame,
+    so cube indices and categorical codes are interchangeable.
+    """
+    scenarios: pd.Index
+    kpis: pd.Index
+    dates: pd.DatetimeIndex
+    values: np.ndarray
+    _sorted: Tuple[np.ndarray, np.ndarray] | None = field(default=None, repr=False, compare=False)
+
+    @classmethod
+    def from_long(cls, df_long: pd.DataFrame, dtype=np.float64) -> "ForecastCube":
+        scen = df_long["scenario"].astype("category")
+        kpi = df_long["kpi"].astype("category")
+        date_codes, dates = pd.factorize(df_long["date"], sort=True)
+        values = np.full((len(scen.cat.categories), len(kpi.cat.categories), len(dates)), np.nan, dtype=dtype)
+        # Duplicated (scenario, kpi, date) cells: the last record wins
+        values[scen.cat.codes.to_numpy(), kpi.cat.codes.to_numpy(), date_codes] = df_long["value"].to_numpy()
+        return cls(
+            scenarios=pd.Index(scen.cat.categories),
+            kpis=pd.Index(kpi.cat.categories),
+            dates=pd.DatetimeIndex(dates),
+            values=values,
+        )
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        return self.values.shape
+
+    def kpi_slice(self, kpi: str) -> np.ndarray:
+        """(n_scenarios, n_dates) values for one KPI; empty if the KPI is unknown."""
+        if kpi not in self.kpis:
+            return np.empty((len(self.scenarios), 0), dtype=self.values.dtype)
+        return self.values[:, self.kpis.get_loc(kpi), :]
+
+    def sorted_view(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (kpi, date, scenario) values sorted along scenarios, NaN last, contiguous per
+        (kpi, date) cell, and the (kpi, date) count of non-NaN values. Computed once.
+        """
+        if self._sorted is None:
+            srt = np.ascontiguousarray(np.sort(self.values, axis=0).transpose(1, 2, 0))
+            counts = (~np.isnan(self.values)).sum(axis=0)
+            self._sorted = (srt, counts)
+        return self._sorted
+
+    def to_long(self) -> pd.DataFrame:
+        """Back to the long format (present cells only)."""
+        s, k, d = np.nonzero(~np.isnan(self.values))
+        return pd.DataFrame({
+            "scenario": pd.Categorical.from_codes(s, categories=self.scenarios),
+            "date": self.dates[d],
+            "kpi": pd.Categorical.from_codes(k, categories=self.kpis),
+            "value": self.values[s, k, d],
+        })
+
 def _normalize_date(s: str) -> pd.Timestamp:
     # robust parsing, normalize to period-end date
     dt = dateparser.parse(s)
     return pd.Timestamp(dt)
 
-def load_forecast_json(path: Path) -> Tuple[pd.DataFrame, Meta, Dict[str, Any]]:
-    with open(path, "r", encoding="utf-8") as f:
-        obj = json.load(f)
+def _parse_dates(col: pd.Series) -> pd.Series:
+    # Parse each distinct date once, then broadcast back through the codes
+    codes, uniques = pd.factorize(col.astype(str))
+    parsed = pd.DatetimeIndex([_normalize_date(u) for u in uniques])
+    return pd.Series(parsed.take(codes), index=col.index)
+
+def _parse_header(obj: Dict[str, Any]) -> Meta:
     version = obj.get("version")
     if version != "1.0":
         raise ValueError(f"Unsupported version: {version!r}. Expected '1.0'.")
     meta_obj = obj.get("meta") or {}
-    meta = Meta(
+    return Meta(
         company=meta_obj.get("company", "N/A"),
         currency=meta_obj.get("currency", "EUR"),
         periodicity=meta_obj.get("periodicity", "annual"),
     )
+
+def load_forecast_json(path: Path) -> Tuple[pd.DataFrame, Meta, Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        obj = json.load(f)
+    meta = _parse_header(obj)
     records = obj.get("records") or []
     if not records:
         raise ValueError("No 'records' found in JSON.")
     df = pd.DataFrame.from_records(records)
+    return _finalize(df), meta, obj
+
+def load_forecast_ndjson(path: Path) -> Tuple[pd.DataFrame, Meta, Dict[str, Any]]:
+    # First line is the {"version","meta"} header, then one record per line
+    with open(path, "r", encoding="utf-8") as f:
+        obj = json.loads(f.readline())
+        meta = _parse_header(obj)
+        df = pd.read_json(f, lines=True, dtype={"scenario": str, "kpi": str, "date": str})
+    if df.empty:
+        raise ValueError("No records found in NDJSON.")
+    return _finalize(df), meta, obj
+
+def load_forecast_parquet(path: Path) -> Tuple[pd.DataFrame, Meta, Dict[str, Any]]:
+    # Columnar file from excel_reader --format parquet: version/meta in schema metadata
+    import pyarrow.parquet as pq
+    table = pq.read_table(path)
+    md = {k.decode(): v.decode() for k, v in (table.schema.metadata or {}).items()}
+    obj = {"version": md.get("version"), "meta": json.loads(md.get("meta", "{}"))}
+    meta = _parse_header(obj)
+    if table.num_rows == 0:
+        raise ValueError("No records found in Parquet.")
+    return _finalize(table.to_pandas(date_as_object=False)), meta, obj
+
+def load_forecast_file(path: Path) -> Tuple[pd.DataFrame, Meta, Dict[str, Any]]:
+    """Dispatch on suffix: .json (1.0 object), .ndjson/.jsonl, .parquet."""
+    suffix = Path(path).suffix.lower()
+    if suffix in (".ndjson", ".jsonl"):
+        return load_forecast_ndjson(path)
+    if suffix == ".parquet":
+        return load_forecast_parquet(path)
+    return load_forecast_json(path)
+
+def _finalize(df: pd.DataFrame) -> pd.DataFrame:
     required = {"scenario", "date", "kpi", "value"}
     missing = required - set(df.columns)
     if missing:
         raise ValueError(f"Missing columns in records: {missing}")
-    # Normalize types
-    df["scenario"] = df["scenario"].astype(str)
-    df["kpi"] = df["kpi"].astype(str)
-    df["value"] = pd.to_numeric(df["value"], errors="coerce")
-    df["date"] = df["date"].apply(_normalize_date)
-    df = df.dropna(subset=["value"])
-    return df, meta, obj
+    # Normalize types: categorical labels (sorted categories), one parse per distinct date
+    df = df[["scenario", "date", "kpi", "value"]]
+    df = df.assign(
+        scenario=pd.Categorical(df["scenario"].astype(str)),
+        kpi=pd.Categorical(df["kpi"].astype(str)),
+        value=pd.to_numeric(df["value"], errors="coerce").astype(np.float64),
+        date=pd.to_datetime(df["date"]) if pd.api.types.is_datetime64_any_dtype(df["date"]) else _parse_dates(df["date"]),
+    )
+    df = df.dropna(subset=["value"]).reset_index(drop=True)
+    return df
+
+def build_cube(df_long: pd.DataFrame, dtype=np.float64) -> ForecastCube:
+    """Dense (scenario × kpi × date) cube of the long data, for core.transform/core.risk."""
+    return ForecastCube.from_long(df_long, dtype=dtype)
+
+# ---------------------------------------------------------------------------
+# CSV inputs read straight into the cube (no long DataFrame in between)
+#  - generator output: run,[replicate,]variable,<period...> (wide, one row per run × variable)
+#  - long CSV: "# key: value" comment header, then scenario,date,kpi,value
+# ---------------------------------------------------------------------------
+
+CSV_CHUNK_ROWS = 200_000
+REFERENCE_SCENARIOS = ("base", "best", "worst")
+
+class _Codes:
+    """Incremental label -> code mapping shared across chunks."""
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+
+    def encode(self, labels: np.ndarray) -> np.ndarray:
+        codes, uniques = pd.factorize(labels)
+        lut = np.array([self.codes.setdefault(str(u), len(self.codes)) for u in uniques], dtype=np.int64)
+        return lut[codes]
+
+    def sorted_remap(self) -> Tuple[pd.Index, np.ndarray]:
+        """Sorted labels and old code -> new code array."""
+        labels = np.array(list(self.codes), dtype=object)
+        order = np.argsort(labels, kind="stable")
+        remap = np.empty(len(labels), dtype=np.int64)
+        remap[order] = np.arange(len(labels))
+        return pd.Index(labels[order].astype(str)), remap
+
+def _parse_period(label: str) -> pd.Timestamp:
+    # ISO labels such as "2025-01" or "2025-01-31" first: dateutil would fill a
+    # missing day from today's date
+    try:
+        return pd.Timestamp(label)
+    except ValueError:
+        return _normalize_date(label)
+
+def _guess_periodicity(dates: pd.DatetimeIndex) -> str:
+    if len(dates) < 2:
+        return "annual"
+    step = float(np.median(np.diff(dates.values).astype("timedelta64[D]").astype(np.float64)))
+    return "monthly" if step <= 31 else ("quarterly" if step <= 92 else "annual")
+
+def _read_comment_header(path: Path) -> Tuple[Dict[str, str], int]:
+    """Leading '# key: value' lines -> (dict, number of comment lines)."""
+    meta: Dict[str, str] = {}
+    n = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            s = line.strip()
+            if not s.startswith("#"):
+                break
+            n += 1
+            key, sep, value = s.lstrip("#").partition(":")
+            if sep:
+                meta[key.strip().lower()] = value.strip()
+    return meta, n
+
+def load_generator_csv(
+    path: Path,
+    keep_reference: bool = False,
+    chunksize: int = CSV_CHUNK_ROWS,
+    dtype=np.float64,
+) -> Tuple[ForecastCube, Meta]:
+    """
+    Wide generator output (montecarlo_generate_*: run,[replicate,]variable,<period...>)
+    into a ForecastCube: scenario = run, kpi = variable, dates = period headers.
+    The replicate column is ignored; base/best/worst rows are dropped unless
+    keep_reference. Read in chunks with the C parser; each chunk is written
+    into the cube as a block, the long format is never built.
+    """
+    meta_obj, n_comments = _read_comment_header(path)
+    header = pd.read_csv(path, nrows=0, skiprows=n_comments).columns
+    missing = {"run", "variable"} - set(header)
+    if missing:
+        raise ValueError(f"Missing columns in generator CSV: {missing}")
+    period_cols = [c for c in header if c not in ("run", "replicate", "variable")]
+    dates = pd.DatetimeIndex([_parse_period(c) for c in period_cols])
+
+    scen, kpi = _Codes(), _Codes()
+    parts = []
+    reader = pd.read_csv(
+        path, engine="c", skiprows=n_comments, chunksize=chunksize,
+        usecols=["run", "variable", *period_cols],
+        dtype={"run": str, "variable": str, **{c: dtype for c in period_cols}},
+    )
+    for chunk in reader:
+        runs = chunk["run"].to_numpy()
+        if not keep_reference:
+            keep = ~np.isin(runs, REFERENCE_SCENARIOS)
+            chunk, runs = chunk[keep], runs[keep]
+        if chunk.empty:
+            continue
+        parts.append((scen.encode(runs), kpi.encode(chunk["variable"].to_numpy()), chunk[period_cols].to_numpy(dtype=dtype)))
+    if not parts:
+        raise ValueError("No scenario rows found in generator CSV.")
+
+    scenarios, s_remap = scen.sorted_remap()
+    kpis, k_remap = kpi.sorted_remap()
+    order = np.argsort(dates, kind="stable")
+    values = np.full((len(scenarios), len(kpis), len(dates)), np.nan, dtype=dtype)
+    for s_codes, k_codes, block in parts:
+        values[s_remap[s_codes], k_remap[k_codes], :] = block[:, order]
+    dates = dates[order]
+    meta = Meta(
+        company=meta_obj.get("company", "N/A"),
+        currency=meta_obj.get("currency", "EUR"),
+        periodicity=meta_obj.get("periodicity", _guess_periodicity(dates)),
+    )
+    return ForecastCube(scenarios=scenarios, kpis=kpis, dates=dates, values=values), meta
+
+def load_long_csv(
+    path: Path,
+    keep_reference: bool = False,
+    chunksize: int = CSV_CHUNK_ROWS,
+    dtype=np.float64,
+) -> Tuple[ForecastCube, Meta]:
+    """
+    Long CSV scenario,date,kpi,value with a '# key: value' comment header
+    (company, currency, periodicity) into a ForecastCube. Chunks are reduced to
+    integer codes (each distinct date parsed once) and scattered into the cube.
+    """
+    meta_obj, n_comments = _read_comment_header(path)
+    scen, kpi, date = _Codes(), _Codes(), _Codes()
+    parts = []
+    reader = pd.read_csv(
+        path, engine="c", skiprows=n_comments, chunksize=chunksize,
+        usecols=["scenario", "date", "kpi", "value"],
+        dtype={"scenario": str, "date": str, "kpi": str, "value": dtype},
+    )
+    for chunk in reader:
+        chunk = chunk.dropna(subset=["value"])
+        runs = chunk["scenario"].to_numpy()
+        if not keep_reference:
+            keep = ~np.isin(runs, REFERENCE_SCENARIOS)
+            chunk, runs = chunk[keep], runs[keep]
+        if chunk.empty:
+            continue
+        parts.append((
+            scen.encode(runs),
+            kpi.encode(chunk["kpi"].to_numpy()),
+            date.encode(chunk["date"].to_numpy()),
+            chunk["value"].to_numpy(dtype=dtype),
+        ))
+    if not parts:
+        raise ValueError("No records found in CSV.")
+
+    scenarios, s_remap = scen.sorted_remap()
+    kpis, k_remap = kpi.sorted_remap()
+    # Date labels may be written in different formats: parse, then sort by value
+    date_labels = list(date.codes)
+    parsed = pd.DatetimeIndex([_parse_period(d) for d in date_labels])
+    uniq, d_remap = np.unique(parsed.values, return_inverse=True)
+    values = np.full((len(scenarios), len(kpis), len(uniq)), np.nan, dtype=dtype)
+    for s_codes, k_codes, d_codes, v in parts:
+        values[s_remap[s_codes], k_remap[k_codes], d_remap[d_codes]] = v
+    dates = pd.DatetimeIndex(uniq)
+    meta = Meta(
+        company=meta_obj.get("company", "N/A"),
+        currency=meta_obj.get("currency", "EUR"),
+        periodicity=meta_obj.get("periodicity", _guess_periodicity(dates)),
+    )
+    return ForecastCube(scenarios=scenarios, kpis=kpis, dates=dates, values=values), meta
+
+def load_forecast_cube(path: Path) -> Tuple[ForecastCube, Meta]:
+    """
+    Any supported input as (cube, meta). CSV/TXT files are recognised by their
+    header (run,...,variable → generator output; scenario,date,kpi,value → long CSV);
+    other suffixes go through load_forecast_file.
+    """
+    path = Path(path)
+    if path.suffix.lower() in (".csv", ".txt"):
+        _, n_comments = _read_comment_header(path)
+        header = set(pd.read_csv(path, nrows=0, skiprows=n_comments).columns)
+        if {"run", "variable"} <= header:
+            return load_generator_csv(path)
+        if {"scenario", "date", "kpi", "value"} <= header:
+            return load_long_csv(path)
+        raise ValueError(f"Unrecognised CSV header: {sorted(header)}")
+    df, meta, _ = load_forecast_file(path)
+    return build_cube(df), meta
+
+# ---------------------------------------------------------------------------
+# Memory-mapped cube files: an input is converted once to <cache>/<name>.<key>.npy
+# (values, float64, scenarios × kpis × dates) plus a JSON sidecar with labels and
+# meta. Later loads, from any session or process, map the same file read-only, so
+# the values live once in the OS page cache instead of once per session.
+# ---------------------------------------------------------------------------
+
+CUBE_FILE_VERSION = 1
+
+def _cube_key(path: Path) -> str:
+    st = path.stat()
+    raw = f"{CUBE_FILE_VERSION}|{path.resolve()}|{st.st_mtime_ns}|{st.st_size}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+def save_cube_file(cube: ForecastCube, meta: Meta, npy_path: Path, source: str = "") -> None:
+    """Write values with open_memmap and the sidecar JSON; the sidecar is written last (commit marker)."""
+    npy_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_npy = npy_path.with_name(npy_path.name + ".tmp")
+    mm = np.lib.format.open_memmap(tmp_npy, mode="w+", dtype=np.float64, shape=cube.values.shape)
+    mm[...] = cube.values
+    mm.flush()
+    del mm
+    os.replace(tmp_npy, npy_path)
+    sidecar = {
+        "version": CUBE_FILE_VERSION,
+        "source": source,
+        "shape": list(cube.values.shape),
+        "scenarios": [str(s) for s in cube.scenarios],
+        "kpis": [str(k) for k in cube.kpis],
+        "dates": [d.isoformat() for d in cube.dates],
+        "meta": {"company": meta.company, "currency": meta.currency, "periodicity": meta.periodicity},
+    }
+    json_path = npy_path.with_suffix(".json")
+    tmp_json = json_path.with_name(json_path.name + ".tmp")
+    with open(tmp_json, "w", encoding="utf-8") as f:
+        json.dump(sidecar, f)
+    os.replace(tmp_json, json_path)
+
+def open_cube_file(npy_path: Path) -> Tuple[ForecastCube, Meta]:
+    """Map a cube file read-only (values are an np.memmap)."""
+    with open(npy_path.with_suffix(".json"), "r", encoding="utf-8") as f:
+        sidecar = json.load(f)
+    if sidecar.get("version") != CUBE_FILE_VERSION:
+        raise ValueError(f"Unsupported cube file version: {sidecar.get('version')!r}")
+    values = np.load(npy_path, mmap_mode="r")
+    if list(values.shape) != sidecar["shape"]:
+        raise ValueError(f"Cube file shape {values.shape} does not match sidecar {sidecar['shape']}")
+    cube = ForecastCube(
+        scenarios=pd.Index(sidecar["scenarios"]),
+        kpis=pd.Index(sidecar["kpis"]),
+        dates=pd.DatetimeIndex(pd.to_datetime(sidecar["dates"])),
+        values=values,
+    )
+    m = sidecar.get("meta") or {}
+    return cube, Meta(company=m.get("company", "N/A"), currency=m.get("currency", "EUR"), periodicity=m.get("periodicity", "annual"))
+
+def load_cube_cached(path: Path, cache_dir: Path | None = None) -> Tuple[ForecastCube, Meta]:
+    """
+    load_forecast_cube() through a memory-mapped cube file keyed by the input's
+    path, mtime and size (default cache dir: <input dir>/.cube_cache). The first
+    call converts and writes the file; repeat calls only map it.
+    """
+    path = Path(path)
+    cache_dir = Path(cache_dir) if cache_dir is not None else path.parent / ".cube_cache"
+    npy_path = cache_dir / f"{path.stem}.{_cube_key(path)}.npy"
+    if npy_path.with_suffix(".json").exists() and npy_path.exists():
+        try:
+            return open_cube_file(npy_path)
+        except (ValueError, OSError, KeyError):
+            pass  # unreadable or partial: rebuild below
+    cube, meta = load_forecast_cube(path)
+    try:
+        save_cube_file(cube, meta, npy_path, source=str(path))
+        # Drop files of older versions of the same input
+        for old in cache_dir.glob(f"{path.stem}.*.npy"):
+            key = old.name[len(path.stem) + 1:-len(".npy")]
+            if old != npy_path and len(key) == 16 and "." not in key:
+                old.unlink(missing_ok=True)
+                old.with_suffix(".json").unlink(missing_ok=True)
+        return open_cube_file(npy_path)
+    except OSError:
+        return cube, meta  # read-only location: serve the in-memory cube
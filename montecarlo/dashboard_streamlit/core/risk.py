@@ -1,13 +1,28 @@
 from __future__ import annotations
 import pandas as pd
 import numpy as np
+from .loader import ForecastCube
+from .index import SortedValueIndex, build_index
+from .cache import memoize
+from .transform import nan_quantiles
 
-def breach_probability(df_long: pd.DataFrame, kpi: str, threshold: float, direction: str = "below") -> pd.DataFrame:
+@memoize()
+def breach_probability(df_long: pd.DataFrame | ForecastCube | SortedValueIndex, kpi: str, threshold: float, direction: str = "below") -> pd.DataFrame:
     """
     Probability of breaching a covenant threshold for a KPI per date.
     direction: "below" (default) flags values < threshold as breach; "above" flags values > threshold.
     Returns DataFrame with columns: date, breach_prob.
     """
+    if isinstance(df_long, SortedValueIndex):
+        return df_long.breach(kpi, threshold, direction)
+    if isinstance(df_long, ForecastCube):
+        v = df_long.kpi_slice(kpi)
+        n = (~np.isnan(v)).sum(axis=0)
+        keep = n > 0
+        if not keep.any():
+            return pd.DataFrame(columns=["date", "breach_prob"])
+        breach = (v < threshold) if direction == "below" else (v > threshold)
+        return pd.DataFrame({"date": df_long.dates[keep], "breach_prob": breach.sum(axis=0)[keep] / n[keep]})
     sub = df_long[df_long["kpi"] == kpi].copy()
     if sub.empty:
         return pd.DataFrame(columns=["date", "breach_prob"])
@@ -15,16 +30,34 @@ def breach_probability(df_long: pd.DataFrame, kpi: str, threshold: float, direct
         cond = sub["value"] < threshold
     else:
         cond = sub["value"] > threshold
-    probs = sub.assign(breach=cond).groupby("date")["breach"].mean().reset_index(name="breach_prob")
+    probs = sub.assign(breach=cond).groupby("date", observed=True)["breach"].mean().reset_index(name="breach_prob")
     return probs
 
-def var_like(df_long: pd.DataFrame, kpi: str, alpha: float = 0.05) -> pd.DataFrame:
+@memoize()
+def var_like(df_long: pd.DataFrame | ForecastCube | SortedValueIndex, kpi: str, alpha: float = 0.05) -> pd.DataFrame:
     """
     Left-tail quantile per date for the KPI (e.g., 5% quantile for loss-like metrics).
     Returns DataFrame with columns: date, var_alpha.
     """
+    if isinstance(df_long, SortedValueIndex):
+        return df_long.var(kpi, alpha)
+    if isinstance(df_long, ForecastCube):
+        v = df_long.kpi_slice(kpi)
+        keep = ~np.isnan(v).all(axis=0)
+        if not keep.any():
+            return pd.DataFrame(columns=["date", "var_alpha"])
+        return pd.DataFrame({"date": df_long.dates[keep], "var_alpha": nan_quantiles(v[:, keep], np.array([alpha]))[0]})
     sub = df_long[df_long["kpi"] == kpi]
     if sub.empty:
         return pd.DataFrame(columns=["date", "var_alpha"])
-    out = sub.groupby("date")["value"].quantile(alpha).reset_index(name="var_alpha")
+    out = sub.groupby("date", observed=True)["value"].quantile(alpha).reset_index(name="var_alpha")
     return out
+
+@memoize()
+def cvar_like(df_long: pd.DataFrame | ForecastCube | SortedValueIndex, kpi: str, alpha: float = 0.05) -> pd.DataFrame:
+    """
+    Left-tail mean per date for the KPI: average of the lowest ceil(alpha * n) values.
+    Returns DataFrame with columns: date, cvar_alpha.
+    """
+    index = df_long if isinstance(df_long, SortedValueIndex) else build_index(df_long)
+    return index.cvar(kpi, alpha)
@@ -2,24 +2,65 @@ from __future__ import annotations
 import pandas as pd
 import numpy as np
 from typing import Iterable, Tuple, Dict
+from .loader import ForecastCube
+from .index import SortedValueIndex
+from .cache import memoize
 
+# Every function accepts the long DataFrame (scenario, date, kpi, value), the
+# dense ForecastCube (core.loader.build_cube) or, where only per-(kpi, date)
+# distributions are needed, the SortedValueIndex (core.index.build_index).
+# Derived tables are memoized on the dataset fingerprint plus parameters.
+
+def nan_quantiles(values: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """
+    Quantiles along axis 0 ignoring NaN, linear interpolation (same as pandas).
+    values: (n, ...); returns (len(q), ...), NaN where a slice has no values.
+    One sort for all quantiles instead of np.nanquantile's per-slice fallback.
+    """
+    srt = np.sort(values, axis=0)  # NaN sorted last
+    n = (~np.isnan(values)).sum(axis=0)
+    q = np.asarray(q, dtype=np.float64).reshape((-1,) + (1,) * (values.ndim - 1))
+    pos = q * np.maximum(n - 1, 0)
+    lo = np.floor(pos).astype(np.intp)
+    hi = np.minimum(lo + 1, np.maximum(n - 1, 0))
+    frac = pos - lo
+    a = np.take_along_axis(srt, lo, axis=0)
+    b = np.take_along_axis(srt, hi, axis=0)
+    out = a + (b - a) * frac
+    return np.where(n > 0, out, np.nan)
+
+def _present(cube: ForecastCube) -> Tuple[np.ndarray, np.ndarray]:
+    """(kpi, date) index pairs with at least one value, in kpi-then-date order."""
+    return np.nonzero((~np.isnan(cube.values)).any(axis=0))
+
+@memoize()
 def compute_percentiles(
-    df_long: pd.DataFrame,
+    df_long: pd.DataFrame | ForecastCube | SortedValueIndex,
     quantiles: Iterable[float] = (0.05, 0.25, 0.5, 0.75, 0.95),
 ) -> pd.DataFrame:
     """
     df_long columns: scenario, date, kpi, value
     Returns multi-index rows by [kpi, date] and quantile columns.
     """
+    if isinstance(df_long, SortedValueIndex):
+        return df_long.percentiles(quantiles)
     q = np.array(list(quantiles))
-    grouped = df_long.groupby(["kpi", "date"])["value"]
+    if isinstance(df_long, ForecastCube):
+        qv = nan_quantiles(df_long.values, q)  # (nq, kpi, date)
+        kk, dd = _present(df_long)
+        out = pd.DataFrame({"kpi": df_long.kpis[kk], "date": df_long.dates[dd]})
+        for i, x in enumerate(q):
+            out[f"q_{int(x*100):02d}"] = qv[i, kk, dd]
+        return out
+    grouped = df_long.groupby(["kpi", "date"], observed=True)["value"]
     out = grouped.quantile(q).unstack(level=-1)
     out.columns = [f"q_{int(x*100):02d}" for x in q]
     out = out.reset_index()
     return out
 
+@memoize()
 def exceed_probability(
-    df_long: pd.DataFrame,
+    df_long: pd.DataFrame | ForecastCube | SortedValueIndex,
     threshold_by_kpi: Dict[str, float],
     direction_by_kpi: Dict[str, str] | None = None,
 ) -> pd.DataFrame:
@@ -29,34 +70,84 @@ def exceed_probability(
     """
     if direction_by_kpi is None:
         direction_by_kpi = {}
-    def cond(k, v):
-        thr = threshold_by_kpi.get(k, np.nan)
-        if np.isnan(thr):
-            return pd.Series(False, index=v.index)
-        dirk = direction_by_kpi.get(k, "above")
-        return (v >= thr) if dirk == "above" else (v <= thr)
-    parts = []
-    for (kpi, date), group in df_long.groupby(["kpi", "date"]):
-        mask = cond(kpi, group["value"])
-        prob = float(mask.mean()) if len(mask) else np.nan
-        parts.append({"kpi": kpi, "date": date, "probability": prob})
-    return pd.DataFrame(parts)
+    if isinstance(df_long, SortedValueIndex):
+        return df_long.exceed(threshold_by_kpi, direction_by_kpi)
+    if isinstance(df_long, ForecastCube):
+        # Values are sorted once per (kpi, date) cell: each threshold is one
+        # searchsorted per cell, so moving the slider does not rescan the data.
+        srt, counts = df_long.sorted_view()
+        hits = np.zeros(counts.shape, dtype=np.int64)
+        for j, k in enumerate(df_long.kpis):
+            thr = threshold_by_kpi.get(k, np.nan)
+            if np.isnan(thr):
+                continue
+            below = direction_by_kpi.get(k, "above") == "below"
+            for d in range(counts.shape[1]):
+                cell = srt[j, d, :counts[j, d]]
+                if below:
+                    hits[j, d] = np.searchsorted(cell, thr, side="right")
+                else:
+                    hits[j, d] = counts[j, d] - np.searchsorted(cell, thr, side="left")
+        kk, dd = _present(df_long)
+        return pd.DataFrame({
+            "kpi": df_long.kpis[kk],
+            "date": df_long.dates[dd],
+            "probability": hits[kk, dd] / counts[kk, dd],
+        })
+    # One boolean column for all rows, then a single groupby-mean
+    kpi = df_long["kpi"].astype(str)
+    thr = kpi.map(threshold_by_kpi).astype(np.float64).to_numpy()
+    below = (kpi.map(direction_by_kpi) == "below").to_numpy()
+    v = df_long["value"].to_numpy()
+    with np.errstate(invalid="ignore"):
+        hit = np.where(below, v <= thr, v >= thr)
+    out = (
+        df_long[["kpi", "date"]]
+        .assign(probability=hit.astype(np.float64))
+        .groupby(["kpi", "date"], observed=True)["probability"]
+        .mean()
+        .reset_index()
+    )
+    return out
 
-def to_wide(df_long: pd.DataFrame) -> pd.DataFrame:
+@memoize()
+def to_wide(df_long: pd.DataFrame | ForecastCube) -> pd.DataFrame:
     """
     Pivot to wide with index (scenario,date) and columns per KPI.
     """
+    if isinstance(df_long, ForecastCube):
+        c = df_long
+        n_s, n_k, n_d = c.shape
+        block = c.values.transpose(0, 2, 1).reshape(n_s * n_d, n_k)
+        keep = ~np.isnan(block).all(axis=1)
+        wide = pd.DataFrame(block[keep], columns=pd.Index(c.kpis, name="kpi"))
+        wide.insert(0, "date", np.tile(c.dates, n_s)[keep])
+        wide.insert(0, "scenario", np.repeat(c.scenarios, n_d)[keep])
+        return wide
     wide = df_long.pivot_table(
-        index=["scenario", "date"], columns="kpi", values="value", aggfunc="first"
+        index=["scenario", "date"], columns="kpi", values="value", aggfunc="first", observed=True
     ).reset_index()
     return wide
 
-def fan_chart_data(df_long: pd.DataFrame, kpi: str, quantile_bands: list[tuple[float, float]]):
+@memoize()
+def fan_chart_data(df_long: pd.DataFrame | ForecastCube | SortedValueIndex, kpi: str, quantile_bands: list[tuple[float, float]]):
     """
     Return a DataFrame with columns: date, median, band_low_<p>, band_high_<p> for each band.
     """
+    if isinstance(df_long, SortedValueIndex):
+        return df_long.fan_chart(kpi, quantile_bands)
     # Compute full quantiles
     qs = sorted({0.5, *[a for band in quantile_bands for a in band]})
+    if isinstance(df_long, ForecastCube):
+        v = df_long.kpi_slice(kpi)  # (scenario, date)
+        keep = ~np.isnan(v).all(axis=0)
+        qv = nan_quantiles(v[:, keep], np.array(qs))
+        grp = pd.DataFrame(qv.T, index=df_long.dates[keep], columns=qs)
+        out = pd.DataFrame({"date": grp.index, "median": grp[0.5].values})
+        for low, high in quantile_bands:
+            out[f"low_{int(low*100)}"] = grp[low].values
+            out[f"high_{int(high*100)}"] = grp[high].values
+        return out
     grp = df_long[df_long["kpi"] == kpi].groupby("date")["value"].quantile(qs).unstack()
     grp = grp.sort_index()  # date order
     out = pd.DataFrame({"date": grp.index, "median": grp[0.5].values})
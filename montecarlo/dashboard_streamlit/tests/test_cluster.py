@@ -0,0 +1,44 @@
+from __future__ import annotations
+import sys
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core.loader import ForecastCube
+from core.cluster import reduce_scenarios
+
+YEARS = list(range(2021, 2026))
+
+def _lognormal_cube(n_scenarios: int = 5000, seed: int = 0) -> ForecastCube:
+    """Skewed, correlated KPIs: lognormal random walks, 3 KPIs x 5 years."""
+    rng = np.random.default_rng(seed)
+    shocks = rng.normal(size=(n_scenarios, 3, len(YEARS))) * np.array([0.3, 0.5, 0.2])[None, :, None]
+    shocks[:, 1] += 0.5 * shocks[:, 0]
+    values = np.exp(np.cumsum(shocks, axis=2)) * np.array([100.0, 50.0, 1000.0])[None, :, None]
+    return ForecastCube(
+        scenarios=pd.Index([f"Sim_{i:05d}" for i in range(n_scenarios)]),
+        kpis=pd.Index(["ebitda", "net_debt", "revenue"]),
+        dates=pd.DatetimeIndex([f"{y}-12-31" for y in YEARS]),
+        values=values,
+    )
+
+@pytest.mark.parametrize("method", ["medoids", "quantile"])
+def test_reduce_scenarios_within_tol(method):
+    cube = _lognormal_cube()
+    reps, report = reduce_scenarios(cube, list(cube.kpis), YEARS, n_representatives=100, method=method, tol=0.1)
+    assert report["within_tol"].all()
+    assert len(report) == 3 * len(YEARS) * 5
+    assert reps["scenario"].is_unique
+    assert set(reps["scenario"]) <= set(cube.scenarios)
+    assert (reps["weight"] > 0).all()
+    assert reps["weight"].sum() == pytest.approx(1.0)
+
+def test_reduce_scenarios_max_representatives():
+    cube = _lognormal_cube()
+    with pytest.raises(ValueError, match="not within tol"):
+        reduce_scenarios(cube, list(cube.kpis), YEARS, n_representatives=20, tol=0.01, max_representatives=20)
@@ -5,17 +5,46 @@ generate_monte_carlo.py
 Monte Carlo sample generator for discrete distributions with optional grouping.
 Reads input Excel, validates structure, and generates Monte Carlo draws.
 
+Continuous marginals: a 'dist' column in Variables can set a variable to
+'triangular' ([best, base, worst] or [best, worst]) or 'uniform' ([best, worst]).
+
+Optional AR(1): an 'ar1_rho' column in Variables adds serial correlation per driver,
+applied as one linear filter along the period axis and started from its exact
+stationary distribution (no burn-in loop).
+
+Optional Gaussian copula (--copula GAUSSIAN or Settings 'copula', default NONE): the
+workbook's 'Correlation' sheet correlates the uniforms of each period across drivers
+(groups and independent variables) before the inverse-CDF lookup. The matrix is split into independent blocks (connected
+components of non-zero correlations), each block's Cholesky factor is cached by
+matrix hash, and the normal transform + correlation multiply run in place.
+
+Optional Saltelli design (--design SALTELLI): N base rows of A and B plus one AB_i
+matrix per factor (driver: group or independent variable, over all its periods),
+N*(d+2) runs for Sobol sensitivity (montecarlo_sensitivity_v1.py). Only A and B go
+through the inverse CDF; AB_i rows are gathered from them by index. A design CSV
+tags each run (block, factor, base row) and marks runs whose draws equal an
+earlier run (duplicate_of), so they need not be forecast again.
+
 For scenario space analysis, use: analyze_scenario_space.py
 """
 from __future__ import annotations
 
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Tuple, Optional, Set
+import hashlib
 import json
+import os
 
 import numpy as np
 import pandas as pd
 from scipy import stats
+from scipy import signal
+from scipy import special
+from scipy.linalg import cholesky as scipy_cholesky, eigh
+from scipy.linalg import LinAlgError
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
 from scipy.stats import qmc
 from datetime import datetime
 
@@ -24,18 +53,44 @@ from datetime import datetime
 # =========================
 SHEET_VARIABLES: str = "Variables"
 SHEET_SETTINGS: str = "Settings"
+SHEET_CORR: str = "Correlation"  # optional
 
 COL_VARIABLE: str = "variable"
 COL_MONTH: str = "date"
 COL_VALUES: str = "best <-> worst values"
 COL_PROBS: str = "probabilities"
 COL_GROUP: str = "group"
+COL_AR1_RHO: str = "ar1_rho"  # optional
+COL_DIST: str = "dist"        # optional: discrete (default), triangular, uniform
+
+DIST_DISCRETE: str = "discrete"
+DIST_TRIANGULAR: str = "triangular"
+DIST_UNIFORM: str = "uniform"
 
 SET_KEY: str = "key"
 SET_VALUE: str = "value"
 
 ENGINE_SOBOL: str = "SOBOL"
 ENGINE_RANDOM: str = "RANDOM"
+ENGINE_LHS: str = "LHS"
+ENGINE_HALTON: str = "HALTON"
+ENGINE_SOBOL_R: str = "SOBOL_R"  # R independently scrambled Sobol replicates
+ENGINES: List[str] = [ENGINE_SOBOL, ENGINE_RANDOM, ENGINE_LHS, ENGINE_HALTON, ENGINE_SOBOL_R]
+
+COPULA_NONE: str = "NONE"
+COPULA_GAUSSIAN: str = "GAUSSIAN"
+
+DESIGN_NONE: str = "NONE"
+DESIGN_SALTELLI: str = "SALTELLI"
+
+# Saltelli design CSV (read by montecarlo_sensitivity_v1.py)
+COL_BLOCK: str = "block"                # A, B or AB
+COL_FACTOR: str = "factor"              # AB rows: factor taken from B
+COL_ROW: str = "row"                    # base row k (0..N-1)
+COL_DUPLICATE_OF: str = "duplicate_of"  # earlier run with identical draws
+BLOCK_A: str = "A"
+BLOCK_B: str = "B"
+BLOCK_AB: str = "AB"
 
 # Recommended powers of 2 for SOBOL sampling (optimal convergence)
 RECOMMENDED_RUNS: List[int] = [64, 128, 256, 512, 1024, 2048, 4096]
@@ -45,10 +100,26 @@ DEFAULT_RUNS: int = 256  # Power of 2 for optimal SOBOL performance
 DEFAULT_SEED: int = 12345
 DEFAULT_BLOCK_SIZE: int = 256  # Match DEFAULT_RUNS to avoid padding
 DEFAULT_EXACT_N: bool = False
+DEFAULT_REPLICATES: int = 8  # SOBOL_R only
+
+COL_REPLICATE: str = "replicate"  # output column, SOBOL_R only
 
 U_EPS: float = 1e-12
 TOL_PROB_SUM: float = 1e-10
 
+# Correlation policy (same rules as the v15 continuous generator)
+TOL_ASYMM: float = 1e-10        # |rho_ij - rho_ji| above this -> ERROR, below -> averaged
+TOL_CLIP_NOTIFY: float = 1e-12  # notify when clipping to [-1, 1] changed entries
+TOL_DIAG_NOTIFY: float = 1e-6   # notify when forcing the diagonal to 1.0 changed entries
+TOL_CHOL_NOTIFY: float = 1e-8   # notify when nearest-PD projection changed entries
+PSD_EPS: float = 1e-10          # eigenvalue floor in nearest-PD projection
+
+# Rows per block for the in-place copula transform (peak extra memory = one block)
+COPULA_BLOCK_ROWS: int = 4096
+
+# Max AR(1) rho (avoid near-singular behavior)
+MAX_AR1_RHO: float = 0.9999
+
 # =========================
 # Helpers
 # =========================
@@ -160,7 +231,7 @@ def _parse_json_array(cell) -> Optional[List[float]]:
 # =========================
 
 def read_inputs(xlsx_path: str):
-    """Read Variables and Settings sheets."""
+    """Read Variables and Settings sheets (and the optional Correlation sheet)."""
     xls = pd.ExcelFile(xlsx_path)
     must = {SHEET_VARIABLES, SHEET_SETTINGS}
     have = set(xls.sheet_names)
@@ -186,14 +257,16 @@ def read_inputs(xlsx_path: str):
         if k:
             settings[k] = v
     
-    return variables, settings
+    corr = pd.read_excel(xls, SHEET_CORR).fillna("") if SHEET_CORR in have else None
+    
+    return variables, settings, corr
 
 # =========================
 # Validation
 # =========================
 
 def validate_and_prepare(variables: pd.DataFrame):
-    """Validate and prepare discrete variable data with group handling."""
+    """Validate and prepare variable data (discrete and continuous) with group handling."""
     if variables is None or variables.empty:
         raise SystemExit(f"[ERROR] '{SHEET_VARIABLES}' sheet is empty.")
     
@@ -205,6 +278,8 @@ def validate_and_prepare(variables: pd.DataFrame):
         variables[COL_PROBS] = ""
     if COL_GROUP not in variables.columns:
         variables[COL_GROUP] = ""
+    if COL_DIST not in variables.columns:
+        variables[COL_DIST] = ""
     
     variables = variables.copy()
     variables[COL_VARIABLE] = variables[COL_VARIABLE].astype(str).str.strip()
@@ -212,8 +287,21 @@ def validate_and_prepare(variables: pd.DataFrame):
     variables[COL_GROUP] = variables[COL_GROUP].astype(str).str.strip().str.lower()
     variables[COL_GROUP] = variables[COL_GROUP].replace("", None)
     
+    variables[COL_DIST] = variables[COL_DIST].astype(str).str.strip().str.lower().replace("", DIST_DISCRETE)
+    
     var_names = variables[COL_VARIABLE].unique().tolist()
     
+    # One distribution family per variable
+    bad_dist = sorted(set(variables[COL_DIST]) - {DIST_DISCRETE, DIST_TRIANGULAR, DIST_UNIFORM})
+    if bad_dist:
+        raise SystemExit(f"[ERROR] Unknown '{COL_DIST}' values: {bad_dist}")
+    var_dists: Dict[str, str] = {}
+    for v in var_names:
+        dists_for_v = variables.loc[variables[COL_VARIABLE] == v, COL_DIST].unique()
+        if len(dists_for_v) > 1:
+            raise SystemExit(f"[ERROR] Variable '{v}' has multiple distributions: {dists_for_v.tolist()}")
+        var_dists[v] = dists_for_v[0]
+    
     # Validate Rule 5: consistent grouping
     var_groups: Dict[str, Optional[str]] = {}
     for v in var_names:
@@ -253,13 +341,37 @@ def validate_and_prepare(variables: pd.DataFrame):
             if probs_arr is None:
                 raise SystemExit(f"[ERROR] Invalid probabilities at row {idx+2}: {raw_probs}")
         
+        if var_dists[v] != DIST_DISCRETE:
+            if probs_arr is not None:
+                raise SystemExit(f"[ERROR] Probabilities not allowed for {var_dists[v]} variable at row {idx+2}")
+            expected = (2, 3) if var_dists[v] == DIST_TRIANGULAR else (2,)
+            if len(vals_arr) not in expected:
+                raise SystemExit(
+                    f"[ERROR] {var_dists[v]} variable '{v}' at row {idx+2} needs "
+                    f"{' or '.join(str(n) for n in expected)} values (best, [base,] worst): {raw_vals}"
+                )
+        
         rows_expanded.append((v, p, vals_arr, probs_arr, grp))
     
-    # Build disc_map and validate groups
+    # Continuous params: (best, mode, worst); best/worst keep the business order, so
+    # best > worst is allowed and low uniforms still map to the best side
+    cont_map: Dict[Tuple[str, str], Tuple[float, float, float]] = {}
+    for v, p, vals, _, _ in rows_expanded:
+        if var_dists[v] == DIST_DISCRETE:
+            continue
+        best, worst = float(vals[0]), float(vals[-1])
+        mode = float(vals[1]) if len(vals) == 3 else best + 0.5 * (worst - best)
+        if not (min(best, worst) <= mode <= max(best, worst)):
+            raise SystemExit(f"[ERROR] Triangular base out of range for ({v}, {p}): {vals}")
+        cont_map[(v, p)] = (best, mode, worst)
+    
+    # Build disc_map and validate groups (continuous variables have no arrays to synchronize)
     disc_map: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]] = {}
     group_period_data: Dict[Tuple[Optional[str], str], List[Tuple[str, List[float], Optional[List[float]]]]] = {}
     
     for v, p, vals, probs, grp in rows_expanded:
+        if var_dists[v] != DIST_DISCRETE:
+            continue
         key = (grp, p)
         if key not in group_period_data:
             group_period_data[key] = []
@@ -316,7 +428,7 @@ def validate_and_prepare(variables: pd.DataFrame):
         group_map[period] = {}
         for v in var_names:
             grp = var_groups[v]
-            if (v, period) not in disc_map:
+            if (v, period) not in disc_map and (v, period) not in cont_map:
                 continue
             if grp:
                 if grp not in group_map[period]:
@@ -324,8 +436,9 @@ def validate_and_prepare(variables: pd.DataFrame):
                 group_map[period][grp].append(v)
     
     scenario_info = calculate_scenario_space(var_names, periods, disc_map, group_map, var_groups)
+    scenario_info["continuous_vars"] = len([v for v in var_names if var_dists[v] != DIST_DISCRETE])
     
-    return var_names, periods, disc_map, group_map, var_groups, scenario_info
+    return var_names, periods, disc_map, cont_map, var_dists, group_map, var_groups, scenario_info
 
 # =========================
 # Scenario Space Calculation (brief)
@@ -352,11 +465,10 @@ def calculate_scenario_space(
         groups_in_period = group_map.get(period, {})
         
         for grp, vars_in_grp in groups_in_period.items():
-            if vars_in_grp:
-                v = vars_in_grp[0]
-                if (v, period) in disc_map:
-                    vals, _ = disc_map[(v, period)]
-                    scenarios *= len(vals)
+            disc_vars = [v for v in vars_in_grp if (v, period) in disc_map]
+            if disc_vars:
+                vals, _ = disc_map[(disc_vars[0], period)]
+                scenarios *= len(vals)
         
         for v in independent_vars:
             if (v, period) in disc_map:
@@ -375,12 +487,380 @@ def calculate_scenario_space(
         "median_scenarios": int(np.median(scenarios_per_period)) if scenarios_per_period else 0,
     }
 
+# =========================
+# Correlation (Gaussian copula)
+# =========================
+
+def _period_drivers(
+    period: str,
+    var_names: List[str],
+    disc_map: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]],
+    group_map: Dict[str, Dict[str, List[str]]],
+    var_groups: Dict[str, Optional[str]],
+    cont_map: Optional[Dict[Tuple[str, str], Tuple[float, float, float]]] = None,
+) -> List[str]:
+    """
+    Return the driver label of each unit-cube column of a period, in sampling order:
+    first the groups (one column each), then the independent variables.
+    """
+    cont_map = cont_map or {}
+    drivers = [grp for grp, vars_in_grp in group_map.get(period, {}).items() if vars_in_grp]
+    for v in var_names:
+        if var_groups[v] is None and ((v, period) in disc_map or (v, period) in cont_map):
+            drivers.append(v)
+    return drivers
+
+def validate_correlation(corr: pd.DataFrame, drivers: List[str]) -> Tuple[List[str], np.ndarray]:
+    """
+    Validate the Correlation sheet and return (driver labels in sheet order, matrix).
+    
+    Labels are group names or names of independent variables (case-insensitive).
+    Drivers missing from the sheet stay independent.
+    """
+    if corr.shape[0] < 1 or corr.shape[1] < 2:
+        raise SystemExit(f"[ERROR] '{SHEET_CORR}' sheet must have a header row and labeled columns.")
+    
+    by_key: Dict[str, str] = {}
+    for d in drivers:
+        key = d.strip().lower()
+        if key in by_key and by_key[key] != d:
+            raise SystemExit(f"[ERROR] Correlation label '{key}' is ambiguous (group and variable share the name)")
+        by_key[key] = d
+    
+    corr = corr.copy()
+    corr = corr.set_index(corr.columns[0])  # first column holds the labels (whatever its header)
+    corr.index = [str(x).strip().lower() for x in corr.index]
+    corr.columns = [str(c).strip().lower() for c in corr.columns]
+    
+    labels = list(corr.index)
+    unknown = [x for x in labels if x not in by_key]
+    if unknown:
+        raise SystemExit(f"[ERROR] {SHEET_CORR} labels are not groups or independent variables: {unknown}")
+    if len(set(labels)) != len(labels):
+        raise SystemExit(f"[ERROR] {SHEET_CORR} has duplicate labels")
+    missing_cols = [x for x in labels if x not in corr.columns]
+    if missing_cols:
+        raise SystemExit(f"[ERROR] {SHEET_CORR} missing columns: {missing_cols}")
+    
+    corr = corr.loc[labels, labels].apply(pd.to_numeric, errors="coerce")
+    if corr.isna().any().any():
+        raise SystemExit(f"[ERROR] {SHEET_CORR} contains non-numeric cells.")
+    C = corr.to_numpy(dtype=float)
+    
+    # Symmetry: within tolerance -> average; beyond tolerance -> ERROR
+    mask_bad = np.triu(np.abs(C - C.T) > TOL_ASYMM, k=1)
+    if np.any(mask_bad):
+        i, j = np.argwhere(mask_bad)[0]
+        raise SystemExit(
+            f"[ERROR] {SHEET_CORR} not symmetric: "
+            f"rho[{labels[i]},{labels[j]}]={C[i, j]:.6g} vs rho[{labels[j]},{labels[i]}]={C[j, i]:.6g}"
+        )
+    C = (C + C.T) / 2.0
+    
+    clipped = np.clip(C, -1.0, 1.0)
+    clip_delta = float(np.max(np.abs(clipped - C)))
+    if clip_delta > TOL_CLIP_NOTIFY:
+        print(f"[TIP] Correlation entries clipped to [-1,1]. Max |Delta|={clip_delta:.2e}")
+    C = clipped
+    
+    diag_err = float(np.max(np.abs(np.diag(C) - 1.0)))
+    np.fill_diagonal(C, 1.0)
+    if diag_err > TOL_DIAG_NOTIFY:
+        print(f"[TIP] Correlation diagonal corrected to 1.0. Max |Delta|={diag_err:.2e}")
+    
+    return [by_key[x] for x in labels], C
+
+def nearest_pd(A: np.ndarray, eps: float = PSD_EPS) -> np.ndarray:
+    """Higham's algorithm to find the nearest positive semidefinite matrix."""
+    B = (A + A.T) / 2
+    _, s, V = np.linalg.svd(B)
+    H = (V.T * s) @ V
+    A2 = (B + H) / 2
+    A3 = (A2 + A2.T) / 2
+    eigvals, eigvecs = eigh(A3)
+    eigvals[eigvals < eps] = eps
+    return (eigvecs * eigvals) @ eigvecs.T
+
+def cholesky_corr(C: np.ndarray) -> Tuple[np.ndarray, float]:
+    """Return lower-triangular L with C ~ L L^T. If C is not PD, project to nearest PD."""
+    try:
+        L = scipy_cholesky(C, lower=True, overwrite_a=False, check_finite=True)
+        return L, 0.0
+    except LinAlgError:
+        C2 = nearest_pd(C, eps=PSD_EPS)
+        L = scipy_cholesky(C2, lower=True, overwrite_a=False, check_finite=True)
+        delta = float(np.max(np.abs(C2 - C)))
+        return L, delta
+
+# Factorized matrices keyed by content hash (periods sharing the same drivers reuse one factor)
+_CHOLESKY_CACHE: Dict[str, Tuple[np.ndarray, float]] = {}
+
+def _matrix_key(C: np.ndarray) -> str:
+    C = np.ascontiguousarray(C, dtype=float)
+    return hashlib.sha1(repr(C.shape).encode() + C.tobytes()).hexdigest()
+
+def cholesky_corr_cached(C: np.ndarray) -> Tuple[np.ndarray, float]:
+    """cholesky_corr() memoized by matrix hash."""
+    key = _matrix_key(C)
+    hit = _CHOLESKY_CACHE.get(key)
+    if hit is None:
+        hit = cholesky_corr(C)
+        _CHOLESKY_CACHE[key] = hit
+    return hit
+
+def correlation_blocks(C: np.ndarray) -> List[np.ndarray]:
+    """
+    Return the index sets of the connected components of non-zero off-diagonal
+    correlations. Singletons (uncorrelated drivers) are dropped: they need no transform.
+    """
+    adj = sparse.csr_matrix(np.abs(C - np.diag(np.diag(C))) > 0.0)
+    n_comp, labels = connected_components(adj, directed=False)
+    blocks = [np.flatnonzero(labels == k) for k in range(n_comp)]
+    return [b for b in blocks if len(b) > 1]
+
+# Block factorizations keyed by content hash of the whole matrix
+_BLOCK_FACTOR_CACHE: Dict[str, Tuple[List[Tuple[np.ndarray, np.ndarray]], float]] = {}
+
+def block_cholesky_cached(C: np.ndarray) -> Tuple[List[Tuple[np.ndarray, np.ndarray]], float]:
+    """
+    Factorize a (mostly) block-diagonal correlation matrix block by block.
+    
+    Returns ([(block indices, lower L of the block), ...], max nearest-PD delta).
+    Cost scales with the block sizes instead of n^2 (or n^3 for the factorization).
+    """
+    key = _matrix_key(C)
+    hit = _BLOCK_FACTOR_CACHE.get(key)
+    if hit is None:
+        factors = []
+        max_delta = 0.0
+        for idx in correlation_blocks(C):
+            L, delta = cholesky_corr_cached(C[np.ix_(idx, idx)])
+            factors.append((idx, L))
+            max_delta = max(max_delta, delta)
+        hit = (factors, max_delta)
+        _BLOCK_FACTOR_CACHE[key] = hit
+    return hit
+
+def build_dependence_plan(
+    drivers_by_period: List[List[str]],
+    corr_drivers: Optional[List[str]],
+    corr_matrix: Optional[np.ndarray],
+    ar1_rho: Optional[Dict[str, float]] = None,
+) -> Tuple[np.ndarray, List[Tuple[np.ndarray, np.ndarray]], List[Tuple[float, np.ndarray]], float]:
+    """
+    Precompute how the unit cube must be transformed for copula and AR(1).
+    
+    Returns (touched, corr_steps, ar_steps, max_pd_delta):
+      - touched:    global U columns that are transformed (others are left bit-identical)
+      - corr_steps: [(columns into `touched`, lower L), ...] correlation blocks per period
+      - ar_steps:   [(rho, (n_periods, k) columns into `touched`), ...] one per distinct rho
+    
+    Each AR(1) driver runs over the periods in which it is defined. It starts from an
+    exact stationary draw: in its first period it is correlated with
+    Sigma_ij = g_i g_j C_ij / (1 - rho_i rho_j) (g = sqrt(1 - rho^2)), the limit of an
+    infinite burn-in, so no warm-up steps are simulated.
+    """
+    ar1_rho = {d: r for d, r in (ar1_rho or {}).items() if r > 0.0}
+    pos = {d: i for i, d in enumerate(corr_drivers or [])}
+    offsets = np.concatenate([[0], np.cumsum([len(d) for d in drivers_by_period])]).astype(int)
+    ar_periods = {d: tuple(t for t, drivers in enumerate(drivers_by_period) if d in drivers) for d in ar1_rho}
+    ar_start = {d: ts[0] for d, ts in ar_periods.items() if ts}
+    
+    corr_global: List[Tuple[np.ndarray, np.ndarray]] = []
+    max_delta = 0.0
+    for t, drivers in enumerate(drivers_by_period):
+        starting = {d for d in drivers if ar_start.get(d) == t}
+        cols = np.array([c for c, d in enumerate(drivers) if d in pos or d in starting], dtype=int)
+        if len(cols) < 2:
+            continue
+        C = np.eye(len(cols))
+        in_corr = [c for c in range(len(cols)) if drivers[cols[c]] in pos]
+        if in_corr and corr_matrix is not None:
+            idx = np.array([pos[drivers[cols[c]]] for c in in_corr], dtype=int)
+            C[np.ix_(in_corr, in_corr)] = corr_matrix[np.ix_(idx, idx)]
+        if starting:
+            r = np.array([ar1_rho[drivers[c]] if drivers[c] in starting else 0.0 for c in cols])
+            g = np.sqrt(1.0 - r ** 2)
+            C = C * np.outer(g, g) / (1.0 - np.outer(r, r))
+            np.fill_diagonal(C, 1.0)
+        factors, delta = block_cholesky_cached(C)
+        max_delta = max(max_delta, delta)
+        for b, L in factors:
+            corr_global.append((offsets[t] + cols[b], L))
+    
+    # One filter step per (rho, period pattern): drivers in a step share the same time grid
+    steps: Dict[Tuple[float, Tuple[int, ...]], List[str]] = {}
+    for d, rho in ar1_rho.items():
+        if len(ar_periods[d]) > 1:
+            steps.setdefault((rho, ar_periods[d]), []).append(d)
+    ar_global: List[Tuple[float, np.ndarray]] = []
+    for (rho, ts), names in sorted(steps.items()):
+        idx = np.array([[offsets[t] + drivers_by_period[t].index(d) for d in names] for t in ts], dtype=int)
+        ar_global.append((rho, idx))
+    
+    touched = np.unique(np.concatenate(
+        [c for c, _ in corr_global] + [i.ravel() for _, i in ar_global] + [np.empty(0, dtype=int)]
+    )).astype(int)
+    local = {c: k for k, c in enumerate(touched)}
+    to_local = np.vectorize(local.__getitem__, otypes=[int])
+    corr_steps = [(to_local(c), L) for c, L in corr_global]
+    ar_steps = [(rho, to_local(i)) for rho, i in ar_global]
+    return touched, corr_steps, ar_steps, max_delta
+
+def apply_dependence(
+    U: np.ndarray,
+    touched: np.ndarray,
+    corr_steps: List[Tuple[np.ndarray, np.ndarray]],
+    ar_steps: List[Tuple[float, np.ndarray]],
+    block_rows: int = COPULA_BLOCK_ROWS,
+) -> None:
+    """
+    Transform U in place: Phi^-1 -> correlation blocks (E @ L.T) -> AR(1) filter -> Phi.
+    
+    Works on one block of rows at a time, so peak extra memory is one block
+    instead of full copies of the normal and correlated cubes. The AR(1)
+    recursion Z_t = rho Z_{t-1} + g E_t runs as a single lfilter along the
+    period axis (no Python loop over periods).
+    """
+    if len(touched) == 0:
+        return
+    n = U.shape[0]
+    for r0 in range(0, n, block_rows):
+        r1 = min(n, r0 + block_rows)
+        W = U[r0:r1, touched]
+        special.ndtri(W, out=W)
+        for cols, L in corr_steps:
+            W[:, cols] = W[:, cols] @ L.T
+        for rho, idx in ar_steps:
+            gain = np.sqrt(1.0 - rho ** 2)
+            Z = W[:, idx]               # (rows, periods, k)
+            Z[:, 0, :] /= gain          # so that the filter output at t=0 is the stationary draw
+            W[:, idx] = signal.lfilter([gain], [1.0, -rho], Z, axis=1)
+        special.ndtr(W, out=W)
+        np.clip(W, U_EPS, 1.0 - U_EPS, out=W)
+        U[r0:r1, touched] = W
+
+def validate_ar1(variables: pd.DataFrame, var_groups: Dict[str, Optional[str]]) -> Dict[str, float]:
+    """
+    Read the optional 'ar1_rho' column and return {driver: rho} for drivers with rho > 0.
+    
+    rho must be consistent per variable and per group (blank = 0). The recursion
+    runs over the periods in which the driver is defined.
+    """
+    if COL_AR1_RHO not in variables.columns:
+        return {}
+    rho_col = pd.to_numeric(variables[COL_AR1_RHO].replace("", np.nan), errors="coerce")
+    names = variables[COL_VARIABLE].astype(str).str.strip()
+    
+    by_driver: Dict[str, Set[float]] = {}
+    for v, r in zip(names, rho_col):
+        driver = var_groups.get(v) or v
+        by_driver.setdefault(driver, set())
+        if pd.notna(r):
+            by_driver[driver].add(float(r))
+    
+    out: Dict[str, float] = {}
+    for driver, values in by_driver.items():
+        if len(values) > 1:
+            raise SystemExit(f"[ERROR] '{COL_AR1_RHO}' for '{driver}' is inconsistent: {sorted(values)}")
+        rho = values.pop() if values else 0.0
+        if not (0.0 <= rho <= MAX_AR1_RHO):
+            print(f"[TIP] '{COL_AR1_RHO}' for '{driver}' clipped to [0, {MAX_AR1_RHO}] (was {rho})")
+            rho = float(np.clip(rho, 0.0, MAX_AR1_RHO))
+        if rho > 0.0:
+            out[driver] = rho
+    return out
+
+# =========================
+# Inverse CDFs (continuous)
+# =========================
+# Parameters are (best, mode, worst) in business order: best may be larger than
+# worst. With w = worst - best (signed), u -> best + w*u (uniform) and the
+# triangular branches below are monotone from best (u=0) to worst (u=1), so a
+# low uniform always maps to the best side, as for discrete arrays.
+
+def invcdf_uniform_into(u: np.ndarray, best: np.ndarray, worst: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """Uniform inverse CDF for all columns at once: out = best + (worst - best) * u."""
+    np.multiply(u, worst - best, out=out)
+    out += best
+    return out
+
+def invcdf_triangular_into(
+    u: np.ndarray,
+    best: np.ndarray,
+    mode: np.ndarray,
+    worst: np.ndarray,
+    out: np.ndarray,
+    tmp: np.ndarray,
+    mask: np.ndarray,
+) -> np.ndarray:
+    """
+    Fused triangular inverse CDF for all columns of a period at once.
+    
+    u, out, tmp: (runs, k) float; mask: (runs, k) bool; best/mode/worst: (k,).
+    Both branches are evaluated into preallocated buffers and merged with a
+    where-copy: no per-call temporaries of size runs x k, no boolean scatter.
+      left  (u <  c): best  + s * sqrt(u * w * (mode - best))
+      right (u >= c): worst - s * sqrt((1 - u) * w * (worst - mode))
+    with w = worst - best, s = sign(w), c = (mode - best) / w.
+    Degenerate supports (w == 0) give the constant best.
+    """
+    w = worst - best
+    s = np.sign(w)
+    c = np.divide(mode - best, w, out=np.full_like(w, 0.5), where=(w != 0))
+    
+    np.multiply(u, w * (mode - best), out=out)
+    np.sqrt(out, out=out)
+    out *= s
+    out += best
+    
+    np.subtract(1.0, u, out=tmp)
+    tmp *= w * (worst - mode)
+    np.sqrt(tmp, out=tmp)
+    tmp *= -s
+    tmp += worst
+    
+    np.greater_equal(u, c, out=mask)
+    np.copyto(out, tmp, where=mask)
+    return out
+
 # =========================
 # Sampling
 # =========================
 
-def sample_unit_cube(n: int, d: int, engine: str, seed: int, block_size: int, exact_n: bool) -> np.ndarray:
-    """Generate U in (0,1)^d."""
+def _sobol_replicate(d: int, n: int, seed: np.random.SeedSequence) -> np.ndarray:
+    return qmc.Sobol(d=d, scramble=True, seed=np.random.default_rng(seed)).random(n=n)
+
+def replicate_size(n: int, replicates: int, exact_n: bool) -> int:
+    """
+    Runs per SOBOL_R replicate: ceil(n / replicates), rounded up to a power of 2
+    (Sobol balance) unless exact_n.
+    """
+    n_per = max(1, int(np.ceil(n / float(replicates))))
+    if not exact_n:
+        n_per = 1 << (n_per - 1).bit_length()
+    return n_per
+
+def sample_unit_cube(
+    n: int,
+    d: int,
+    engine: str,
+    seed: int,
+    block_size: int,
+    exact_n: bool,
+    replicates: int = 1,
+) -> np.ndarray:
+    """
+    Generate U in (0,1)^d.
+    
+    - SOBOL:   scrambled Sobol, padded to block_size multiples unless exact_n
+    - RANDOM:  pseudo-random (PCG64)
+    - LHS:     Latin Hypercube, exactly n
+    - HALTON:  scrambled Halton, exactly n
+    - SOBOL_R: `replicates` independently scrambled Sobol sequences of
+               replicate_size() rows each, generated in parallel and stacked
+               replicate-major (rows of replicate r are contiguous, see replicate_ids)
+    """
     eng = (engine or DEFAULT_ENGINE).upper()
     
     if eng == ENGINE_SOBOL:
@@ -394,12 +874,138 @@ def sample_unit_cube(n: int, d: int, engine: str, seed: int, block_size: int, ex
     elif eng == ENGINE_RANDOM:
         rng = np.random.default_rng(seed)
         U = rng.random((n, d))
+    elif eng == ENGINE_LHS:
+        U = qmc.LatinHypercube(d=d, seed=seed).random(n=n)
+    elif eng == ENGINE_HALTON:
+        U = qmc.Halton(d=d, scramble=True, seed=seed).random(n=n)
+    elif eng == ENGINE_SOBOL_R:
+        if replicates < 2:
+            raise ValueError(f"{ENGINE_SOBOL_R} needs at least 2 replicates, got {replicates}")
+        n_per = replicate_size(n, replicates, exact_n)
+        seeds = np.random.SeedSequence(seed).spawn(replicates)
+        with ThreadPoolExecutor(max_workers=min(replicates, os.cpu_count() or 1)) as pool:
+            parts = list(pool.map(lambda ss: _sobol_replicate(d, n_per, ss), seeds))
+        U = np.concatenate(parts, axis=0)
     else:
-        raise ValueError(f"Unknown engine: {engine!r}. Expected '{ENGINE_SOBOL}' or '{ENGINE_RANDOM}'.")
+        raise ValueError(f"Unknown engine: {engine!r}. Expected one of {ENGINES}.")
     
     U = np.clip(U, U_EPS, 1.0 - U_EPS)
     return U
 
+def replicate_ids(n_rows: int, replicates: int) -> np.ndarray:
+    """Replicate id (1..replicates) of each row of a SOBOL_R sample."""
+    return np.arange(n_rows) // (n_rows // replicates) + 1
+
+def replicate_percentile_ci(
+    values: np.ndarray,
+    rep_ids: np.ndarray,
+    q: float,
+    alpha: float = 0.05,
+) -> Tuple[float, float, float]:
+    """
+    Percentile estimate with a (1 - alpha) confidence interval from SOBOL_R replicates.
+    
+    Each replicate gives an independent estimate of the q-quantile; the interval is
+    mean +/- t_{R-1} * sd / sqrt(R). Returns (estimate, low, high).
+    """
+    values = np.asarray(values, dtype=float)
+    reps = np.unique(rep_ids)
+    est = np.array([np.nanquantile(values[rep_ids == r], q) for r in reps])
+    mean = float(est.mean())
+    half = float(stats.t.ppf(1.0 - alpha / 2.0, len(reps) - 1) * est.std(ddof=1) / np.sqrt(len(reps)))
+    return mean, mean - half, mean + half
+
+# =========================
+# Saltelli design
+# =========================
+
+def design_factors(
+    drivers_by_period: List[List[str]],
+    periods: List[str],
+    var_names: List[str],
+    var_groups: Dict[str, Optional[str]],
+) -> Tuple[List[str], np.ndarray, Dict[str, List[str]]]:
+    """
+    Factors of the Saltelli design: one per driver over all its periods.
+    Returns (factor names, var_factor (n_periods, n_vars) factor index or -1,
+    {factor: variables}).
+    """
+    names = list(dict.fromkeys(d for drivers in drivers_by_period for d in drivers))
+    pos = {d: i for i, d in enumerate(names)}
+    var_factor = np.full((len(periods), len(var_names)), -1, dtype=int)
+    members: Dict[str, List[str]] = {d: [] for d in names}
+    for t, drivers in enumerate(drivers_by_period):
+        present = set(drivers)
+        for j, v in enumerate(var_names):
+            drv = var_groups[v] if var_groups[v] is not None else v
+            if drv in present:
+                var_factor[t, j] = pos[drv]
+                if v not in members[drv]:
+                    members[drv].append(v)
+    return names, var_factor, members
+
+def saltelli_expand(
+    X_ab: np.ndarray,
+    n_base: int,
+    var_factor: np.ndarray,
+    factor_names: List[str],
+) -> Tuple[np.ndarray, pd.DataFrame]:
+    """
+    Expand the draws of A (rows 0..N-1) and B (rows N..2N-1) of X_ab (2N, periods, vars)
+    into the design A, B, AB_1..AB_d (N*(d+2) rows; AB_i = A with factor i from B).
+    
+    Index form: design row r copies base row a_row[r] and takes factor f[r] from
+    row b_row[r]; the draws are gathered, never re-sampled.
+    Duplicates (same draws as an earlier run, found from the per-factor equality
+    of A_k and B_k): AB_i = A when factor i drew the same values in A_k and B_k,
+    AB_i = B when all other factors did, B = A when all did. Discrete and grouped
+    drivers often draw identical values, so these runs are common.
+    
+    Returns (X (N*(d+2), periods, vars), design table: run, block, factor, row, duplicate_of).
+    """
+    N, d = n_base, len(factor_names)
+    XA, XB = X_ab[:N], X_ab[N:]
+    k = np.arange(N)
+    a_row = np.concatenate([k, N + k] + [k] * d)
+    b_row = np.concatenate([k, N + k] + [N + k] * d)
+    f_row = np.concatenate([np.full(2 * N, -1)] + [np.full(N, i) for i in range(d)])
+    
+    X = X_ab[a_row]
+    same = np.ones((N, d), dtype=bool)  # factor i drew the same values in A_k and B_k
+    for i in range(d):
+        mask = var_factor == i
+        rows = np.flatnonzero(f_row == i)[:, None]
+        t_idx, j_idx = np.nonzero(mask)
+        X[rows, t_idx, j_idx] = X_ab[b_row[rows], t_idx, j_idx]
+        a, b = XA[:, mask], XB[:, mask]
+        same[:, i] = ((a == b) | (np.isnan(a) & np.isnan(b))).all(axis=1)
+    
+    runs = np.arange(1, len(a_row) + 1)
+    run_a, run_b = k + 1, N + k + 1
+    dup = np.full(len(a_row), -1, dtype=np.int64)
+    dup[N:2 * N] = np.where(same.all(axis=1), run_a, -1)
+    n_same = same.sum(axis=1)
+    for i in range(d):
+        others_same = n_same - same[:, i] == d - 1
+        dup[(2 + i) * N:(3 + i) * N] = np.where(same[:, i], run_a, np.where(others_same, run_b, -1))
+    
+    table = pd.DataFrame({
+        "run": runs,
+        COL_BLOCK: [BLOCK_A] * N + [BLOCK_B] * N + [BLOCK_AB] * (d * N),
+        COL_FACTOR: [""] * (2 * N) + [f for f in factor_names for _ in range(N)],
+        COL_ROW: np.tile(k, d + 2),
+        COL_DUPLICATE_OF: pd.array(np.where(dup > 0, dup, 0), dtype="Int64"),
+    })
+    table.loc[dup < 0, COL_DUPLICATE_OF] = pd.NA
+    return X, table
+
+def write_design(table: pd.DataFrame, members: Dict[str, List[str]], path: str) -> None:
+    """Design CSV with a '# factors: {json}' header (factor -> variables)."""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(f"# design: {DESIGN_SALTELLI}\n")
+        f.write(f"# factors: {json.dumps(members)}\n")
+        table.to_csv(f, index=False)
+
 # =========================
 # Main Generation
 # =========================
@@ -415,9 +1021,27 @@ def generate_draws(
     seed: int,
     block_size: int,
     exact_n: bool,
-) -> Tuple[pd.DataFrame, int]:
+    corr_drivers: Optional[List[str]] = None,
+    corr_matrix: Optional[np.ndarray] = None,
+    ar1_rho: Optional[Dict[str, float]] = None,
+    cont_map: Optional[Dict[Tuple[str, str], Tuple[float, float, float]]] = None,
+    var_dists: Optional[Dict[str, str]] = None,
+    replicates: int = 1,
+    design: str = DESIGN_NONE,
+) -> Tuple[pd.DataFrame, int, Optional[Tuple[pd.DataFrame, Dict[str, List[str]]]]]:
     """
-    Generate Monte Carlo draws for discrete variables with groups.
+    Generate Monte Carlo draws for discrete and continuous variables with groups.
+    
+    If corr_matrix is given (labels in corr_drivers), the uniforms of each period
+    are correlated across drivers with a Gaussian copula before the CDF lookup.
+    ar1_rho ({driver: rho}) adds serial correlation across periods (AR(1) on the
+    normal scores, started from its stationary distribution).
+    With engine SOBOL_R the output has a 'replicate' column after 'run'.
+    With design SALTELLI, `runs` is the number of base rows N and the output holds
+    the N*(d+2) design runs (see saltelli_expand).
+    
+    Returns (draws, number of stochastic runs, design): design is None, or for
+    SALTELLI the (design table, {factor: variables}) pair for write_design.
     
     IMPORTANT: This function intentionally generates DUPLICATE scenarios.
     Duplicates encode probability information - their frequency represents
@@ -429,17 +1053,14 @@ def generate_draws(
     
     n_vars = len(var_names)
     n_periods = len(periods)
+    cont_map = cont_map or {}
+    var_dists = var_dists or {}
     
-    # Calculate dimensions needed
-    dims_per_period = []
-    for period in periods:
-        dims = 0
-        groups_in_period = group_map.get(period, {})
-        dims += len(groups_in_period)
-        for v in var_names:
-            if var_groups[v] is None and (v, period) in disc_map:
-                dims += 1
-        dims_per_period.append(dims)
+    # Calculate dimensions needed (one per driver: group or independent variable)
+    drivers_by_period = [
+        _period_drivers(period, var_names, disc_map, group_map, var_groups, cont_map) for period in periods
+    ]
+    dims_per_period = [len(d) for d in drivers_by_period]
     
     total_dims = sum(dims_per_period)
     
@@ -447,7 +1068,15 @@ def generate_draws(
         raise SystemExit("[ERROR] No variables defined for any period")
     
     # Sample unit cube
-    U = sample_unit_cube(runs, total_dims, engine, seed, block_size, exact_n)
+    saltelli = (design or DESIGN_NONE).upper() == DESIGN_SALTELLI
+    if saltelli:
+        # A and B side by side in one 2D-dimensional sample, then stacked as rows:
+        # the copula/AR(1) transform and the CDF lookup work row by row
+        U = sample_unit_cube(runs, 2 * total_dims, engine, seed, block_size, exact_n, replicates)
+        n_base = U.shape[0]
+        U = np.concatenate([U[:, :total_dims], U[:, total_dims:]], axis=0)
+    else:
+        U = sample_unit_cube(runs, total_dims, engine, seed, block_size, exact_n, replicates)
     actual_runs = U.shape[0]
     
     # Reshape U by period
@@ -457,13 +1086,31 @@ def generate_draws(
         U_by_period.append(U[:, dim_idx:dim_idx+d])
         dim_idx += d
     
+    # Optional Gaussian copula and AR(1) (in place on U, so the period views see it)
+    if (corr_matrix is not None and corr_drivers) or ar1_rho:
+        touched, corr_steps, ar_steps, chol_delta = build_dependence_plan(
+            drivers_by_period, corr_drivers, corr_matrix, ar1_rho
+        )
+        if chol_delta > TOL_CHOL_NOTIFY:
+            print(f"[TIP] Correlation required nearest-PD projection. Max |Delta|={chol_delta:.2e}")
+        apply_dependence(U, touched, corr_steps, ar_steps)
+    
     # Generate draws
     X = np.full((actual_runs, n_periods, n_vars), np.nan, dtype=float)
     
+    # Preallocated buffers for the fused continuous kernels (sized for the widest period)
+    k_max = max((sum(1 for v in var_names if (v, p) in cont_map) for p in periods), default=0)
+    if k_max:
+        buf_u = np.empty((actual_runs, k_max), dtype=float)
+        buf_out = np.empty_like(buf_u)
+        buf_tmp = np.empty_like(buf_u)
+        buf_mask = np.empty((actual_runs, k_max), dtype=bool)
+    
     for t, period in enumerate(periods):
         U_period = U_by_period[t]
         groups_in_period = group_map.get(period, {})
         u_idx = 0
+        cont_cols: Dict[str, List[Tuple[int, int]]] = {DIST_TRIANGULAR: [], DIST_UNIFORM: []}  # (U col, var col)
         
         # Process groups
         for grp, vars_in_grp in groups_in_period.items():
@@ -474,7 +1121,9 @@ def generate_draws(
             
             for v in vars_in_grp:
                 j = var_names.index(v)
-                if (v, period) in disc_map:
+                if (v, period) in cont_map:
+                    cont_cols[var_dists[v]].append((u_idx - 1, j))
+                elif (v, period) in disc_map:
                     vals, probs = disc_map[(v, period)]
                     cdf = np.cumsum(probs)
                     cdf[-1] = 1.0
@@ -484,7 +1133,10 @@ def generate_draws(
         
         # Process independent variables
         for v in var_names:
-            if var_groups[v] is None and (v, period) in disc_map:
+            if var_groups[v] is None and (v, period) in cont_map:
+                cont_cols[var_dists[v]].append((u_idx, var_names.index(v)))
+                u_idx += 1
+            elif var_groups[v] is None and (v, period) in disc_map:
                 j = var_names.index(v)
                 u_var = U_period[:, u_idx]
                 u_idx += 1
@@ -495,6 +1147,30 @@ def generate_draws(
                 idx = np.searchsorted(cdf, u_var, side="right")
                 idx = np.clip(idx, 0, len(vals) - 1)
                 X[:, t, j] = vals[idx]
+        
+        # Process continuous variables: one fused kernel call per family and period
+        for dist, pairs in cont_cols.items():
+            if not pairs:
+                continue
+            k = len(pairs)
+            u_cols = np.array([c for c, _ in pairs], dtype=int)
+            j_cols = np.array([j for _, j in pairs], dtype=int)
+            params = np.array([cont_map[(var_names[j], period)] for j in j_cols], dtype=float)
+            u_k, out_k = buf_u[:, :k], buf_out[:, :k]
+            np.take(U_period, u_cols, axis=1, out=u_k)
+            if dist == DIST_TRIANGULAR:
+                invcdf_triangular_into(u_k, params[:, 0], params[:, 1], params[:, 2],
+                                       out_k, buf_tmp[:, :k], buf_mask[:, :k])
+            else:
+                invcdf_uniform_into(u_k, params[:, 0], params[:, 2], out_k)
+            X[:, t, j_cols] = out_k
+    
+    design_out = None
+    if saltelli:
+        factor_names, var_factor, members = design_factors(drivers_by_period, periods, var_names, var_groups)
+        X, design_table = saltelli_expand(X, n_base, var_factor, factor_names)
+        actual_runs = X.shape[0]
+        design_out = (design_table, members)
     
     # Generate deterministic runs: base, best, worst
     base_mat = np.full((n_periods, n_vars), np.nan, dtype=float)
@@ -504,11 +1180,18 @@ def generate_draws(
     for t, period in enumerate(periods):
         groups_in_period = group_map.get(period, {})
         
+        # Continuous variables: base = mode, best/worst = interval ends
+        for v in var_names:
+            if (v, period) in cont_map:
+                j = var_names.index(v)
+                best_mat[t, j], base_mat[t, j], worst_mat[t, j] = cont_map[(v, period)]
+        
         # Process groups (synchronized)
         for grp, vars_in_grp in groups_in_period.items():
-            if not vars_in_grp:
+            disc_vars = [v for v in vars_in_grp if (v, period) in disc_map]
+            if not disc_vars:
                 continue
-            v0 = vars_in_grp[0]
+            v0 = disc_vars[0]
             if (v0, period) in disc_map:
                 vals, probs = disc_map[(v0, period)]
                 base_idx = int(np.argmax(probs))
@@ -540,6 +1223,10 @@ def generate_draws(
     var_random = np.tile(var_names, actual_runs)
     
     out_dict_random = {"run": run_random, COL_VARIABLE: var_random}
+    if (engine or "").upper() == ENGINE_SOBOL_R:
+        out_dict_random = {"run": run_random,
+                           COL_REPLICATE: np.repeat(replicate_ids(actual_runs, replicates), n_vars),
+                           COL_VARIABLE: var_random}
     for idx_p, p in enumerate(periods):
         out_dict_random[p] = data_random[:, idx_p]
     df_random = pd.DataFrame(out_dict_random)
@@ -559,8 +1246,11 @@ def generate_draws(
     df_worst = _mk_block("worst", worst_mat)
     
     out = pd.concat([df_base, df_best, df_worst, df_random], axis=0, ignore_index=True)
+    out = out[list(df_random.columns)]  # keep 'replicate' (if any) next to 'run'
+    if COL_REPLICATE in out.columns:
+        out[COL_REPLICATE] = out[COL_REPLICATE].astype("Int64")  # blank for base/best/worst
     
-    return out, actual_runs
+    return out, actual_runs, design_out
 
 # =========================
 # Main
@@ -572,8 +1262,12 @@ def main():
     )
     ap.add_argument("--input-excel", required=True, help="Input Excel file path")
     ap.add_argument("--out", required=True, help="Output path (.csv or .xlsx)")
-    ap.add_argument("--engine", choices=[ENGINE_SOBOL, ENGINE_RANDOM], 
-                    help=f"Sampling engine (default: {DEFAULT_ENGINE}). SOBOL recommended for better space coverage.")
+    ap.add_argument("--engine", choices=ENGINES, 
+                    help=f"Sampling engine (default: {DEFAULT_ENGINE}). SOBOL recommended for better space coverage. "
+                         f"{ENGINE_SOBOL_R} = independently scrambled Sobol replicates (for percentile error bars).")
+    ap.add_argument("--replicates", type=int,
+                    help=f"Number of replicates for {ENGINE_SOBOL_R} (default: {DEFAULT_REPLICATES}). "
+                         f"--runs is split across replicates, each padded to a power of 2 unless --exact-n.")
     ap.add_argument("--runs", type=int,
                     help=f"Number of Monte Carlo runs (default: {DEFAULT_RUNS}). "
                          f"Powers of 2 recommended: {RECOMMENDED_RUNS[:5]}. "
@@ -587,28 +1281,69 @@ def main():
     ap.add_argument("--exact-n", action="store_true",
                     help="Cut to exactly N runs instead of padding to block-size multiples. "
                          "Default: padding enabled for SOBOL efficiency.")
+    ap.add_argument("--design", choices=[DESIGN_NONE, DESIGN_SALTELLI],
+                    help=f"Sample design (default: {DESIGN_NONE}). {DESIGN_SALTELLI} = A/B/AB_i matrices for "
+                         f"Sobol sensitivity: --runs base rows, N*(factors+2) runs in total.")
+    ap.add_argument("--design-out",
+                    help="Design CSV for --design SALTELLI (default: <out>.design.csv)")
+    ap.add_argument("--copula", choices=[COPULA_NONE, COPULA_GAUSSIAN],
+                    help=f"Dependence between drivers (default: {COPULA_NONE}). {COPULA_GAUSSIAN} "
+                         f"correlates them with the workbook's '{SHEET_CORR}' sheet.")
     args = ap.parse_args()
     
     # Read inputs
     print("[INFO] Reading and validating input...")
-    variables, settings = read_inputs(args.input_excel)
+    variables, settings, corr = read_inputs(args.input_excel)
     
     # Validate and prepare
-    var_names, periods, disc_map, group_map, var_groups, scenario_info = validate_and_prepare(variables)
+    var_names, periods, disc_map, cont_map, var_dists, group_map, var_groups, scenario_info = validate_and_prepare(variables)
     
     # Get settings
     engine = (args.engine or settings.get("algorithm", DEFAULT_ENGINE)).strip().upper()
     runs = int(args.runs or int(settings.get("runs", str(DEFAULT_RUNS))))
     seed = int(args.seed or int(settings.get("seed", str(DEFAULT_SEED))))
     block_size = int(args.block_size)
+    replicates = int(args.replicates or int(settings.get("replicates", str(DEFAULT_REPLICATES))))
     exact_n = bool(args.exact_n or str(settings.get("exact_n", str(DEFAULT_EXACT_N))).strip().lower() 
                    in ["1", "true", "yes", "on"])
+    copula = (args.copula or settings.get("copula", "") or COPULA_NONE).strip().upper()
+    if copula not in (COPULA_NONE, COPULA_GAUSSIAN):
+        raise SystemExit(f"[ERROR] Unknown copula: {copula!r}. Expected '{COPULA_NONE}' or '{COPULA_GAUSSIAN}'.")
+    if corr is not None and copula == COPULA_NONE:
+        print(f"[INFO] '{SHEET_CORR}' sheet ignored (copula={COPULA_NONE}); use --copula {COPULA_GAUSSIAN} to apply it.")
+    
+    corr_drivers, corr_matrix = None, None
+    if copula == COPULA_GAUSSIAN:
+        if corr is None:
+            raise SystemExit(f"[ERROR] copula={COPULA_GAUSSIAN} requires a '{SHEET_CORR}' sheet")
+        all_drivers = list(dict.fromkeys(
+            d for p in periods for d in _period_drivers(p, var_names, disc_map, group_map, var_groups, cont_map)
+        ))
+        corr_drivers, corr_matrix = validate_correlation(corr, all_drivers)
+    
+    ar1_rho = validate_ar1(variables, var_groups)
+    
+    design = (args.design or settings.get("design", "") or DESIGN_NONE).strip().upper()
+    if design not in (DESIGN_NONE, DESIGN_SALTELLI):
+        raise SystemExit(f"[ERROR] Unknown design: {design!r}. Expected '{DESIGN_NONE}' or '{DESIGN_SALTELLI}'.")
+    if design == DESIGN_SALTELLI:
+        # Cross-sampling swaps whole drivers between A and B: it keeps each driver's
+        # own AR(1) path, but not correlations between drivers
+        if copula == COPULA_GAUSSIAN:
+            raise SystemExit(f"[ERROR] design={DESIGN_SALTELLI} needs independent drivers: use --copula {COPULA_NONE}")
+        if engine == ENGINE_SOBOL_R:
+            raise SystemExit(f"[ERROR] design={DESIGN_SALTELLI} does not support engine {ENGINE_SOBOL_R}")
     
     # Show startup summary
-    print(f"[INFO] Configuration: engine={engine}, runs={runs}, seed={seed}")
+    print(f"[INFO] Configuration: engine={engine}, runs={runs}, seed={seed}, copula={copula}"
+          + (f", AR(1) drivers={len(ar1_rho)}" if ar1_rho else "")
+          + (f", design={design}" if design != DESIGN_NONE else ""))
     print(f"[INFO] Structure: {scenario_info['total_vars']} variables "
           f"({scenario_info['num_groups']} groups, {scenario_info['independent_vars']} independent), "
           f"{scenario_info['num_periods']} periods")
+    if scenario_info.get("continuous_vars"):
+        print(f"[INFO] {scenario_info['continuous_vars']} continuous variable(s) (triangular/uniform): "
+              f"scenario space below counts discrete variables only")
     
     median_scen = scenario_info['median_scenarios']
     n_periods = scenario_info['num_periods']
@@ -629,7 +1364,7 @@ def main():
     
     # Generate draws
     print("\n[INFO] Generating Monte Carlo samples...")
-    out, final_runs = generate_draws(
+    out, final_runs, design_out = generate_draws(
         var_names=var_names,
         periods=periods,
         disc_map=disc_map,
@@ -640,6 +1375,13 @@ def main():
         seed=seed,
         block_size=block_size,
         exact_n=exact_n,
+        corr_drivers=corr_drivers,
+        corr_matrix=corr_matrix,
+        ar1_rho=ar1_rho,
+        cont_map=cont_map,
+        var_dists=var_dists,
+        replicates=replicates,
+        design=design,
     )
     
     # Write output
@@ -651,6 +1393,18 @@ def main():
     
     print(f"[OK] Successfully wrote {len(out):,} rows × {len(out.columns):,} columns")
     print(f"[OK] Output includes: 3 deterministic runs (base/best/worst) + {final_runs:,} stochastic runs")
+    if design_out is not None:
+        design_table, members = design_out
+        design_path = args.design_out or os.path.splitext(args.out)[0] + ".design.csv"
+        write_design(design_table, members, design_path)
+        n_base = int(design_table[COL_ROW].max()) + 1
+        n_dup = int(design_table[COL_DUPLICATE_OF].notna().sum())
+        print(f"[OK] Saltelli design: {n_base:,} base rows x ({len(members)} factors + 2) = {final_runs:,} runs; "
+              f"{n_dup:,} duplicate runs, {final_runs - n_dup:,} to forecast")
+        print(f"[OK] Design written to {design_path} (montecarlo_sensitivity_v1.py --design)")
+    if engine == ENGINE_SOBOL_R:
+        print(f"[OK] {replicates} replicates x {final_runs // replicates:,} runs, tagged in column '{COL_REPLICATE}' "
+              f"(percentile CIs: replicate_percentile_ci)")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+montecarlo_sensitivity.py
+
+Variance-based sensitivity of forecast outputs to the generator's input draws.
+
+Inputs:
+  --draws    generator output (montecarlo_generate_*: run,[replicate,]variable,<period...>)
+  --outputs  forecast results for the same runs: long CSV scenario,date,kpi,value
+             (scenario 'Sim_00042' or '42' = run 42) or the generator's wide layout
+  --design   optional Saltelli design (montecarlo_generate_v18 --design-out): which
+             runs are the A, B and AB_i matrices of the cross-sampled design
+
+With a design, first-order indices use the Saltelli (2010) estimator and total
+effects the Jansen estimator, per factor (driver: group or independent variable),
+KPI and date. Without one, the fallback ranks variables by Spearman rank
+correlation (sensitivity = rho^2) on the plain Monte Carlo runs.
+
+Estimators are vectorized over factors, KPIs and dates and accumulated over
+chunks of runs (peak memory: one chunk x factors x outputs).
+
+Output: a ranking table, one record per (kpi, date, variable) sorted by
+sensitivity, with the fields of the dashboards' sensitivity.json
+(kpi, date, variable, sensitivity, correlation, firstOrderIndex, totalOrderIndex)
+plus rank; .json (array of records) or .csv.
+"""
+from __future__ import annotations
+
+import argparse
+from typing import Dict, List, Tuple, Optional
+import json
+import re
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+# =========================
+# Constants
+# =========================
+COL_RUN: str = "run"
+COL_REPLICATE: str = "replicate"
+COL_VARIABLE: str = "variable"
+COL_SCENARIO: str = "scenario"
+COL_KPI: str = "kpi"
+COL_DATE: str = "date"
+COL_VALUE: str = "value"
+
+# Saltelli design file (written by montecarlo_generate_v18 --design-out)
+COL_BLOCK: str = "block"          # A, B or AB
+COL_FACTOR: str = "factor"        # AB rows: the factor taken from B
+COL_ROW: str = "row"              # base row k (0..N-1) of the design
+COL_DUPLICATE_OF: str = "duplicate_of"  # run with identical draws (not re-forecast)
+META_FACTORS: str = "factors"     # '# factors: {"driver": ["var", ...]}' header line
+BLOCK_A: str = "A"
+BLOCK_B: str = "B"
+BLOCK_AB: str = "AB"
+
+REFERENCE_RUNS: Tuple[str, ...] = ("base", "best", "worst")
+
+METHOD_SOBOL: str = "sobol"
+METHOD_RANK: str = "rank_correlation"
+
+CSV_CHUNK_ROWS: int = 200_000
+DEFAULT_RUN_CHUNK: int = 4096
+DEFAULT_TOP: int = 0  # 0 = all factors
+
+# =========================
+# Helpers
+# =========================
+
+_RUN_DIGITS = re.compile(r"(\d+)$")
+
+def _run_number(label) -> Optional[int]:
+    """Run number of a run/scenario label ('42', 'Sim_00042' -> 42); None for base/best/worst."""
+    s = str(label).strip()
+    if s.lower() in REFERENCE_RUNS:
+        return None
+    m = _RUN_DIGITS.search(s)
+    return int(m.group(1)) if m else None
+
+def _run_numbers(labels: pd.Series) -> np.ndarray:
+    """_run_number of every label (-1 for base/best/worst), parsed once per distinct label."""
+    codes, uniques = pd.factorize(labels)
+    lut = np.array([-1 if (n := _run_number(u)) is None else n for u in uniques], dtype=np.int64)
+    return lut[codes] if len(codes) else np.empty(0, dtype=np.int64)
+
+def _read_comment_header(path: str) -> Tuple[Dict[str, str], int]:
+    """Leading '# key: value' lines -> (dict, number of comment lines)."""
+    meta: Dict[str, str] = {}
+    n = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            s = line.strip()
+            if not s.startswith("#"):
+                break
+            n += 1
+            key, sep, value = s.lstrip("#").partition(":")
+            if sep:
+                meta[key.strip().lower()] = value.strip()
+    return meta, n
+
+def _read_table_chunks(path: str, usecols=None, dtype=None):
+    """CSV in chunks (comment header skipped) or the whole first sheet of an .xlsx."""
+    if path.lower().endswith(".xlsx"):
+        df = pd.read_excel(path, dtype=dtype)
+        yield df if usecols is None else df[[c for c in df.columns if c in usecols]]
+        return
+    _, n_comments = _read_comment_header(path)
+    yield from pd.read_csv(path, engine="c", skiprows=n_comments, chunksize=CSV_CHUNK_ROWS,
+                           usecols=usecols, dtype=dtype)
+
+def _header(path: str) -> List[str]:
+    if path.lower().endswith(".xlsx"):
+        return [str(c) for c in pd.read_excel(path, nrows=0).columns]
+    _, n_comments = _read_comment_header(path)
+    return [str(c) for c in pd.read_csv(path, nrows=0, skiprows=n_comments).columns]
+
+# =========================
+# Reading
+# =========================
+
+def read_wide(path: str, label_col: str = COL_VARIABLE) -> Tuple[np.ndarray, List[str], List[str], np.ndarray]:
+    """
+    Wide generator layout (run,[replicate,]<label_col>,<period...>) into a dense
+    array X[run, label, period]. base/best/worst rows are skipped.
+    Returns (run numbers (sorted), labels (first-seen order), periods, X).
+    """
+    header = _header(path)
+    missing = {COL_RUN, label_col} - set(header)
+    if missing:
+        raise SystemExit(f"[ERROR] Missing columns in {path}: {sorted(missing)}")
+    periods = [c for c in header if c not in (COL_RUN, COL_REPLICATE, label_col)]
+    labels: Dict[str, int] = {}
+    parts = []
+    for chunk in _read_table_chunks(path, usecols=[COL_RUN, label_col, *periods],
+                                    dtype={COL_RUN: str, label_col: str}):
+        runs = _run_numbers(chunk[COL_RUN])
+        keep = runs >= 0
+        if not keep.any():
+            continue
+        codes = np.array([labels.setdefault(str(v), len(labels)) for v in chunk[label_col].to_numpy()[keep]])
+        parts.append((runs[keep], codes, chunk[periods].to_numpy(dtype=float)[keep]))
+    if not parts:
+        raise SystemExit(f"[ERROR] No run rows found in {path}")
+    run_ids = np.unique(np.concatenate([p[0] for p in parts]))
+    X = np.full((len(run_ids), len(labels), len(periods)), np.nan)
+    for runs, codes, block in parts:
+        X[np.searchsorted(run_ids, runs), codes] = block
+    return run_ids, list(labels), periods, X
+
+def read_outputs(path: str, run_ids: np.ndarray) -> Tuple[List[str], List[str], np.ndarray]:
+    """
+    Forecast outputs aligned to run_ids: Y[run, kpi, date] (NaN where missing).
+    Long (scenario|run, date, kpi, value) or wide generator layout (kpi = variable).
+    """
+    header = set(_header(path))
+    if {COL_KPI, COL_VALUE, COL_DATE} <= header:
+        run_col = COL_SCENARIO if COL_SCENARIO in header else COL_RUN
+        kpis: Dict[str, int] = {}
+        dates: Dict[str, int] = {}
+        parts = []
+        for chunk in _read_table_chunks(path, usecols=[run_col, COL_DATE, COL_KPI, COL_VALUE],
+                                        dtype={run_col: str, COL_DATE: str, COL_KPI: str}):
+            chunk = chunk.dropna(subset=[COL_VALUE])
+            nums = _run_numbers(chunk[run_col])
+            pos = np.searchsorted(run_ids, nums)
+            keep = (pos < len(run_ids)) & (run_ids[np.minimum(pos, len(run_ids) - 1)] == nums)
+            if not keep.any():
+                continue
+            k = np.array([kpis.setdefault(v, len(kpis)) for v in chunk[COL_KPI].to_numpy()[keep]])
+            d = np.array([dates.setdefault(v, len(dates)) for v in chunk[COL_DATE].to_numpy()[keep]])
+            parts.append((pos[keep], k, d, chunk[COL_VALUE].to_numpy(dtype=float)[keep]))
+        Y = np.full((len(run_ids), len(kpis), len(dates)), np.nan)
+        for r, k, d, v in parts:
+            Y[r, k, d] = v
+        # chronological date order (labels are ISO dates in the long layout)
+        order = np.argsort(list(dates), kind="stable")
+        return list(kpis), [list(dates)[i] for i in order], Y[:, :, order]
+
+    out_runs, kpis, dates, Yw = read_wide(path)
+    Y = np.full((len(run_ids), len(kpis), len(dates)), np.nan)
+    pos = np.searchsorted(out_runs, run_ids)
+    found = (pos < len(out_runs)) & (out_runs[np.minimum(pos, len(out_runs) - 1)] == run_ids)
+    Y[found] = Yw[pos[found]]
+    return kpis, dates, Y
+
+def read_design(path: str) -> Tuple[pd.DataFrame, Dict[str, List[str]]]:
+    """Saltelli design table and the factor -> variables map of its comment header."""
+    meta, n_comments = _read_comment_header(path)
+    design = pd.read_csv(path, skiprows=n_comments, dtype={COL_BLOCK: str, COL_FACTOR: str})
+    missing = {COL_RUN, COL_BLOCK, COL_FACTOR, COL_ROW} - set(design.columns)
+    if missing:
+        raise SystemExit(f"[ERROR] Missing columns in design {path}: {sorted(missing)}")
+    factors = json.loads(meta[META_FACTORS]) if META_FACTORS in meta else {}
+    return design, factors
+
+# =========================
+# Estimators
+# =========================
+
+def saltelli_jansen(
+    YA: np.ndarray,
+    YB: np.ndarray,
+    YAB: np.ndarray,
+    chunk: int = DEFAULT_RUN_CHUNK,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    First-order (Saltelli 2010) and total-effect (Jansen 1999) indices.
+
+    YA, YB: (N, M) outputs of the A and B matrices; YAB: (d, N, M) outputs of AB_i
+    (A with factor i taken from B). M = any number of outputs (KPI x date).
+      V    = Var(f(A) u f(B))
+      S_i  = mean(f(B) * (f(AB_i) - f(A))) / V
+      ST_i = mean((f(A) - f(AB_i))^2) / (2 V)
+    Returns (S (d, M), ST (d, M)); NaN where V == 0.
+    """
+    N, M = YA.shape
+    d = YAB.shape[0]
+    s1 = np.zeros((d, M))
+    st = np.zeros((d, M))
+    tot = np.zeros(M)
+    tot2 = np.zeros(M)
+    for lo in range(0, N, chunk):
+        a, b, ab = YA[lo:lo + chunk], YB[lo:lo + chunk], YAB[:, lo:lo + chunk]
+        tot += a.sum(axis=0) + b.sum(axis=0)
+        tot2 += (a * a).sum(axis=0) + (b * b).sum(axis=0)
+        diff = ab - a[None]
+        s1 += np.einsum("nm,dnm->dm", b, diff)
+        st += np.einsum("dnm,dnm->dm", diff, diff)
+    mean = tot / (2 * N)
+    var = tot2 / (2 * N) - mean * mean
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var = np.where(var > 0, var, np.nan)
+        return s1 / N / var, st / (2 * N) / var
+
+def rank_correlation(X: np.ndarray, Y: np.ndarray, chunk: int = DEFAULT_RUN_CHUNK) -> np.ndarray:
+    """
+    Spearman correlation of every input column X[:, i] with every output Y[:, m]:
+    (d, M). Ranks are taken over all runs, the cross products accumulated per
+    chunk of runs. Constant columns give NaN.
+    """
+    def _standardized_ranks(A: np.ndarray) -> np.ndarray:
+        R = stats.rankdata(A, axis=0)
+        R -= R.mean(axis=0)
+        sd = np.sqrt((R * R).mean(axis=0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return R / np.where(sd > 0, sd, np.nan)
+
+    Rx = _standardized_ranks(X)
+    Ry = _standardized_ranks(Y)
+    rho = np.zeros((X.shape[1], Y.shape[1]))
+    for lo in range(0, len(X), chunk):
+        rho += Rx[lo:lo + chunk].T @ Ry[lo:lo + chunk]
+    return rho / len(X)
+
+# =========================
+# Factors and ranking
+# =========================
+
+def factor_inputs(X: np.ndarray, var_names: List[str], factors: Dict[str, List[str]]) -> np.ndarray:
+    """
+    One scalar per run and factor, for the rank correlation: each variable's mean
+    over periods, standardized, averaged over the factor's variables.
+    X: (runs, variables, periods) -> (runs, factors).
+    """
+    with np.errstate(invalid="ignore"):
+        per_var = np.nanmean(X, axis=2)
+        sd = per_var.std(axis=0)
+        z = (per_var - per_var.mean(axis=0)) / np.where(sd > 0, sd, 1.0)
+    col = {v: j for j, v in enumerate(var_names)}
+    out = np.full((X.shape[0], len(factors)), np.nan)
+    for i, members in enumerate(factors.values()):
+        idx = [col[v] for v in members if v in col]
+        if idx:
+            out[:, i] = z[:, idx].mean(axis=1)
+    return out
+
+def ranking_table(
+    factor_names: List[str],
+    kpis: List[str],
+    dates: List[str],
+    first: np.ndarray,
+    total: Optional[np.ndarray],
+    corr: np.ndarray,
+    sensitivity: np.ndarray,
+    top: int = DEFAULT_TOP,
+) -> pd.DataFrame:
+    """
+    Long ranking table from (factors, kpi * date) arrays; sensitivity in % of the
+    output variance, rank 1 = largest per (kpi, date), keeping the top `top` (0 = all).
+    """
+    d = len(factor_names)
+    kk, dd = np.meshgrid(np.arange(len(kpis)), np.arange(len(dates)), indexing="ij")
+    n_out = kk.size
+    df = pd.DataFrame({
+        COL_KPI: np.tile(np.array(kpis, dtype=object)[kk.ravel()], d),
+        COL_DATE: np.tile(np.array(dates, dtype=object)[dd.ravel()], d),
+        COL_VARIABLE: np.repeat(np.array(factor_names, dtype=object), n_out),
+        "sensitivity": 100.0 * sensitivity.ravel(),
+        "correlation": corr.ravel(),
+        "firstOrderIndex": first.ravel(),
+        "totalOrderIndex": total.ravel() if total is not None else np.nan,
+    })
+    df = df.dropna(subset=["sensitivity"])
+    df = df.sort_values([COL_KPI, COL_DATE, "sensitivity"], ascending=[True, True, False], kind="stable")
+    df["rank"] = df.groupby([COL_KPI, COL_DATE], sort=False).cumcount() + 1
+    if top > 0:
+        df = df[df["rank"] <= top]
+    return df.reset_index(drop=True)
+
+def _design_outputs(
+    design: pd.DataFrame,
+    run_ids: np.ndarray,
+    Y: np.ndarray,
+) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+    """Y (runs, M) -> factor names, YA (N, M), YB (N, M), YAB (d, N, M), filling duplicate runs."""
+    Y = Y.copy()
+    pos = {int(r): i for i, r in enumerate(run_ids)}
+    if COL_DUPLICATE_OF in design.columns:
+        # runs tagged duplicate_of were not re-forecast: take the results of the identical run
+        dup = design.dropna(subset=[COL_DUPLICATE_OF])
+        for run, src in zip(dup[COL_RUN].astype(int), dup[COL_DUPLICATE_OF].astype(int)):
+            if run in pos and src in pos and np.isnan(Y[pos[run]]).all():
+                Y[pos[run]] = Y[pos[src]]
+    N = int(design[COL_ROW].max()) + 1
+
+    def _block(rows: pd.DataFrame) -> np.ndarray:
+        out = np.full((N, Y.shape[1]), np.nan)
+        idx = [pos.get(int(r), -1) for r in rows[COL_RUN]]
+        ok = np.array(idx) >= 0
+        out[rows[COL_ROW].to_numpy()[ok]] = Y[np.array(idx)[ok]]
+        return out
+
+    YA = _block(design[design[COL_BLOCK] == BLOCK_A])
+    YB = _block(design[design[COL_BLOCK] == BLOCK_B])
+    ab = design[design[COL_BLOCK] == BLOCK_AB]
+    names = list(dict.fromkeys(ab[COL_FACTOR]))
+    YAB = np.stack([_block(ab[ab[COL_FACTOR] == f]) for f in names]) if names else np.empty((0, N, Y.shape[1]))
+    return names, YA, YB, YAB
+
+def compute_sensitivity(
+    draws_path: str,
+    outputs_path: str,
+    design_path: Optional[str] = None,
+    kpis_filter: Optional[List[str]] = None,
+    dates_filter: Optional[List[str]] = None,
+    top: int = DEFAULT_TOP,
+    chunk: int = DEFAULT_RUN_CHUNK,
+) -> Tuple[pd.DataFrame, str]:
+    """Ranking table and the method used (METHOD_SOBOL with a design, else METHOD_RANK)."""
+    run_ids, var_names, _, X = read_wide(draws_path)
+    kpis, dates, Y = read_outputs(outputs_path, run_ids)
+    k_sel = [i for i, k in enumerate(kpis) if not kpis_filter or k in kpis_filter]
+    d_sel = [i for i, d in enumerate(dates) if not dates_filter or d in dates_filter]
+    if not k_sel or not d_sel:
+        raise SystemExit("[ERROR] No output left after the --kpis/--dates filters")
+    kpis = [kpis[i] for i in k_sel]
+    dates = [dates[i] for i in d_sel]
+    Y = Y[:, k_sel][:, :, d_sel].reshape(len(run_ids), -1)
+
+    if design_path:
+        design, factors = read_design(design_path)
+        names, YA, YB, YAB = _design_outputs(design, run_ids, Y)
+        complete = np.isfinite(YA).all(axis=1) & np.isfinite(YB).all(axis=1) & np.isfinite(YAB).all(axis=(0, 2))
+        if not complete.all():
+            print(f"[WARN] {int((~complete).sum()):,} of {len(complete):,} design rows have missing outputs: dropped")
+        YA, YB, YAB = YA[complete], YB[complete], YAB[:, complete]
+        first, total = saltelli_jansen(YA, YB, YAB, chunk)
+        factors = {f: factors.get(f, [f]) for f in names}
+        # correlations from the A and B rows only (independent samples of the inputs)
+        ab_runs = design[design[COL_BLOCK].isin([BLOCK_A, BLOCK_B])][COL_RUN].astype(int).to_numpy()
+        rows = np.searchsorted(run_ids, ab_runs)
+        rows = rows[(rows < len(run_ids)) & np.isfinite(Y[np.minimum(rows, len(run_ids) - 1)]).all(axis=1)]
+        corr = rank_correlation(factor_inputs(X[rows], var_names, factors), Y[rows], chunk)
+        sensitivity = np.clip(first, 0.0, None)  # small negative estimates are sampling noise
+        method = METHOD_SOBOL
+    else:
+        complete = np.isfinite(Y).all(axis=1)
+        if not complete.all():
+            print(f"[WARN] {int((~complete).sum()):,} of {len(complete):,} runs have missing outputs: dropped")
+        factors = {v: [v] for v in var_names}
+        names = var_names
+        corr = rank_correlation(factor_inputs(X[complete], var_names, factors), Y[complete], chunk)
+        first, total = corr * corr, None
+        sensitivity = first
+        method = METHOD_RANK
+
+    table = ranking_table(names, kpis, dates, first, total, corr, sensitivity, top)
+    return table, method
+
+def write_table(table: pd.DataFrame, path: str) -> None:
+    if path.lower().endswith(".csv"):
+        table.to_csv(path, index=False)
+        return
+    records = table.astype(object).where(table.notna(), None).to_dict(orient="records")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(records, f, indent=2)
+
+# =========================
+# Main
+# =========================
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Sobol / rank-correlation sensitivity of forecast outputs to Monte Carlo draws"
+    )
+    ap.add_argument("--draws", required=True, help="Generator output with the input draws (.csv or .xlsx)")
+    ap.add_argument("--outputs", required=True,
+                    help="Forecast outputs per run: long scenario,date,kpi,value CSV or wide generator layout")
+    ap.add_argument("--design",
+                    help="Saltelli design CSV (montecarlo_generate_v18 --design-out); "
+                         "without it the ranking uses rank correlation")
+    ap.add_argument("--out", required=True, help="Ranking table (.json records or .csv)")
+    ap.add_argument("--kpis", nargs="+", help="Only these KPIs")
+    ap.add_argument("--dates", nargs="+", help="Only these dates/periods (labels as in --outputs)")
+    ap.add_argument("--top", type=int, default=DEFAULT_TOP,
+                    help="Keep the top N factors per KPI and date (default: all)")
+    ap.add_argument("--chunk", type=int, default=DEFAULT_RUN_CHUNK,
+                    help=f"Runs per accumulation chunk (default: {DEFAULT_RUN_CHUNK})")
+    args = ap.parse_args()
+
+    print("[INFO] Reading draws, outputs" + (" and design" if args.design else "") + "...")
+    table, method = compute_sensitivity(
+        args.draws, args.outputs, args.design,
+        kpis_filter=args.kpis, dates_filter=args.dates, top=args.top, chunk=args.chunk,
+    )
+    write_table(table, args.out)
+    n_groups = table.groupby([COL_KPI, COL_DATE]).ngroups
+    print(f"[OK] Method: {method}; {n_groups:,} KPI/date outputs, {table[COL_VARIABLE].nunique():,} factors")
+    print(f"[OK] Wrote {len(table):,} rows to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -11,13 +11,35 @@ CHANGES
 - No meta.kpis in output.
 - No scaling. YAML `unit` is informational only.
 - Verbose guardrails retained (warnings for missing labels/sheets/headers).
+- Optional parallel extraction (--workers N): bounded process pool, records are
+  consumed as each workbook finishes (in file order), per-file warnings are
+  printed together with the file they belong to.
+- Optional streaming read (--streaming): openpyxl read-only/values-only, reads the
+  date header row, streams the label column and keeps only the cells of the mapped
+  rows, instead of loading every sheet into a DataFrame of Python objects.
+- Optional incremental cache (--cache-dir DIR): a manifest maps each workbook to
+  its mtime/size/SHA-256 and to a fragment file with its extracted records. Re-runs
+  only re-extract new or changed workbooks, drop deleted ones, and rebuild the
+  output from the cached fragments. A changed YAML mapping invalidates the cache.
+  Workbooks that cannot be opened or read are not cached and are retried next run.
+- Output is written incrementally, one workbook at a time (--format, default from
+  the --out suffix): "json" keeps the 1.0 shape below, "ndjson" writes a header
+  line {"version","meta"} followed by one record per line, "parquet" writes a
+  columnar file (scenario, date, kpi, value) with version/meta in the schema
+  metadata (requires pyarrow).
+- Label matching is compiled once per section from the YAML `labels` map; each
+  label column is scanned a single time and all KPIs are resolved together.
+  Optional fallback (--fuzzy-labels [CUTOFF]): labels that differ only in case,
+  accents, punctuation or spacing, or that are similar above CUTOFF (difflib
+  ratio, default 0.85), are matched in the same pass and reported with a warning.
 
 USAGE
 -----
     python excel_to_records_dir.py \
         --excel-dir path/to/folder \
         --yaml      path/to/mapping.yaml \
-        --out       output.json
+        --out       output.json \
+        [--workers  8] [--format json|ndjson|parquet]
 
 The script will include *.xlsx and *.xlsm files in the directory (not recursive).
 
@@ -86,11 +108,21 @@ pip install pandas openpyxl pyyaml python-dateutil
 from __future__ import annotations
 
 import argparse
+import contextlib
+import datetime as dt
+import difflib
+import hashlib
+import io
 import json
 import math
+import os
+import textwrap
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Any
 
+import openpyxl
 import pandas as pd
 import yaml
 from dateutil import parser as dateparser
@@ -117,6 +149,12 @@ def normalize_label(s: str) -> str:
     return " ".join(str(s).strip().lower().split())
 
 
+def compact_label(s: str) -> str:
+    """Looser key for fallback matching: normalized, accents stripped, letters/digits only."""
+    decomposed = unicodedata.normalize("NFKD", normalize_label(s))
+    return "".join(ch for ch in decomposed if ch.isalnum())
+
+
 def try_parse_date(cell: Any) -> Optional[str]:
     """
     Try to parse a cell into ISO date (YYYY-MM-DD).
@@ -133,8 +171,8 @@ def try_parse_date(cell: Any) -> Optional[str]:
         except Exception:
             pass
     try:
-        dt = dateparser.parse(str(cell), dayfirst=True, yearfirst=False, fuzzy=True)
-        return dt.date().isoformat()
+        parsed = dateparser.parse(str(cell), dayfirst=True, yearfirst=False, fuzzy=True)
+        return parsed.date().isoformat()
     except Exception:
         return None
 
@@ -167,9 +205,88 @@ class MetaSpec:
             raise ValueError(f"YAML meta is missing required fields: {', '.join(missing)}")
 
 
+class LabelMatcher:
+    """
+    Label matcher compiled once from a section's `labels` map (kpi -> label text).
+
+    scan() walks a label column a single time and resolves every KPI together.
+    Exact matches are on normalize_label(); with fuzzy_cutoff set, cells that
+    match no label exactly are also tried against the compact_label() index and
+    then by difflib similarity. Priority is exact > normalized > fuzzy (best ratio);
+    for equal priority the last occurrence wins, as with the exact index.
+    """
+    EXACT, NORMALIZED, FUZZY = "exact", "normalized", "fuzzy"
+    _RANK = {EXACT: 3, NORMALIZED: 2, FUZZY: 1}
+
+    def __init__(self, labels_map: Dict[str, str], fuzzy_cutoff: Optional[float] = None):
+        self.labels_map = labels_map
+        self.fuzzy_cutoff = fuzzy_cutoff
+        # normalized label -> KPIs (several KPIs may share one label)
+        self.exact: Dict[str, List[str]] = {}
+        for kpi, label_text in labels_map.items():
+            self.exact.setdefault(normalize_label(label_text), []).append(kpi)
+        # compact label -> KPIs, and one SequenceMatcher per compact label (seq2 is cached)
+        self.compact: Dict[str, List[str]] = {}
+        for kpi, label_text in labels_map.items():
+            self.compact.setdefault(compact_label(label_text), []).append(kpi)
+        self._seq = {key: difflib.SequenceMatcher(None, "", key, autojunk=False) for key in self.compact if key}
+
+    def scan(self, rows: Iterable[Tuple[Any, Any]]) -> Dict[str, Tuple[Any, str, str]]:
+        """
+        rows: (label cell, payload) pairs, payload being whatever the caller needs back
+        (row index, row values). Returns kpi -> (payload, cell text, match kind).
+        """
+        fuzzy = self.fuzzy_cutoff is not None
+        best: Dict[str, Tuple[Tuple[int, float], Any, str, str]] = {}
+
+        def offer(kpis: List[str], kind: str, score: float, payload: Any, text: str) -> None:
+            key = (self._RANK[kind], score)
+            for kpi in kpis:
+                cur = best.get(kpi)
+                if cur is None or key >= cur[0]:
+                    best[kpi] = (key, payload, text, kind)
+
+        for cell, payload in rows:
+            if cell is None or (isinstance(cell, float) and math.isnan(cell)):
+                continue
+            text = str(cell)
+            norm = normalize_label(text)
+            if not norm:
+                continue
+            kpis = self.exact.get(norm)
+            if kpis is not None:
+                offer(kpis, self.EXACT, 1.0, payload, text)
+                continue
+            if not fuzzy:
+                continue
+            key = compact_label(norm)
+            kpis = self.compact.get(key)
+            if kpis is not None:
+                offer(kpis, self.NORMALIZED, 1.0, payload, text)
+                continue
+            for target, sm in self._seq.items():
+                sm.set_seq1(key)
+                if sm.real_quick_ratio() < self.fuzzy_cutoff or sm.quick_ratio() < self.fuzzy_cutoff:
+                    continue
+                ratio = sm.ratio()
+                if ratio >= self.fuzzy_cutoff:
+                    offer(self.compact[target], self.FUZZY, ratio, payload, text)
+
+        return {kpi: (payload, text, kind) for kpi, (_, payload, text, kind) in best.items()}
+
+    def report(self, section: str, matches: Dict[str, Tuple[Any, str, str]]) -> None:
+        """Warn for every KPI that is missing or matched only through the fallback."""
+        for kpi, label_text in self.labels_map.items():
+            m = matches.get(kpi)
+            if m is None:
+                warn(f"[{section}] Label not found for KPI '{kpi}': '{label_text}'")
+            elif m[2] != self.EXACT:
+                warn(f"[{section}] Label for KPI '{kpi}': '{label_text}' matched ({m[2]}) to '{m[1]}'")
+
+
 class SectionSpec:
     """Per-section spec parsed from YAML."""
-    def __init__(self, name: str, spec: Dict[str, Any]):
+    def __init__(self, name: str, spec: Dict[str, Any], fuzzy_cutoff: Optional[float] = None):
         self.name = name
         try:
             self.sheet_name: str = spec["sheet_name"]
@@ -186,9 +303,13 @@ class SectionSpec:
             raise ValueError(f"Section '{name}': 'labels' must be a mapping of kpi -> label_text.")
         if not self.labels_map:
             warn(f"Section '{name}' has empty 'labels' mapping.")
+        self.matcher = LabelMatcher(self.labels_map, fuzzy_cutoff=fuzzy_cutoff)
 
 
-def load_yaml_mapping(path: Path) -> Tuple[MetaSpec, Dict[str, SectionSpec]]:
+def load_yaml_mapping(
+    path: Path,
+    fuzzy_cutoff: Optional[float] = None
+) -> Tuple[MetaSpec, Dict[str, SectionSpec]]:
     with path.open("r", encoding="utf-8") as f:
         data = yaml.safe_load(f)
 
@@ -206,7 +327,7 @@ def load_yaml_mapping(path: Path) -> Tuple[MetaSpec, Dict[str, SectionSpec]]:
             continue
         if not isinstance(sec_spec, dict):
             raise ValueError(f"Section '{sec_name}' spec must be a mapping.")
-        sections[sec_name] = SectionSpec(sec_name, sec_spec)
+        sections[sec_name] = SectionSpec(sec_name, sec_spec, fuzzy_cutoff=fuzzy_cutoff)
 
     if not sections:
         raise ValueError("YAML contains no data sections (e.g., 'income_statement', 'balance_sheet', ...).")
@@ -217,23 +338,22 @@ def load_yaml_mapping(path: Path) -> Tuple[MetaSpec, Dict[str, SectionSpec]]:
 # ---------------------------- Extraction Helpers ------------------------------
 
 
-def build_label_index(df: pd.DataFrame, row_start: int, labels_col: int) -> Dict[str, int]:
+def build_label_index(df: pd.DataFrame, sec: SectionSpec) -> Dict[str, int]:
     """
-    Build an index: normalized label text → row index (0-based in DataFrame).
-    Scans from start_row to the end in the given labels column.
+    Build an index: KPI → row index (0-based in DataFrame), using the section's
+    compiled matcher. Scans the labels column once, from start_row to the end.
+    Missing and fallback-matched KPIs are reported with a warning.
     """
-    labels_row_start_0 = row_start - 1  # convert 1-based to 0-based
-    labels_col_0 = labels_col - 1
+    labels_row_start_0 = sec.start_row - 1  # convert 1-based to 0-based
+    labels_col_0 = sec.labels_column - 1
 
-    label_to_row: Dict[str, int] = {}
-    for r0 in range(labels_row_start_0, len(df)):
-        cell = df.iat[r0, labels_col_0] if labels_col_0 < df.shape[1] else None
-        if pd.isna(cell) or (str(cell).strip() == ""):
-            continue
-        norm = normalize_label(str(cell))
-        if norm:
-            label_to_row[norm] = r0
-    return label_to_row
+    if labels_col_0 < df.shape[1]:
+        column = df.iloc[labels_row_start_0:, labels_col_0].tolist()
+    else:
+        column = []
+    matches = sec.matcher.scan(zip(column, range(labels_row_start_0, len(df))))
+    sec.matcher.report(sec.name, matches)
+    return {kpi: m[0] for kpi, m in matches.items()}
 
 
 def extract_dates_from_header(
@@ -288,18 +408,16 @@ def section_records(
     header_row_1b = sec.start_row - 1
     date_cols = extract_dates_from_header(df, header_row_1b, sec.data_columns_start)
 
-    # Index labels
-    label_idx = build_label_index(df, sec.start_row, sec.labels_column)
+    # Index labels (KPI -> row)
+    label_idx = build_label_index(df, sec)
 
     out: List[Dict[str, Any]] = []
     skipped_cells = 0
-    for kpi, label_text in sec.labels_map.items():
-        norm_label = normalize_label(label_text)
-        if norm_label not in label_idx:
-            warn(f"[{sec.name}] Label not found for KPI '{kpi}': '{label_text}'")
+    for kpi in sec.labels_map:
+        if kpi not in label_idx:
             continue
 
-        row0 = label_idx[norm_label]
+        row0 = label_idx[kpi]
         for c0, iso_date in date_cols:
             # c0 is already <= df.shape[1] by construction; guard kept cheap
             if c0 >= df.shape[1]:
@@ -327,10 +445,12 @@ def section_records(
 def extract_from_workbook(
     xlsx_path: Path,
     sections: Dict[str, SectionSpec]
-) -> List[Dict[str, Any]]:
+) -> Optional[List[Dict[str, Any]]]:
     """
     Open one workbook and extract records for all sections.
     scenario is the workbook filename (without extension).
+    Returns None if the workbook cannot be opened or read (as opposed to [] for
+    a workbook that was read but has no records).
     """
     scenario = xlsx_path.stem
     try:
@@ -341,8 +461,396 @@ def extract_from_workbook(
             return all_records
     except Exception as e:
         warn(f"Cannot open Excel file '{xlsx_path}': {e}")
+        return None
+
+
+# ---------------------------- Streaming Extraction ----------------------------
+
+
+def section_records_streaming(
+    wb: "openpyxl.Workbook",
+    sec: SectionSpec,
+    scenario: str
+) -> List[Dict[str, Any]]:
+    """
+    Extract records for a single section from a read-only workbook.
+
+    Same output and warnings as section_records(), but the sheet is streamed:
+    the header row is parsed for dates, then only the label column is inspected
+    row by row and only the cells of the mapped rows at the date columns are kept.
+    Memory scales with the number of mapped KPIs, not with the sheet size.
+    """
+    try:
+        ws = wb[sec.sheet_name]
+    except KeyError as e:
+        warn(f"Sheet '{sec.sheet_name}' not found or unreadable: {e}")
         return []
 
+    header_row_1b = sec.start_row - 1
+    labels_c0 = sec.labels_column - 1
+
+    # Dates row: start_row - 1
+    date_cols: List[Tuple[int, str]] = []
+    header = None
+    if header_row_1b >= 1:
+        header = next(ws.iter_rows(min_row=header_row_1b, max_row=header_row_1b, values_only=True), None)
+    if header is None:
+        warn(f"Header row {header_row_1b} is outside the sheet range.")
+    else:
+        for c0 in range(sec.data_columns_start - 1, len(header)):
+            iso = try_parse_date(header[c0])
+            if iso is not None:
+                date_cols.append((c0, iso))
+        if not date_cols:
+            warn(f"No parseable date headers found on row {header_row_1b} starting col {sec.data_columns_start}.")
+
+    # Stream rows; read only up to the last needed column. The matcher keeps only
+    # the rows it resolves to, so memory stays at one row per mapped KPI.
+    max_col = max([labels_c0] + [c0 for c0, _ in date_cols]) + 1
+    rows = ws.iter_rows(min_row=sec.start_row, max_col=max_col, values_only=True)
+    matches = sec.matcher.scan((row[labels_c0] if labels_c0 < len(row) else None, row) for row in rows)
+    sec.matcher.report(sec.name, matches)
+
+    out: List[Dict[str, Any]] = []
+    skipped_cells = 0
+    for kpi in sec.labels_map:
+        if kpi not in matches:
+            continue
+
+        row = matches[kpi][0]
+        values = [row[c0] if c0 < len(row) else None for c0, _ in date_cols]
+        for (_, iso_date), raw_val in zip(date_cols, values):
+            val = safe_float(raw_val)
+            if val is None:
+                skipped_cells += 1
+                continue
+
+            out.append({
+                "scenario": scenario,
+                "date": iso_date,
+                "kpi": kpi,
+                "value": float(val),
+            })
+
+    if skipped_cells:
+        warn(f"[{sec.name}] Skipped {skipped_cells} empty/non-numeric cell(s) across mapped KPIs.")
+
+    return out
+
+
+def extract_from_workbook_streaming(
+    xlsx_path: Path,
+    sections: Dict[str, SectionSpec]
+) -> Optional[List[Dict[str, Any]]]:
+    """Streaming variant of extract_from_workbook() (openpyxl read-only, values only)."""
+    scenario = xlsx_path.stem
+    try:
+        wb = openpyxl.load_workbook(xlsx_path, read_only=True, data_only=True)
+    except Exception as e:
+        warn(f"Cannot open Excel file '{xlsx_path}': {e}")
+        return None
+    try:
+        all_records: List[Dict[str, Any]] = []
+        for sec in sections.values():
+            all_records.extend(section_records_streaming(wb=wb, sec=sec, scenario=scenario))
+        return all_records
+    except Exception as e:
+        warn(f"Cannot read Excel file '{xlsx_path}': {e}")
+        return None
+    finally:
+        wb.close()
+
+
+# ----------------------------- Parallel Extraction ----------------------------
+
+# Sections are sent once per worker process (initializer), not once per workbook
+_WORKER_SECTIONS: Dict[str, SectionSpec] = {}
+_WORKER_STREAMING: bool = False
+
+
+def _init_worker(sections: Dict[str, SectionSpec], streaming: bool) -> None:
+    global _WORKER_SECTIONS, _WORKER_STREAMING
+    _WORKER_SECTIONS = sections
+    _WORKER_STREAMING = streaming
+
+
+def _extract(xlsx_path: Path, sections: Dict[str, SectionSpec], streaming: bool) -> Optional[List[Dict[str, Any]]]:
+    if streaming:
+        return extract_from_workbook_streaming(xlsx_path, sections)
+    return extract_from_workbook(xlsx_path, sections)
+
+
+def _extract_worker(xlsx_path: Path) -> Tuple[Optional[List[Dict[str, Any]]], str]:
+    """Run the extraction in a worker; return (records, captured log text)."""
+    buf = io.StringIO()
+    with contextlib.redirect_stdout(buf):
+        recs = _extract(xlsx_path, _WORKER_SECTIONS, _WORKER_STREAMING)
+    return recs, buf.getvalue()
+
+
+def iter_workbook_records(
+    excel_files: List[Path],
+    sections: Dict[str, SectionSpec],
+    workers: int = 1,
+    streaming: bool = False,
+) -> Iterator[Tuple[Path, Optional[List[Dict[str, Any]]]]]:
+    """
+    Yield (workbook path, records) for each workbook, in file order; records is
+    None for a workbook that could not be opened or read.
+
+    workers <= 1 runs in-process. Otherwise a process pool with at most `workers`
+    processes extracts workbooks concurrently; each result is yielded as soon as it
+    (and the ones before it) are done, so the caller can stream records out.
+    Warnings raised while reading a workbook are printed when its result is yielded.
+    """
+    if workers <= 1 or len(excel_files) <= 1:
+        for x in excel_files:
+            info(f"Processing: {x.name}")
+            yield x, _extract(x, sections, streaming)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(excel_files)),
+        initializer=_init_worker,
+        initargs=(sections, streaming),
+    ) as pool:
+        for x, (recs, log_text) in zip(excel_files, pool.map(_extract_worker, excel_files)):
+            info(f"Processed: {x.name}")
+            if log_text:
+                print(log_text, end="")
+            yield x, recs
+
+
+# ----------------------------- Incremental Cache ------------------------------
+
+
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ExtractionCache:
+    """
+    Persistent per-workbook extraction cache.
+
+    Layout of cache_dir:
+        manifest.json          {"version", "mapping_sha256", "files": {name: {mtime, size, sha256}}}
+        fragments/<sha>.json   records extracted from the workbook with that content hash
+
+    A workbook is reused when mtime and size are unchanged, or when its content hash
+    is unchanged (e.g. touched or copied). Fragments are keyed by content, so renamed
+    or duplicated workbooks share a fragment; scenario names are re-applied on load.
+    """
+    VERSION = 1
+
+    def __init__(self, cache_dir: Path, mapping_sha256: str):
+        self.cache_dir = cache_dir
+        self.fragments_dir = cache_dir / "fragments"
+        self.manifest_path = cache_dir / "manifest.json"
+        self.mapping_sha256 = mapping_sha256
+        self.files: Dict[str, Dict[str, Any]] = {}
+
+        if self.manifest_path.exists():
+            try:
+                with self.manifest_path.open("r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == self.VERSION and data.get("mapping_sha256") == mapping_sha256:
+                    self.files = data.get("files") or {}
+                else:
+                    info("Cache invalidated (YAML mapping or cache version changed).")
+            except Exception as e:
+                warn(f"Cannot read cache manifest '{self.manifest_path}': {e}. Rebuilding.")
+
+    def _fragment_path(self, sha: str) -> Path:
+        return self.fragments_dir / f"{sha}.json"
+
+    def is_fresh(self, xlsx_path: Path) -> bool:
+        """True if the cached fragment for this workbook is still valid (updates mtime on hash match)."""
+        entry = self.files.get(xlsx_path.name)
+        if not entry or not self._fragment_path(entry["sha256"]).exists():
+            return False
+        st = xlsx_path.stat()
+        if entry["mtime"] == st.st_mtime_ns and entry["size"] == st.st_size:
+            return True
+        if entry["size"] == st.st_size and file_sha256(xlsx_path) == entry["sha256"]:
+            entry["mtime"] = st.st_mtime_ns
+            return True
+        return False
+
+    def store(self, xlsx_path: Path, records: List[Dict[str, Any]]) -> None:
+        st = xlsx_path.stat()
+        sha = file_sha256(xlsx_path)
+        self.fragments_dir.mkdir(parents=True, exist_ok=True)
+        # Scenario comes from the file name: store records without it
+        payload = [{k: v for k, v in r.items() if k != "scenario"} for r in records]
+        with self._fragment_path(sha).open("w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        self.files[xlsx_path.name] = {"mtime": st.st_mtime_ns, "size": st.st_size, "sha256": sha}
+
+    def forget(self, xlsx_path: Path) -> None:
+        """Drop the entry of a workbook (its fragment goes at the next prune)."""
+        self.files.pop(xlsx_path.name, None)
+
+    def load(self, xlsx_path: Path) -> List[Dict[str, Any]]:
+        with self._fragment_path(self.files[xlsx_path.name]["sha256"]).open("r", encoding="utf-8") as f:
+            payload = json.load(f)
+        scenario = xlsx_path.stem
+        return [{"scenario": scenario, **r} for r in payload]
+
+    def prune(self, excel_files: List[Path]) -> int:
+        """Forget deleted workbooks and remove unreferenced fragments. Returns removed entries."""
+        names = {x.name for x in excel_files}
+        removed = [n for n in self.files if n not in names]
+        for n in removed:
+            del self.files[n]
+        live = {e["sha256"] for e in self.files.values()}
+        if self.fragments_dir.exists():
+            for frag in self.fragments_dir.glob("*.json"):
+                if frag.stem not in live:
+                    frag.unlink()
+        return len(removed)
+
+    def save(self) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix(".json.tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump({"version": self.VERSION, "mapping_sha256": self.mapping_sha256, "files": self.files}, f, indent=2)
+        tmp.replace(self.manifest_path)
+
+
+def iter_records_cached(
+    excel_files: List[Path],
+    sections: Dict[str, SectionSpec],
+    cache: ExtractionCache,
+    workers: int = 1,
+    streaming: bool = False,
+) -> Iterator[Tuple[Path, Optional[List[Dict[str, Any]]]]]:
+    """
+    Extract only new/changed workbooks into the cache, then yield (path, records)
+    for every workbook in file order from the cached fragments.
+
+    Workbooks that cannot be opened or read (locked, half-written) are not cached:
+    they yield None and stay new/changed, so the next run retries them.
+    """
+    removed = cache.prune(excel_files)
+    stale = [x for x in excel_files if not cache.is_fresh(x)]
+    info(f"Cache: {len(excel_files) - len(stale)} unchanged, {len(stale)} new/changed, {removed} deleted.")
+
+    failed = set()
+    for x, recs in iter_workbook_records(stale, sections, workers=workers, streaming=streaming):
+        if recs is None:
+            cache.forget(x)
+            failed.add(x)
+        else:
+            cache.store(x, recs)
+    cache.prune(excel_files)
+    cache.save()
+    if failed:
+        warn(f"Cache: {len(failed)} workbook(s) could not be read; they will be retried on the next run.")
+
+    for x in excel_files:
+        yield x, None if x in failed else cache.load(x)
+
+
+# ------------------------------- Output Writers -------------------------------
+
+OUTPUT_FORMATS = ("json", "ndjson", "parquet")
+FORMAT_BY_SUFFIX = {".json": "json", ".ndjson": "ndjson", ".jsonl": "ndjson", ".parquet": "parquet"}
+
+
+class JsonRecordWriter:
+    """
+    Streams the 1.0 shape {"version","meta","records":[...]} record by record.
+    The file is byte-identical to json.dump(output, indent=2) of the whole object.
+    """
+
+    def __init__(self, path: Path, header: Dict[str, Any]):
+        self.f = path.open("w", encoding="utf-8")
+        self.count = 0
+        head = json.dumps(header, ensure_ascii=False, indent=2)
+        # Re-open the header object and start the records array
+        self.f.write(head[:-2] + ',\n  "records": [')
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        for r in records:
+            sep = "\n" if self.count == 0 else ",\n"
+            self.f.write(sep + textwrap.indent(json.dumps(r, ensure_ascii=False, indent=2), "    "))
+            self.count += 1
+
+    def close(self) -> None:
+        self.f.write("\n  ]\n}" if self.count else "]\n}")
+        self.f.close()
+
+
+class NdjsonRecordWriter:
+    """Header line {"version","meta"}, then one compact JSON record per line."""
+
+    def __init__(self, path: Path, header: Dict[str, Any]):
+        self.f = path.open("w", encoding="utf-8")
+        self.count = 0
+        self.f.write(json.dumps(header, ensure_ascii=False) + "\n")
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        self.f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+        self.count += len(records)
+
+    def close(self) -> None:
+        self.f.close()
+
+
+class ParquetRecordWriter:
+    """
+    Columnar output: one row group per workbook, date as date32, scenario/kpi
+    dictionary-encoded. version/meta are stored as JSON in the schema metadata.
+    """
+
+    def __init__(self, path: Path, header: Dict[str, Any]):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("Parquet output requires pyarrow: pip install pyarrow") from e
+        self.pa = pa
+        self.schema = pa.schema(
+            [
+                ("scenario", pa.dictionary(pa.int32(), pa.string())),
+                ("date", pa.date32()),
+                ("kpi", pa.dictionary(pa.int32(), pa.string())),
+                ("value", pa.float64()),
+            ],
+            metadata={
+                "version": header["version"],
+                "meta": json.dumps(header["meta"], ensure_ascii=False),
+            },
+        )
+        self.writer = pq.ParquetWriter(str(path), self.schema)
+        self.count = 0
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        if not records:
+            return
+        pa = self.pa
+        cols = {
+            "scenario": pa.array([r["scenario"] for r in records]).dictionary_encode(),
+            "date": pa.array([dt.date.fromisoformat(r["date"]) for r in records], type=pa.date32()),
+            "kpi": pa.array([r["kpi"] for r in records]).dictionary_encode(),
+            "value": pa.array([r["value"] for r in records], type=pa.float64()),
+        }
+        self.writer.write_table(pa.Table.from_pydict(cols, schema=self.schema))
+        self.count += len(records)
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+def open_record_writer(fmt: str, path: Path, header: Dict[str, Any]):
+    writers = {"json": JsonRecordWriter, "ndjson": NdjsonRecordWriter, "parquet": ParquetRecordWriter}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return writers[fmt](path, header)
+
 
 # ------------------------------- CLI / Main -----------------------------------
 
@@ -354,6 +862,16 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--excel-dir", required=True, type=Path, help="Directory containing Excel files (.xlsx, .xlsm).")
     p.add_argument("--yaml", required=True, type=Path, help="Path to the YAML mapping file (with top-level 'meta').")
     p.add_argument("--out", required=True, type=Path, help="Output JSON file path.")
+    p.add_argument("--workers", type=int, default=1,
+                   help="Parallel worker processes (default: 1 = serial; 0 = one per CPU).")
+    p.add_argument("--streaming", action="store_true",
+                   help="Read workbooks in openpyxl read-only mode, fetching only mapped rows and date headers.")
+    p.add_argument("--cache-dir", type=Path, default=None,
+                   help="Incremental cache directory: only new/changed workbooks are re-extracted.")
+    p.add_argument("--format", choices=OUTPUT_FORMATS, default=None,
+                   help="Output format (default: from --out suffix, else json).")
+    p.add_argument("--fuzzy-labels", type=float, nargs="?", const=0.85, default=None, metavar="CUTOFF",
+                   help="Fallback label matching (case/accents/punctuation, then difflib ratio >= CUTOFF, default 0.85).")
     return p.parse_args()
 
 
@@ -365,7 +883,7 @@ def main() -> None:
     if not args.yaml.exists():
         raise FileNotFoundError(f"YAML mapping not found: {args.yaml}")
 
-    meta, sections = load_yaml_mapping(args.yaml)
+    meta, sections = load_yaml_mapping(args.yaml, fuzzy_cutoff=args.fuzzy_labels)
 
     # Collect Excel files (non-recursive): .xlsx and .xlsm
     excel_files = sorted(list(args.excel_dir.glob("*.xlsx")) + list(args.excel_dir.glob("*.xlsm")))
@@ -374,29 +892,43 @@ def main() -> None:
 
     info(f"Found {len(excel_files)} workbook(s) in {args.excel_dir}.")
 
-    # Extract from each workbook
-    all_records: List[Dict[str, Any]] = []
-    for x in excel_files:
-        info(f"Processing: {x.name}")
-        recs = extract_from_workbook(x, sections)
-        info(f"  → {len(recs)} record(s).")
-        all_records.extend(recs)
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
 
-    output = {
+    # Extract from each workbook (through the cache if enabled)
+    if args.cache_dir is not None:
+        # Fallback matching changes the extracted rows: it is part of the cache key
+        mapping_key = file_sha256(args.yaml)
+        if args.fuzzy_labels is not None:
+            mapping_key += f"+fuzzy={args.fuzzy_labels}"
+        cache = ExtractionCache(args.cache_dir, mapping_key)
+        workbook_records = iter_records_cached(excel_files, sections, cache, workers=workers, streaming=args.streaming)
+    else:
+        workbook_records = iter_workbook_records(excel_files, sections, workers=workers, streaming=args.streaming)
+
+    header = {
         "version": "1.0",
         "meta": {
             "company": meta.company,
             "currency": meta.currency,
             "periodicity": meta.periodicity,
         },
-        "records": all_records,
     }
+    fmt = args.format or FORMAT_BY_SUFFIX.get(args.out.suffix.lower(), "json")
 
-    args.out.parent.mkdir(parents=True, exist_ok=True)
-    with args.out.open("w", encoding="utf-8") as f:
-        json.dump(output, f, ensure_ascii=False, indent=2)
+    # Records are written as each workbook is done: memory stays at one workbook
+    writer = open_record_writer(fmt, args.out, header)
+    try:
+        for x, recs in workbook_records:
+            if recs is None:
+                warn(f"  → {x.name} skipped (not readable).")
+                continue
+            if args.cache_dir is None:
+                info(f"  → {len(recs)} record(s).")
+            writer.write(recs)
+    finally:
+        writer.close()
 
-    info(f"Wrote {len(all_records)} records to: {args.out}")
+    info(f"Wrote {writer.count} records to: {args.out} ({fmt})")
 
 
 if __name__ == "__main__":
@@ -10,3 +10,5 @@ export const PYTHON_FORECAST__CLASS_PATH = './py/python_pyodide_statsmodel_forec
 export const PYTHON_FORECAST__CLASS_NAME = 'PythonForecast';
 export const PYTHON_FORECAST__CLASS_METHOD_NAME = 'callPythonForecastFunction';
 export const PYTHON_FORECAST__PYTHON_PATH_RELATIVE_TO_CLASS = 'python_pyodide_statsmodel_forecast_func.py';
+// lightweight engine (NumPy Holt-Winters, no statsmodels import): pass it to the PYTHON_FORECAST__CLASS_NAME constructor
+export const PYTHON_FORECAST__FAST_PYTHON_PATH_RELATIVE_TO_CLASS = 'python_pyodide_numpy_forecast_func.py';
@@ -0,0 +1,362 @@
+# Fast forecast engine: additive Holt-Winters (ETS AAA) in plain NumPy.
+#
+# Same entry points as `python_pyodide_statsmodel_forecast_func.py`
+# (`forecast_data` with the dates/mean/pi_lower/pi_upper globals, `forecast_batch`,
+# `forecast_batch_flat`), but it imports only NumPy and the standard library:
+# under Pyodide, loadPackagesFromImports does not pull statsmodels/scipy/pandas.
+#
+# Model (error-correction form, same parametrization as statsmodels ETSModel):
+#   yhat_t = l_{t-1} + b_{t-1} + s_{t-m}
+#   e_t    = y_t - yhat_t
+#   l_t    = l_{t-1} + b_{t-1} + alpha * e_t
+#   b_t    = b_{t-1} + beta * e_t
+#   s_t    = s_{t-m} + gamma * e_t
+# with 0 < alpha < 1, 0 < beta < alpha, 0 < gamma < 1 - alpha.
+#
+# Fitting minimizes the sum of squared errors (the Gaussian MLE of the additive
+# model): the smoothing parameters by a vectorized grid + pattern search over many
+# series at once; for every candidate the initial states are solved by least
+# squares (the errors are linear in them), so the search sees the exact profile SSE.
+# Prediction intervals are analytical:
+#   var_h = sigma2 * (1 + sum_{j=1}^{h-1} (alpha + beta*j + gamma*[j % m == 0])^2)
+#
+# Results are close to, not identical with, the statsmodels engine (different
+# optimizer); `python_pyodide_numpy_forecast_test_runner.py` compares both.
+
+import calendar
+import datetime
+from statistics import NormalDist
+
+import numpy as np
+
+dates = None
+mean = None
+pi_lower = None
+pi_upper = None
+
+# Search space, as fractions: alpha = u, beta = v * alpha, gamma = w * (1 - alpha)
+_BOUND = 1e-4
+_GRID_U = (0.001, 0.05, 0.15, 0.3, 0.5, 0.7, 0.9)
+_GRID_V = (0.001, 0.05, 0.2, 0.5, 0.9)
+_GRID_W = (0.001, 0.05, 0.2, 0.5, 0.9)
+_REFINE_ROUNDS = 12   # pattern-search rounds after the grid
+_CHUNK = 64           # at most this many series fitted together
+_WORK_BYTES = 64 << 20  # budget for the (series, candidates, states^2) work arrays of a chunk
+
+
+# Sampling frequencies: months per step (period-end dates) or days per step
+_FREQ_MONTHS = {"M": 1, "Q": 3, "Y": 12}
+_FREQ_DAYS = {"D": 1, "W": 7}
+SEASONAL_PERIODS = {"D": 7, "W": 52, "M": 12, "Q": 4, "Y": 1}
+
+
+def _period_dates(start, freq, periods):
+    """
+    ISO dates of `periods` steps from `start` ('YYYY-MM-DD' or 'M/D/YYYY'), like
+    pandas.date_range: period ends for M/Q/Y and Sundays for W (the first on or after start), days for D.
+    """
+    if "/" in start:
+        month, day, year = (int(x) for x in start.split("/"))
+    else:
+        year, month, day = (int(x) for x in start.split("-")[:3])
+    if freq in _FREQ_DAYS:
+        first = datetime.date(year, month, day)
+        if freq == "W":  # weeks end on Sunday
+            first += datetime.timedelta(days=(6 - first.weekday()) % 7)
+        return [(first + datetime.timedelta(days=_FREQ_DAYS[freq] * k)).isoformat() for k in range(periods)]
+    step = _FREQ_MONTHS[freq]
+    # first period end: month ends of every month (M), of Mar/Jun/Sep/Dec (Q), of Dec (Y)
+    first = month + (-month) % step if step > 1 else month
+    out = []
+    for k in range(periods):
+        y, m = divmod(first - 1 + k * step, 12)
+        out.append(f"{year + y:04d}-{m + 1:02d}-{calendar.monthrange(year + y, m + 1)[1]:02d}")
+    return out
+
+
+def _interpolate_rows(values):
+    """
+    Linear interpolation along each row of a 2-D array, all rows at once:
+    inner NaN are interpolated, trailing NaN take the last value, leading NaN stay.
+    """
+    n, T = values.shape
+    good = ~np.isnan(values)
+    t = np.broadcast_to(np.arange(T), (n, T))
+    prev = np.maximum.accumulate(np.where(good, t, -1), axis=1)
+    nxt = np.minimum.accumulate(np.where(good, t, T)[:, ::-1], axis=1)[:, ::-1]
+    rows = np.arange(n)[:, None]
+    v_prev = values[rows, np.maximum(prev, 0)]
+    v_next = values[rows, np.minimum(nxt, T - 1)]
+    span = np.where(nxt < T, nxt - prev, 1)
+    frac = np.where(nxt < T, (t - prev) / np.maximum(span, 1), 0.0)
+    out = v_prev + (np.where(nxt < T, v_next, v_prev) - v_prev) * frac
+    return np.where(good, values, np.where(prev >= 0, out, np.nan))
+
+
+def _as_rows(values):
+    """
+    Series as a list of 1-D float arrays (2-D array or ragged list), interpolated
+    and with leading NaN dropped (a series that starts later is just shorter).
+    """
+    if isinstance(values, np.ndarray) and values.ndim == 2:
+        grid = values.astype(np.float64)
+    else:
+        rows = [np.asarray(v, dtype=np.float64).ravel() for v in values]
+        width = max((len(r) for r in rows), default=0)
+        # right-align so interpolation never fills past a series' own last value
+        grid = np.full((len(rows), width), np.nan)
+        for i, r in enumerate(rows):
+            grid[i, width - len(r):] = r
+    grid = _interpolate_rows(grid) if grid.size else grid
+    first = np.argmax(~np.isnan(grid), axis=1) if grid.size else np.zeros(len(grid), dtype=int)
+    return [row[k:] if not np.isnan(row).all() else row[:0] for row, k in zip(grid, first)]
+
+
+def model_for_length(n_obs, seasonal_periods=12):
+    """
+    ETS model used for a series of n_obs points: 'AAA' with two full seasons,
+    'AAN' (Holt) from 4 points, 'ANN' (simple smoothing) from 2, None below.
+    """
+    if seasonal_periods > 1 and n_obs >= 2 * seasonal_periods:
+        return "AAA"
+    if n_obs >= 4:
+        return "AAN"
+    if n_obs >= 2:
+        return "ANN"
+    return None
+
+
+def _params(uvw, free=(True, True, True)):
+    """(..., 3) fractions in (0, 1) -> alpha, beta, gamma arrays (beta/gamma 0 when not free)."""
+    u, v, w = np.moveaxis(np.clip(uvw, _BOUND, 1 - _BOUND), -1, 0)
+    return u, v * u * free[1], w * (1 - u) * free[2]
+
+
+def _filter(y, alpha, beta, gamma, level, trend, season):
+    """
+    Run the recursions for every series. y (n, T); alpha/beta/gamma/level/trend (n,);
+    season (n, m), season[:, k] is the seasonal state used at t = k (mod m).
+    Returns (sse, level, trend, season) after the last observation.
+    """
+    m = season.shape[-1]
+    level, trend, season = level.copy(), trend.copy(), season.copy()
+    sse = np.zeros(len(y))
+    for t in range(y.shape[1]):
+        k = t % m
+        e = y[:, t] - (level + trend + season[:, k])
+        sse += e * e
+        level = level + trend + alpha * e
+        trend = trend + beta * e
+        season[:, k] += gamma * e
+    return sse, level, trend, season
+
+
+def _profile(y, alpha, beta, gamma, m, trend=True):
+    """
+    Minimum SSE over the initial states for every candidate (alpha/beta/gamma (n, G)).
+
+    The one-step errors are affine in x0 = (level, [trend,] season[0..m-2]), with
+    season[m-1] = -sum(season[0..m-2]): one pass filters y with x0 = 0 next to each
+    basis state with y = 0, accumulating the normal equations of the least-squares
+    x0. Returns (sse (n, G), x0 (n, G, m + 1)), x0 trend 0 without trend.
+    """
+    n, T = y.shape
+    s0 = 2 if trend else 1  # first seasonal state
+    p = s0 + m - 1
+    G = alpha.shape[1]
+    # column 0 carries y with x0 = 0, column 1 + j the basis state j with y = 0
+    lv = np.zeros((n, G, p + 1))
+    tr = np.zeros((n, G, p + 1))
+    se = np.zeros((n, G, p + 1, m))
+    lv[..., 1] = 1.0
+    if trend:
+        tr[..., 2] = 1.0
+    for j in range(m - 1):
+        se[..., 1 + s0 + j, j] = 1.0
+        se[..., 1 + s0 + j, m - 1] = -1.0
+    a, b, g = alpha[..., None], beta[..., None], gamma[..., None]
+    rr = np.zeros((n, G))
+    zr = np.zeros((n, G, p))
+    zz = np.zeros((n, G, p, p))
+    for t in range(T):
+        k = t % m
+        e = -(lv + tr + se[..., k])
+        e[..., 0] += y[:, t, None]
+        # e[..., 0] = r0_t, e[..., 1:] = -z_t (errors are r0_t - z_t @ x0)
+        r0, z = e[..., 0], e[..., 1:]
+        rr += r0 * r0
+        zr -= z * r0[..., None]
+        zz += z[..., :, None] * z[..., None, :]
+        lv = lv + tr + a * e
+        tr = tr + b * e
+        se[..., k] += g * e
+    ridge = 1e-10 * (np.trace(zz, axis1=-2, axis2=-1)[..., None, None] / p + 1.0) * np.eye(p)
+    x0 = np.linalg.solve(zz + ridge, zr[..., None])[..., 0]
+    sse = rr - np.einsum("ngp,ngp->ng", zr, x0)
+    if not trend:
+        x0 = np.concatenate([x0[..., :1], np.zeros_like(x0[..., :1]), x0[..., 1:]], axis=-1)
+    return np.maximum(sse, 0.0), x0
+
+
+def _best(y, cand, m, free):
+    """Best candidate per series: cand (n, G, 3) -> (fractions (n, 3), x0 (n, m + 1))."""
+    sse, x0 = _profile(y, *_params(cand, free), m, trend=free[1])
+    sse = np.where(np.isfinite(sse), sse, np.inf)
+    i = np.argmin(sse, axis=1)
+    rows = np.arange(len(y))
+    return cand[rows, i], x0[rows, i]
+
+
+def _fit_block(y, m, free):
+    # disabled components: a single grid value and no search step
+    axes = [g if f else (0.5,) for g, f in zip((_GRID_U, _GRID_V, _GRID_W), free)]
+    grid = np.array([(u, v, w) for u in axes[0] for v in axes[1] for w in axes[2]])
+    uvw, x0 = _best(y, np.broadcast_to(grid, (len(y),) + grid.shape), m, free)
+    # pattern search on the fractions, in logit space, shrinking the step each round
+    moves = [(-1, 0, 1) if f else (0,) for f in free]
+    offsets = np.array([(i, j, k) for i in moves[0] for j in moves[1] for k in moves[2]], dtype=np.float64)
+    step = 1.0
+    for _ in range(_REFINE_ROUNDS):
+        logit = np.log(uvw / (1 - uvw))
+        cand = 1 / (1 + np.exp(-(logit[:, None, :] + step * offsets[None])))
+        uvw, x0 = _best(y, np.clip(cand, _BOUND, 1 - _BOUND), m, free)
+        step *= 0.6
+    return uvw, x0
+
+
+def _chunk_size(m, free):
+    """
+    Series fitted together so that the _profile work arrays of the grid pass (about
+    four float64 (candidates, states, states) arrays per series) stay within
+    _WORK_BYTES: 64 monthly series, a few weekly ones (m = 52).
+    """
+    G = np.prod([len(g) if f else 1 for g, f in zip((_GRID_U, _GRID_V, _GRID_W), free)])
+    p = m + 2
+    return int(min(_CHUNK, max(1, _WORK_BYTES // (4 * 8 * G * p * p))))
+
+
+def fit_hw(values, seasonal_periods=12, model="AAA"):
+    """
+    Fit additive Holt-Winters to every row of `values` (n_series, n_obs), no NaN.
+    model: 'AAA', 'AAN' (no season) or 'ANN' (level only), see model_for_length().
+    Returns a dict of arrays: alpha, beta, gamma, sigma2, sse (n,), and the final
+    states level, trend (n,) and season (n, m) (season[:, k] applies to step k+1).
+    """
+    y = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    n, T = y.shape
+    free = (True, model[1] == "A", model[2] == "A")
+    m = int(seasonal_periods) if free[2] else 1
+    uvw = np.empty((n, 3))
+    x0 = np.empty((n, m + 1))
+    chunk = _chunk_size(m, free)
+    for lo in range(0, n, chunk):
+        uvw[lo:lo + chunk], x0[lo:lo + chunk] = _fit_block(y[lo:lo + chunk], m, free)
+
+    a, b, g = _params(uvw, free)
+    season0 = np.concatenate([x0[:, 2:], -x0[:, 2:].sum(axis=1, keepdims=True)], axis=1)
+    sse, level, trend, season = _filter(y, a, b, g, x0[:, 0], x0[:, 1], season0)
+    # rotate so that season[:, k] is the state used k + 1 steps after the last observation
+    season = np.roll(season, -(T % m), axis=1)
+    return {
+        "alpha": a, "beta": b, "gamma": g,
+        "sse": sse, "sigma2": sse / T,
+        "level": level, "trend": trend, "season": season,
+    }
+
+
+def predict_hw(fit, horizon=12, alpha=0.05):
+    """Point forecasts and analytical (1 - alpha) prediction intervals from fit_hw()."""
+    m = fit["season"].shape[1]
+    h = np.arange(1, horizon + 1)
+    point = fit["level"][:, None] + h * fit["trend"][:, None] + fit["season"][:, (h - 1) % m]
+    j = np.arange(1, horizon)
+    c = fit["alpha"][:, None] + fit["beta"][:, None] * j + fit["gamma"][:, None] * (j % m == 0)
+    var = fit["sigma2"][:, None] * (1 + np.concatenate([np.zeros((len(c), 1)), np.cumsum(c * c, axis=1)], axis=1))
+    z = NormalDist().inv_cdf(1 - alpha / 2)
+    half = z * np.sqrt(var)
+    return point, point - half, point + half
+
+
+def forecast_batch(values, horizon=12, seasonal_periods=12, alpha=0.05):
+    """
+    Forecast every series of `values` with additive Holt-Winters.
+
+    values: 2-D array (n_series, n_obs) or a list of series of any lengths; NaN
+    are interpolated, leading NaN dropped. Each series gets the richest model its
+    length supports (model_for_length); series of the same length and model are
+    fitted together.
+    Returns a dict of arrays: mean, pi_lower, pi_upper with shape (n_series, horizon),
+    ok (n_series,) False where the series could not be fitted (rows left NaN) and
+    model (n_series,) the ETS model used ('' when none).
+    """
+    rows = _as_rows(values)
+    n = len(rows)
+    out = np.full((3, n, horizon), np.nan)
+    ok = np.zeros(n, dtype=bool)
+    models = np.full(n, "", dtype=object)
+    groups = {}
+    for i, y in enumerate(rows):
+        model = model_for_length(len(y), seasonal_periods)
+        if model is not None and np.isfinite(y).all():
+            groups.setdefault((len(y), model), []).append(i)
+    for (_, model), idx in groups.items():
+        fit = fit_hw(np.stack([rows[i] for i in idx]), seasonal_periods, model)
+        out[:, idx] = predict_hw(fit, horizon, alpha)
+        ok[idx] = np.isfinite(out[0, idx]).all(axis=1)
+        models[idx] = model
+    return {"mean": out[0], "pi_lower": out[1], "pi_upper": out[2], "ok": ok, "model": models}
+
+
+def forecast_batch_flat(buffer, n_series, n_obs, horizon=12, seasonal_periods=12, alpha=0.05, lengths=None):
+    """
+    Pyodide entry point: `buffer` is a flat Float64Array (row-major n_series × n_obs),
+    or with `lengths` (one per series) the series concatenated back to back.
+    Returns one contiguous float64 array (4, n_series, horizon): mean, pi_lower,
+    pi_upper and ok (1.0/0.0), read on the JS side with getBuffer() without copies.
+    """
+    if hasattr(buffer, "to_py"):  # JsProxy of a typed array
+        buffer = buffer.to_py()
+    if hasattr(lengths, "to_py"):
+        lengths = lengths.to_py()
+    flat = np.asarray(buffer, dtype=np.float64)
+    if lengths is None:
+        values = flat.reshape(int(n_series), int(n_obs))
+    else:
+        values = np.split(flat, np.cumsum(np.asarray(lengths, dtype=np.int64))[:-1])
+    res = forecast_batch(values, horizon=int(horizon), seasonal_periods=int(seasonal_periods), alpha=alpha)
+    ok = np.repeat(res["ok"].astype(np.float64)[:, None], int(horizon), axis=1)
+    return np.ascontiguousarray(np.stack([res["mean"], res["pi_lower"], res["pi_upper"], ok]))
+
+
+def forecast(values, horizon=12, freq="M", start="2020-01-01", seasonal_periods=None, alpha=0.05):
+    """
+    Forecast one series of any length sampled at `freq` ('D', 'W', 'M', 'Q', 'Y')
+    from `start`. seasonal_periods defaults to the natural cycle of freq (12 for M).
+    Returns a dict: dates (ISO strings of the horizon), mean, pi_lower, pi_upper, model.
+    """
+    if seasonal_periods is None:
+        seasonal_periods = SEASONAL_PERIODS[freq]
+    res = forecast_batch([values], horizon=horizon, seasonal_periods=seasonal_periods, alpha=alpha)
+    return {
+        "dates": _period_dates(start, freq, len(values) + horizon)[len(values):],
+        "mean": res["mean"][0],
+        "pi_lower": res["pi_lower"][0],
+        "pi_upper": res["pi_upper"][0],
+        "model": res["model"][0],
+    }
+
+
+def forecast_data(months, values, horizon=12, freq="M", start="1/1/2020", series_id=None):
+    """
+    Drop-in for the statsmodels `forecast_data`: forecast() with 95% intervals, results in globals.
+    series_id is accepted for the same JS call; this engine has no fit cache (every call is a full fit).
+    """
+    global dates, mean, pi_lower, pi_upper
+
+    if hasattr(values, "to_py"):  # JsProxy of a JS array
+        values = values.to_py()
+    res = forecast(values, horizon=horizon, freq=freq, start=start)
+    dates = res["dates"]
+    mean = res["mean"]
+    pi_lower = res["pi_lower"]
+    pi_upper = res["pi_upper"]
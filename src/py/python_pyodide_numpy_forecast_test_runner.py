@@ -0,0 +1,66 @@
+# Compare the NumPy Holt-Winters engine with the statsmodels ETSModel engine on the test series
+
+import time
+
+import numpy as np
+
+import python_pyodide_numpy_forecast_func as fast
+import python_pyodide_statsmodel_forecast_func as ets
+
+months = list(range(1, 25))
+values = [
+    8.9,8.1,6.95,9,10.1,11.2,12.8,9,10.1,10.2,10.99,13,
+    10,9,8,10,11,12,14,10,11,11,12,14]
+
+fast.forecast_data(months, values)
+
+print("dates\n")
+print(fast.dates)
+print("mean\n")
+print(fast.mean)
+print("pi_lower\n")
+print(fast.pi_lower)
+print("pi_upper\n")
+print(fast.pi_upper)
+
+# same series plus noisy copies, both engines
+rng = np.random.default_rng(0)
+batch = np.vstack([values, np.array(values) * (1 + 0.05 * rng.normal(size=(7, 24)))])
+
+t0 = time.perf_counter()
+res_fast = fast.forecast_batch(batch, horizon=12)
+t1 = time.perf_counter()
+res_ets = ets.forecast_batch(batch, horizon=12, workers=1, use_cache=False)
+t2 = time.perf_counter()
+
+print(f"\nseconds: numpy {t1 - t0:.3f}, statsmodels {t2 - t1:.3f}")
+print("max |mean difference| per series\n")
+print(np.abs(res_fast["mean"] - res_ets["mean"]).max(axis=1))
+print("max |interval width difference| per series\n")
+width = lambda r: r["pi_upper"] - r["pi_lower"]
+print(np.abs(width(res_fast) - width(res_ets)).max(axis=1))
+# Large differences on a series mean the two optimizers stopped at different
+# optima (short series, multimodal likelihood); compare the fitted SSE:
+print("sse numpy\n")
+print(fast.fit_hw(batch)["sse"])
+
+# Weekly series (m = 52): the fit is chunked by a byte budget, so peak memory
+# stays flat with the number of series and fits a wasm heap
+import tracemalloc
+
+t = np.arange(156)
+weekly = 100 + 0.1 * t + 10 * np.sin(2 * np.pi * t / 52) + rng.normal(size=(16, 156))
+
+tracemalloc.start()
+t0 = time.perf_counter()
+res_weekly = fast.forecast_batch(weekly, horizon=52, seasonal_periods=52)
+seconds = time.perf_counter() - t0
+_, peak = tracemalloc.get_traced_memory()
+tracemalloc.stop()
+
+print(f"\nweekly: {len(weekly)} series x {weekly.shape[1]} weeks, chunk {fast._chunk_size(52, (True, True, True))}")
+print(f"seconds {seconds:.1f} ({seconds / len(weekly):.2f} per series), peak MB {peak / 2**20:.0f}")
+print("models\n")
+print(res_weekly["model"])
+assert res_weekly["ok"].all()
+assert peak < 2 * fast._WORK_BYTES, "weekly fit exceeded the work-array budget"
@@ -16,19 +16,26 @@ import { PYTHON_FORECAST__PYTHON_PATH_RELATIVE_TO_CLASS } from '../config/python
 export class PythonForecast {
   /** @type {*} */
   #pyodide;
+  /** @type {string} */
+  #pythonPath;
 
-  constructor() {
+  /**
+   * @param [pythonPath=PYTHON_FORECAST__PYTHON_PATH_RELATIVE_TO_CLASS] {string} Python engine, relative to this file;
+   * PYTHON_FORECAST__FAST_PYTHON_PATH_RELATIVE_TO_CLASS selects the NumPy Holt-Winters engine (same functions, no statsmodels)
+   */
+  constructor(pythonPath = PYTHON_FORECAST__PYTHON_PATH_RELATIVE_TO_CLASS) {
     if (!platformIsWindows())
       throw new Error('platform not supported');
 
     this.#pyodide = null;
+    this.#pythonPath = pythonPath;
   }
 
   async loadPython() {
     // read the python source file
     //
-    // build a path with PYTHON_FORECAST__PYTHON_PATH_RELATIVE_TO_CLASS and this file path + normalize the path for Windows by removing the leading slash if it exists
-    let srcPath = new URL(PYTHON_FORECAST__PYTHON_PATH_RELATIVE_TO_CLASS, import.meta.url).pathname;
+    // build a path with the Python engine path and this file path + normalize the path for Windows by removing the leading slash if it exists
+    let srcPath = new URL(this.#pythonPath, import.meta.url).pathname;
     srcPath = (platformIsWindows() && srcPath.startsWith('/')) ? srcPath.slice(1) : srcPath;
     const py_source = fs.readFileSync(srcPath, 'utf8');
 
@@ -46,14 +53,19 @@ export class PythonForecast {
   // is an arrow function because can be used as a callback, and it needs to access the class private fields
   /**
    * @param months {number[]}
-   * @param values {number[]}
+   * @param values {number[]} monthly values starting at 2020-01, any length
+   * @param [horizon=12] {number} months to forecast
+   * @param [seriesId=null] {string|null} stable id of the series (e.g. account code): a refit after new months
+   * or revised values warm-starts from its previous fit (statsmodels engine fit cache)
    * @return {Promise<{dates: string[], mean: number[], pi_lower: number[], pi_upper: number[]}>}
    */
-  callPythonForecastFunction = async (months, values) => {
+  callPythonForecastFunction = async (months, values, horizon = 12, seriesId = null) => {
     // Send data to Python
     this.#pyodide.globals.set("months", months);
     this.#pyodide.globals.set("values", values);
-    await this.#pyodide.runPythonAsync("forecast_data(months, values)");
+    this.#pyodide.globals.set("horizon", horizon);
+    this.#pyodide.globals.set("series_id", seriesId);
+    await this.#pyodide.runPythonAsync("forecast_data(months, values, horizon=horizon, series_id=series_id)");
 
     // Retrieve data from Python
     const dates = this.#pyodide.globals.get("dates").toJs();
@@ -63,4 +75,48 @@ export class PythonForecast {
 
     return { dates, mean, pi_lower, pi_upper };
   }
+
+  /**
+   * Forecast many series in one Python call.
+   * Series are sent as one flat Float64Array; results come back as one float64 buffer (no per-value conversion).
+   * Missing values can be passed as NaN (they are interpolated); series can have different lengths
+   * (short series get a simpler model, series too short to fit come back with ok false).
+   * @param series {number[][]} one array per series
+   * @param [horizon=12] {number}
+   * @param [seasonalPeriods=12] {number}
+   * @return {Promise<{mean: Float64Array[], pi_lower: Float64Array[], pi_upper: Float64Array[], ok: boolean[]}>}
+   */
+  callPythonForecastBatch = async (series, horizon = 12, seasonalPeriods = 12) => {
+    const nSeries = series.length;
+    const nObs = nSeries > 0 ? series[0].length : 0;
+    const lengths = Int32Array.from(series, (s) => s.length);
+    const ragged = lengths.some((len) => len !== nObs);
+    const flat = new Float64Array(lengths.reduce((a, b) => a + b, 0));
+    for (let i = 0, offset = 0; i < nSeries; offset += lengths[i], i++)
+      flat.set(series[i], offset);
+
+    const forecastBatchFlat = this.#pyodide.globals.get("forecast_batch_flat");
+    // lengths are sent only for mixed-length batches (null -> Python None)
+    const result = forecastBatchFlat(flat, nSeries, nObs, horizon, seasonalPeriods, 0.05, ragged ? lengths : null);
+    const buffer = result.getBuffer("f64");
+    try {
+      // layout (4, nSeries, horizon): mean, pi_lower, pi_upper, ok
+      const data = buffer.data;
+      const block = nSeries * horizon;
+      /** @param {number} k @param {number} i */
+      const row = (k, i) => data.slice(k * block + i * horizon, k * block + (i + 1) * horizon);
+      const mean = [], pi_lower = [], pi_upper = [], ok = [];
+      for (let i = 0; i < nSeries; i++) {
+        mean.push(row(0, i));
+        pi_lower.push(row(1, i));
+        pi_upper.push(row(2, i));
+        ok.push(data[3 * block + i * horizon] === 1);
+      }
+      return { mean, pi_lower, pi_upper, ok };
+    } finally {
+      buffer.release();
+      result.destroy();
+      forecastBatchFlat.destroy();
+    }
+  }
 }
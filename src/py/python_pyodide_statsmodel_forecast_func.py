@@ -1,5 +1,11 @@
 # TODO: to be improved, this is a minimal example
 
+import hashlib
+import os
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 from statsmodels.tsa.exponential_smoothing.ets import ETSModel
 import numpy as np
@@ -8,54 +14,344 @@ mean = None
 pi_lower = None
 pi_upper = None
 
-def forecast_data(months, values):
+# pandas aliases of the supported frequencies (period ends; pandas >= 2.2 renamed M/Q/Y to ME/QE/YE)
+_PERIOD_END_ALIASES = {"M": ("ME", "M"), "Q": ("QE", "Q"), "Y": ("YE", "Y"), "W": ("W",), "D": ("D",)}
+SEASONAL_PERIODS = {"D": 7, "W": 52, "M": 12, "Q": 4, "Y": 1}
+
+
+def _date_index(start, freq, periods):
+    for alias in _PERIOD_END_ALIASES[freq]:
+        try:
+            return pd.date_range(start=start, periods=periods, freq=alias)
+        except ValueError:  # alias unknown to this pandas version
+            continue
+    raise ValueError(f"unsupported frequency {freq!r}")
+
+
+def forecast_data(months, values, horizon=12, freq="M", start="1/1/2020", series_id=None):
+    """
+    Forecast `values` (any length, sampled at `freq` from `start`) `horizon` steps
+    ahead; results (dates, mean, pi_lower, pi_upper) are exported to globals.
+    `months` is kept for compatibility with the JS caller (the index is rebuilt from start/freq).
+    Goes through the fit cache: calling again with one more month warm-starts the fit;
+    series_id (e.g. the account code) also warm-starts a series that changed otherwise.
+    """
     global dates, mean, pi_lower, pi_upper
 
-    data = {
-        "Month": months,
-        "Values": values
-        }
+    if hasattr(values, "to_py"):  # JsProxy of a JS array
+        values = values.to_py()
+    res = forecast(values, horizon=horizon, freq=freq, start=start, series_id=series_id)
+    print(f"\nForecast for the next {horizon} periods ({res['model']}) + 95% Confidence Intervals with `ETSModel` & `get_prediction` & `summary_frame`:")
+    print(pd.DataFrame({k: res[k] for k in ("mean", "pi_lower", "pi_upper")}, index=res["dates"]))
 
-    # Create a DataFrame
-    df_data = pd.DataFrame(data)
-    # df = pd.concat([df, df])  # Duplicate the data, to fit 24 months
-    # Convert the 'Month' column to a datetime format
-    df_data.set_index('Month', inplace=True)
-    df_data.index = pd.date_range(start='1/1/2020', periods=len(df_data), freq='M')
+    # export values to global
+    dates = res["dates"]
+    mean = res["mean"]
+    pi_lower = res["pi_lower"]
+    pi_upper = res["pi_upper"]
 
-    # Interpolate missing data (if any)
-    df_data['Values'] = df_data['Values'].interpolate()
 
+def forecast(values, horizon=12, freq="M", start="1/1/2020", seasonal_periods=None, alpha=0.05,
+             series_id=None, use_cache=True):
+    """
+    Forecast one series of any length sampled at `freq` ('D', 'W', 'M', 'Q', 'Y')
+    from `start`. seasonal_periods defaults to the natural cycle of freq (12 for M);
+    the model follows the length (model_for_length). series_id / use_cache: as in
+    forecast_batch (keyed on the series hash, warm start from the previous fit).
+    Returns a dict: dates (ISO strings of the horizon), mean, pi_lower, pi_upper, model.
+    """
     #
-    # new AAA model (ETSModel) with confidence
+    # AAA model (ETSModel) with confidence
     #
     # The ETSModel returns data similar, but not exactly equal, to Excel FORECAST.ETS function
     #
+    # see https://www.statsmodels.org/devel/generated/statsmodels.tsa.exponential_smoothing.ets.ETSResults.get_prediction.html
+    # source code https://www.statsmodels.org/devel/_modules/statsmodels/tsa/exponential_smoothing/ets.html#ETSResults.get_prediction
+    if seasonal_periods is None:
+        seasonal_periods = SEASONAL_PERIODS[freq]
+    res = forecast_batch([values], horizon=horizon, seasonal_periods=seasonal_periods, alpha=alpha, workers=1,
+                         series_ids=None if series_id is None else [series_id], use_cache=use_cache)
+    index = _date_index(start, freq, len(values) + horizon)[len(values):]
+    return {
+        "dates": index.strftime('%Y-%m-%d').tolist(),
+        "mean": res["mean"][0],
+        "pi_lower": res["pi_lower"][0],
+        "pi_upper": res["pi_upper"][0],
+        "model": res["model"][0],
+    }
+
+
+#
+# Batch API: many series in one call, no global state
+#
+# `values` is a 2-D array (n_series, n_obs), one series per row, or a list of
+# series of any lengths; NaN for missing points (interpolated, leading NaN
+# dropped). Each series gets the richest model its length supports. Results are
+# stacked arrays (n_series, horizon).
+# Natively the series are fitted in a process pool; under Pyodide (no processes)
+# they are fitted serially in the same call.
+#
+
+IS_PYODIDE = sys.platform == "emscripten"
+
 
-    # Fit the AAA model
-    # Build model
+def model_for_length(n_obs, seasonal_periods=12):
+    """
+    ETS model used for a series of n_obs points: 'AAA' with two full seasons
+    (ETSModel needs them for the initial seasonals), 'AAN' (Holt) from 4 points,
+    'ANN' (simple smoothing) from 2, None below.
+    """
+    if seasonal_periods > 1 and n_obs >= 2 * seasonal_periods:
+        return "AAA"
+    if n_obs >= 4:
+        return "AAN"
+    if n_obs >= 2:
+        return "ANN"
+    return None
+
+
+def _fit_predict(y, seasonal_periods, horizon, alpha, start_params=None, fixed_params=None):
+    """
+    Fit (or, with fixed_params, only filter) the ETS model for len(y) and predict `horizon` steps.
+    start_params warm-starts the optimizer. Returns (mean, pi_lower, pi_upper, params).
+    """
+    model = model_for_length(len(y), seasonal_periods)
+    if model is None:
+        raise ValueError(f"series too short ({len(y)} points)")
+    seasonal = model[2] == "A"
     ets_model = ETSModel(
-        endog=df_data['Values'],
+        endog=pd.Series(y),  # summary_frame needs an indexed endog
         error='add',
-        trend='add',
-        seasonal='add',
-        seasonal_periods=12,
+        trend='add' if model[1] == "A" else None,
+        seasonal='add' if seasonal else None,
+        seasonal_periods=seasonal_periods if seasonal else None,
     )
-    ets_result = ets_model.fit(disp=False)  # Set disp=False to disable optimization messages
+    if fixed_params is not None:
+        ets_result = ets_model.smooth(fixed_params)
+    else:
+        ets_result = ets_model.fit(start_params=start_params, disp=False)
+    pred = ets_result.get_prediction(start=len(y), end=len(y) + horizon - 1)
+    df_pred = pred.summary_frame(alpha=alpha)
+    return df_pred['mean'].values, df_pred['pi_lower'].values, df_pred['pi_upper'].values, np.asarray(ets_result.params)
 
-    #
-    # Get prediction with `get_prediction`
-    #
-    # see https://www.statsmodels.org/devel/generated/statsmodels.tsa.exponential_smoothing.ets.ETSResults.get_prediction.html
-    # source code https://www.statsmodels.org/devel/_modules/statsmodels/tsa/exponential_smoothing/ets.html#ETSResults.get_prediction
-    pred = ets_result.get_prediction(start = 24, end = 24+11)
-    #pred = ets_result.get_prediction(start =  df_simul.index[0], end = df_simul.index[-1])  # works also with dates
-    print("\nnForecast for the next 12 months + 95% Confidence Intervals with `ETSModel` & `get_prediction` & `summary_frame`:")
-    df_pred = pred.summary_frame(alpha=0.05)
-    print(df_pred)
 
-    # export values to global
-    dates = df_pred.index.strftime('%Y-%m-%d').tolist()  # convert DatetimeIndex to an array of strings
-    mean = df_pred['mean'].values
-    pi_lower = df_pred['pi_lower'].values
-    pi_upper = df_pred['pi_upper'].values
+def _forecast_block(block, seasonal_periods, horizon, alpha, start_params=None, fixed_params=None):
+    """
+    Fit every row of `block`; returns (3, n_rows, horizon), the ok flags and the
+    fitted params per row (None where the fit failed, rows left NaN).
+    start_params / fixed_params: optional per-row lists (None entries = cold fit).
+    """
+    out = np.full((3, len(block), horizon), np.nan)
+    ok = np.zeros(len(block), dtype=bool)
+    params = [None] * len(block)
+    for i, y in enumerate(block):
+        sp = start_params[i] if start_params is not None else None
+        fp = fixed_params[i] if fixed_params is not None else None
+        try:
+            out[0, i], out[1, i], out[2, i], params[i] = _fit_predict(y, seasonal_periods, horizon, alpha, sp, fp)
+            ok[i] = True
+        except Exception:  # too short, constant, non-finite...: leave NaN, flag it
+            pass
+    return out, ok, params
+
+
+#
+# Fit cache
+#
+# Keyed by (series hash, model spec). An exact hit reuses the stored forecast, or
+# re-filters the stored parameters for a new horizon/alpha (no optimization).
+# A series that is the previous one plus one or two new points, or that carries
+# the same series_id as an earlier call, warm-starts the optimizer from the
+# previous parameters. Lives in the calling process (workers only fit).
+#
+
+FIT_CACHE_MAX = 4096
+_FIT_CACHE = OrderedDict()   # (hash, spec) -> {"params": ndarray, "forecasts": {(horizon, alpha): (3, horizon)}}
+_SERIES_ID_PARAMS = OrderedDict()  # (series_id, spec) -> params
+_FIT_STATS = {"hits": 0, "warm": 0, "misses": 0}
+
+
+def _series_hash(y):
+    return hashlib.sha1(np.ascontiguousarray(y, dtype=np.float64).tobytes()).hexdigest()
+
+
+def _spec(n_obs, seasonal_periods):
+    return (model_for_length(n_obs, seasonal_periods), int(seasonal_periods))
+
+
+def _cache_put(store, key, value):
+    store[key] = value
+    store.move_to_end(key)
+    while len(store) > FIT_CACHE_MAX:
+        store.popitem(last=False)
+
+
+def _cache_plan(y, spec, horizon, alpha, series_id=None):
+    """
+    Returns (forecast, fixed_params, start_params, key): a cached forecast (exact
+    hit), params to re-filter (exact series, new horizon/alpha), or warm-start params.
+    """
+    key = (_series_hash(y), spec)
+    entry = _FIT_CACHE.get(key)
+    if entry is not None:
+        _FIT_CACHE.move_to_end(key)
+        _FIT_STATS["hits"] += 1
+        cached = entry["forecasts"].get((horizon, alpha))
+        return cached, (None if cached is not None else entry["params"]), None, key
+    start = None
+    for drop in (1, 2):  # one or two new observations appended
+        if len(y) > drop:
+            prev = _FIT_CACHE.get((_series_hash(y[:-drop]), spec))
+            if prev is not None:
+                start = prev["params"]
+                break
+    if start is None and series_id is not None:
+        start = _SERIES_ID_PARAMS.get((series_id, spec))
+    _FIT_STATS["warm" if start is not None else "misses"] += 1
+    return None, None, start, key
+
+
+def _cache_store(key, params, forecast, horizon, alpha, series_id=None):
+    entry = _FIT_CACHE.get(key)
+    if entry is None:
+        entry = {"params": params, "forecasts": {}}
+    entry["forecasts"][(horizon, alpha)] = forecast
+    _cache_put(_FIT_CACHE, key, entry)
+    if series_id is not None:
+        _cache_put(_SERIES_ID_PARAMS, (series_id, key[1]), params)
+
+
+def fit_cache_stats():
+    """Counters: hits (exact series), warm (warm-started fits), misses (cold fits), size."""
+    return dict(_FIT_STATS, size=len(_FIT_CACHE))
+
+
+def clear_fit_cache():
+    _FIT_CACHE.clear()
+    _SERIES_ID_PARAMS.clear()
+    for k in _FIT_STATS:
+        _FIT_STATS[k] = 0
+
+
+# same helpers as python_pyodide_numpy_forecast_func.py (each module is loaded standalone by Pyodide)
+def _interpolate_rows(values):
+    """
+    Linear interpolation along each row of a 2-D array, all rows at once:
+    inner NaN are interpolated, trailing NaN take the last value, leading NaN stay.
+    """
+    n, T = values.shape
+    good = ~np.isnan(values)
+    t = np.broadcast_to(np.arange(T), (n, T))
+    prev = np.maximum.accumulate(np.where(good, t, -1), axis=1)
+    nxt = np.minimum.accumulate(np.where(good, t, T)[:, ::-1], axis=1)[:, ::-1]
+    rows = np.arange(n)[:, None]
+    v_prev = values[rows, np.maximum(prev, 0)]
+    v_next = values[rows, np.minimum(nxt, T - 1)]
+    span = np.where(nxt < T, nxt - prev, 1)
+    frac = np.where(nxt < T, (t - prev) / np.maximum(span, 1), 0.0)
+    out = v_prev + (np.where(nxt < T, v_next, v_prev) - v_prev) * frac
+    return np.where(good, values, np.where(prev >= 0, out, np.nan))
+
+
+def _as_rows(values):
+    """
+    Series as a list of 1-D float arrays (2-D array or ragged list), interpolated
+    and with leading NaN dropped (a series that starts later is just shorter).
+    """
+    if isinstance(values, np.ndarray) and values.ndim == 2:
+        grid = values.astype(np.float64)
+    else:
+        rows = [np.asarray(v, dtype=np.float64).ravel() for v in values]
+        width = max((len(r) for r in rows), default=0)
+        # right-align so interpolation never fills past a series' own last value
+        grid = np.full((len(rows), width), np.nan)
+        for i, r in enumerate(rows):
+            grid[i, width - len(r):] = r
+    grid = _interpolate_rows(grid) if grid.size else grid
+    first = np.argmax(~np.isnan(grid), axis=1) if grid.size else np.zeros(len(grid), dtype=int)
+    return [row[k:] if not np.isnan(row).all() else row[:0] for row, k in zip(grid, first)]
+
+
+def forecast_batch(values, horizon=12, seasonal_periods=12, alpha=0.05, workers=None, series_ids=None, use_cache=True):
+    """
+    Forecast every series of `values` with ETSModel (AAA, or AAN/ANN for short series).
+
+    values: 2-D array (n_series, n_obs) or a list of series of any lengths.
+    Returns a dict of arrays: mean, pi_lower, pi_upper with shape (n_series, horizon),
+    ok (n_series,) False where the fit failed (rows left NaN) and model (n_series,)
+    the ETS model used ('' when none).
+    workers: process count (None = CPU count, 1 = serial); always serial under Pyodide.
+    series_ids: optional stable ids (e.g. account codes) used to warm-start refits.
+    use_cache: reuse/warm-start from the fit cache (see fit_cache_stats()).
+    """
+    values = _as_rows(values)
+    n = len(values)
+    out = np.full((3, n, horizon), np.nan)
+    ok = np.zeros(n, dtype=bool)
+    models = np.array([model_for_length(len(y), seasonal_periods) or "" for y in values], dtype=object)
+
+    # Resolve the cache in this process; only the rows still to compute go to the fit
+    todo, keys, start_params, fixed_params = [], {}, [], []
+    for i, y in enumerate(values):
+        if not use_cache:
+            todo.append(i)
+            start_params.append(None)
+            fixed_params.append(None)
+            continue
+        sid = series_ids[i] if series_ids is not None else None
+        cached, fixed, start, keys[i] = _cache_plan(y, _spec(len(y), seasonal_periods), horizon, alpha, sid)
+        if cached is not None:
+            out[:, i] = cached
+            ok[i] = True
+        else:
+            todo.append(i)
+            start_params.append(start)
+            fixed_params.append(fixed)
+
+    if todo:
+        todo = np.array(todo)
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if IS_PYODIDE or workers <= 1 or len(todo) <= 1:
+            results = [(np.arange(len(todo)), _forecast_block([values[i] for i in todo], seasonal_periods, horizon, alpha, start_params, fixed_params))]
+        else:
+            # A few blocks per worker: one pickle per block instead of per series
+            blocks = np.array_split(np.arange(len(todo)), min(len(todo), workers * 4))
+            with ProcessPoolExecutor(max_workers=min(workers, len(blocks))) as pool:
+                futures = [
+                    (pos, pool.submit(_forecast_block, [values[i] for i in todo[pos]], seasonal_periods, horizon, alpha,
+                                      [start_params[j] for j in pos], [fixed_params[j] for j in pos]))
+                    for pos in blocks
+                ]
+                results = [(pos, fut.result()) for pos, fut in futures]
+        for pos, (block_out, block_ok, block_params) in results:
+            rows = todo[pos]
+            out[:, rows], ok[rows] = block_out, block_ok
+            if use_cache:
+                for j, i in enumerate(rows):
+                    if block_ok[j]:
+                        sid = series_ids[i] if series_ids is not None else None
+                        _cache_store(keys[i], block_params[j], block_out[:, j].copy(), horizon, alpha, sid)
+    models[~ok] = ""
+    return {"mean": out[0], "pi_lower": out[1], "pi_upper": out[2], "ok": ok, "model": models}
+
+
+def forecast_batch_flat(buffer, n_series, n_obs, horizon=12, seasonal_periods=12, alpha=0.05, lengths=None):
+    """
+    Pyodide entry point: `buffer` is a flat Float64Array (row-major n_series × n_obs),
+    or with `lengths` (one per series) the series concatenated back to back.
+    Returns one contiguous float64 array (4, n_series, horizon): mean, pi_lower,
+    pi_upper and ok (1.0/0.0), read on the JS side with getBuffer() without copies.
+    """
+    if hasattr(buffer, "to_py"):  # JsProxy of a typed array
+        buffer = buffer.to_py()
+    if hasattr(lengths, "to_py"):
+        lengths = lengths.to_py()
+    flat = np.asarray(buffer, dtype=np.float64)
+    if lengths is None:
+        values = flat.reshape(int(n_series), int(n_obs))
+    else:
+        values = np.split(flat, np.cumsum(np.asarray(lengths, dtype=np.int64))[:-1])
+    res = forecast_batch(values, horizon=int(horizon), seasonal_periods=int(seasonal_periods), alpha=alpha)
+    ok = np.repeat(res["ok"].astype(np.float64)[:, None], int(horizon), axis=1)
+    return np.ascontiguousarray(np.stack([res["mean"], res["pi_lower"], res["pi_upper"], ok]))
@@ -17,3 +17,31 @@ print("pi_lower\n")
 print(mod.pi_lower)
 print("pi_upper\n")
 print(mod.pi_upper)
+
+# batch API: same series twice plus a shifted copy, one call, no globals
+res = mod.forecast_batch([values, values, [v + 1 for v in values]], horizon=12)
+print("batch mean\n")
+print(res["mean"])
+print("batch ok\n")
+print(res["ok"])
+
+# repeated call: served from the fit cache; one more month: warm-started refit
+mod.forecast_batch([values, values, [v + 1 for v in values]], horizon=12)
+mod.forecast_batch([values + [9.5]], horizon=12)
+print("fit cache\n")
+print(mod.fit_cache_stats())
+
+# any length and horizon: quarterly data, 6 steps; mixed-length batch (short series fall back to AAN/ANN)
+print(mod.forecast(values[:20], horizon=6, freq="Q", start="2019-01-01"))
+res = mod.forecast_batch([values, values[:18], values[:5], [float("nan")] * 3 + values[3:]], horizon=6)
+print(res["model"], res["ok"])
+
+# JS engine path: forecast_data called again with the same data, then with one more month
+mod.clear_fit_cache()
+mod.forecast_data(months, values)                        # cold fit
+mod.forecast_data(months, values)                        # same series: cache hit
+mod.forecast_data(months + [25], values + [9.5])         # one more month: warm-started refit
+stats = mod.fit_cache_stats()
+print("forecast_data fit cache\n")
+print(stats)
+assert stats["hits"] == 1 and stats["warm"] == 1 and stats["misses"] == 1